@@ -1,14 +1,66 @@
 import json
-import os
+import shutil
+import socket
 import subprocess
+import time
+import traceback
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Tuple, Union
 
 from app.core.event import Event, eventmanager
 from app.log import logger
 from app.plugins import _PluginBase
 from app.schemas.types import EventType
 
+from . import aioengine
+from .aioengine import ENGINES, AsyncEngine
+from .batcher import Batcher
+from .breaker import BREAKER_STATES, CircuitBreaker
+from .conditions import MISSING, compile_path, resolve_path
+from .coprocess import Coprocess
+from .dedup import Debouncer, Fingerprint, TTLCache
+from .environment import build_base_env
+from .handler import HandlerRunner, HandlerTask, HandlerTimeout
+from .httpsink import HttpSink, HttpTask
+from .journal import FAILED_STATUSES, Execution, Journal, Replay, parse_time
+from . import process
+from .payload import DEFAULT_THRESHOLD, open_payload
+from .pool import ShardedPool, WorkerPool
+from .process import OUTPUT_MODES, ForkServer, Launch, OutputBuffer, ProcessTracker, ResourceLimits, parse_ionice
+from .ratelimit import Limit, RateLimiter
+from .retry import DeadLetterQueue, RetryPolicy, TimerWheel, parse_exit_codes
+from .matcher import EventSelector, split_patterns
+from .metrics import Metrics
+from .rules import DEFAULT_RULE_NAME, Rule, RuleIndex, parse_rules
+from .serializer import Serializer, to_json
+from .shellpool import ShellPool
+
+try:
+    from fastapi.responses import PlainTextResponse
+except ImportError:
+    PlainTextResponse = None
+
+# 兼容 __to_dict 的默认序列化器
+_default_serializer = Serializer()
+
+# 默认的高优先级事件（表单中标记 ⭐ 的常用事件）
+PRIORITY_EVENTS = ["transfer.complete", "download.added", "subscribe.added", "subscribe.complete"]
+
+# 工作线程队列的优先级车道
+LANE_HIGH, LANE_NORMAL, LANE_LOW = 0, 1, 2
+
+
+class EventJob(NamedTuple):
+    """工作线程任务：事件及其匹配的规则"""
+    event: Event
+    rules: List[Rule]
+    # 事件到达时间（单调时钟），用于统计排队等待时间
+    created: float = 0.0
+    # 重放时为原事件的日志记录 id
+    replay_of: Optional[int] = None
+    # 第几次执行（重试时大于 1）
+    attempt: int = 1
+
 
 class EventExecutor(_PluginBase):
     # 插件名称
@@ -18,7 +70,7 @@ class EventExecutor(_PluginBase):
     # 插件图标
     plugin_icon = "executor.png"
     # 插件版本
-    plugin_version = "1.1.1"
+    plugin_version = "2.0.0"
     # 插件作者
     plugin_author = "lureiny"
     # 作者主页
@@ -35,16 +87,121 @@ class EventExecutor(_PluginBase):
     # 私有属性
     _enabled: bool = False
     _bash_command: str = ""
-    _event_type: str = ""  # 单个事件类型（单选）
+    _event_type: str = ""  # 事件类型选择器（精确值、通配符 subscribe.*、正则 re:...），逗号分隔
+    _exclude_events: List[str]  # 排除的事件类型选择器
     _timeout: int = 60  # 命令执行超时时间（秒）
     _log_events: bool = False
+    _output_log: str = "failure"  # 命令输出的记录方式：failure 失败时记录；stream 逐行实时记录；off 不记录
+    _output_head: int = 4096  # 每次执行保留的输出开头字节数
+    _output_tail: int = 4096  # 每次执行保留的输出结尾字节数
+    _cpu_limit: int = 0  # 每次执行的 CPU 时间上限（秒），0 表示不限制
+    _memory_limit: int = 0  # 每次执行的虚拟内存上限（MB），0 表示不限制
+    _open_files: int = 0  # 每次执行的打开文件数上限，0 表示不限制
+    _nice: int = 0  # 命令的 nice 增量（0~19）
+    _ionice: str = ""  # 命令的 I/O 优先级：idle、best-effort:级别，为空表示不修改
+    _fork_server: bool = False  # 是否通过独立的启动进程启动命令
+    _shell_pool_size: int = 0  # 预热的 bash 进程数，0 表示不预热
+    _max_workers: int = 4  # 工作线程数，0 表示在事件线程中同步执行
+    _engine: str = "thread"  # 执行引擎：thread 工作线程；asyncio 事件循环线程
+    _async_concurrency: int = 100  # asyncio 执行引擎同时执行的最大命令数
+    _handler_workers: int = 4  # 执行 Python 处理函数的线程数
+    _http_concurrency: int = 8  # HTTP 规则同时发送的最大请求数
+    _queue_size: int = 1000  # 待执行队列容量
+    _type_concurrency: int = 0  # 单个事件类型的最大并发数，0 表示不限制
+    _priority_events: List[str]  # 高优先级事件类型选择器
+    _low_priority_events: List[str]  # 低优先级事件类型选择器
+    _starvation_ms: int = 2000  # 低优先级事件最长等待时间（毫秒），超过后优先执行，0 表示严格优先级
+    _shards: int = 0  # 分片数，大于 0 且配置了分片字段时同一 key 的事件按顺序执行
+    _shard_key: List[str]  # 分片字段路径，依次取第一个存在的值，如 mediainfo.tmdb_id
+    _exec_mode: str = "spawn"  # spawn：每个事件启动一次命令；coprocess：常驻进程
+    _coprocess_ack: bool = False  # 常驻进程模式下是否等待一行确认
+    _batch_window: int = 0  # 批处理窗口（毫秒），0 表示不启用批处理
+    _batch_size: int = 100  # 单批最大事件数
+    _payload_transport: str = "auto"  # 事件数据传递方式：auto / env / file / stdin
+    _payload_threshold: int = DEFAULT_THRESHOLD  # auto 方式下改用文件传递的字节数阈值
+    _env_allowlist: List[str]  # 传递给命令的环境变量（支持通配符），为空表示全部
+    _base_env: Optional[Dict[str, str]] = None  # 基础环境变量，加载配置时构建
+    _dedup_mode: str = "off"  # 去重方式：off / dedup / debounce
+    _dedup_window: int = 60  # 去重窗口期 / 防抖静默期（秒）
+    _dedup_keys: List[str]  # 事件指纹的关键字段，为空时使用整个事件数据
+    _dedup_events: str = ""  # 参与去重的事件类型选择器，为空表示全部
+    _dedup_size: int = 1024  # 指纹缓存 / 防抖等待的最大数量
+    _rate_limit: int = 0  # 全局限流（次/分钟），0 表示不限制
+    _rate_burst: int = 10  # 令牌桶容量（允许的突发次数）
+    _overflow_policy: str = "queue"  # 超限策略：queue / drop_newest / drop_oldest / sample
+    _rate_backlog: int = 1000  # 每个规则超限后的最大积压数
+    _rate_sample: int = 10  # sample 策略下每 N 个超限事件保留 1 个
+    _retry_attempts: int = 1  # 包含第一次在内的最大执行次数，1 表示不重试
+    _retry_backoff: int = 5  # 第一次重试的退避时间（秒），之后每次翻倍
+    _retry_max_backoff: int = 300  # 最大退避时间（秒）
+    _retry_exit_codes: str = ""  # 可重试的退出码（逗号分隔），为空表示任意非 0 退出码
+    _dead_letter_enabled: bool = False  # 重试耗尽的事件是否加入死信队列
+    _breaker_enabled: bool = False  # 是否为所有规则启用熔断器
+    _breaker_ratio: int = 50  # 熔断的失败比例（%）
+    _breaker_min_calls: int = 10  # 计算失败比例所需的最少执行次数
+    _breaker_timeouts: int = 3  # 连续超时次数达到后熔断，0 表示不按超时熔断
+    _breaker_open_seconds: int = 60  # 熔断持续时间（秒），之后放行一次试探执行
+    _journal_enabled: bool = False  # 是否记录执行日志
+    _journal_retention_days: int = 7  # 执行日志保留天数，0 表示不按时间清理
+    _journal_max_events: int = 100000  # 执行日志最多保留的事件数，0 表示不限制
+    _journal_output_limit: int = 4096  # 执行日志中每次执行保留的输出字符数
+    _pretty_json: bool = False  # 是否输出带缩进的 JSON
+    _max_depth: int = 32  # 事件数据转换的最大深度
+    _max_nodes: int = 100000  # 事件数据转换的最大节点数
+    _serializer: Serializer = _default_serializer
+    _rules: List[Rule]  # 规则列表（不含默认规则）
+    _rule_index: Optional[RuleIndex] = None
+    _pool: Optional[Union[WorkerPool, ShardedPool]] = None
+    _shard_paths: List[Tuple[Any, ...]]
+    _coprocesses: Dict[str, Coprocess]  # 规则名称 -> 常驻进程
+    _batcher: Optional[Batcher] = None
+    _fingerprint: Optional[Fingerprint] = None
+    _dedup_selector: Optional[EventSelector] = None
+    _dedup_cache: Optional[TTLCache] = None
+    _debouncer: Optional[Debouncer] = None
+    _limiter: Optional[RateLimiter] = None
+    _lane_selectors: List[Tuple[int, EventSelector]]
+    _lane_cache: Dict[str, int]  # 事件类型 -> 车道
+    _metrics: Optional[Metrics] = None
+    _retry_policies: Dict[str, RetryPolicy]  # 规则名称 -> 重试策略
+    _timer: Optional[TimerWheel] = None
+    _dead_letters: Optional[DeadLetterQueue] = None
+    _breakers: Dict[str, CircuitBreaker]  # 规则名称 -> 熔断器
+    _limits: Dict[str, ResourceLimits]  # 规则名称 -> 资源限制
+    _processes: Optional[ProcessTracker] = None
+    _spawner: Optional[ForkServer] = None
+    _shell_pool: Optional[ShellPool] = None
+    _handlers: Optional[HandlerRunner] = None
+    _http: Optional[HttpSink] = None
+    _journal: Optional[Journal] = None
+    _replay: Optional[Replay] = None
+
+    def __init__(self):
+        super().__init__()
+        # 列表与字典在实例上创建，多个插件实例之间不共享
+        self._exclude_events = []
+        self._priority_events = list(PRIORITY_EVENTS)
+        self._low_priority_events = []
+        self._shard_key = []
+        self._env_allowlist = []
+        self._dedup_keys = []
+        self._rules = []
+        self._shard_paths = []
+        self._coprocesses = {}
+        self._lane_selectors = []
+        self._lane_cache = {}
+        self._retry_policies = {}
+        self._breakers = {}
+        self._limits = {}
 
     def init_plugin(self, config: dict = None):
         """初始化插件"""
+        self.stop_service()
         if config:
             self._enabled = config.get("enabled", False)
             self._bash_command = config.get("bash_command", "")
             self._event_type = config.get("event_type", "")
+            self._exclude_events = split_patterns(config.get("exclude_events"))
             # 确保 timeout 是整数类型（Web 表单传来的是字符串）
             try:
                 timeout_value = config.get("timeout", 60)
@@ -53,6 +210,73 @@ class EventExecutor(_PluginBase):
                 logger.warning(f"[事件执行器] 超时时间配置无效，使用默认值 60 秒")
                 self._timeout = 60
             self._log_events = config.get("log_events", False)
+            self._output_log = config.get("output_log") or "failure"
+            if self._output_log not in OUTPUT_MODES:
+                self._output_log = "failure"
+            self._output_head = self._get_int(config, "output_head", 4096)
+            self._output_tail = self._get_int(config, "output_tail", 4096)
+            self._cpu_limit = self._get_int(config, "cpu_limit", 0)
+            self._memory_limit = self._get_int(config, "memory_limit", 0)
+            self._open_files = self._get_int(config, "open_files", 0)
+            self._nice = min(19, self._get_int(config, "nice", 0))
+            self._ionice = config.get("ionice") or ""
+            self._fork_server = config.get("fork_server", False)
+            self._shell_pool_size = self._get_int(config, "shell_pool", 0)
+            self._max_workers = self._get_int(config, "max_workers", 4)
+            self._engine = config.get("engine") or "thread"
+            if self._engine not in ENGINES:
+                self._engine = "thread"
+            self._async_concurrency = self._get_int(config, "async_concurrency", 100, minimum=1)
+            self._handler_workers = self._get_int(config, "handler_workers", 4, minimum=1)
+            self._http_concurrency = self._get_int(config, "http_concurrency", 8, minimum=1)
+            self._queue_size = self._get_int(config, "queue_size", 1000, minimum=1)
+            self._type_concurrency = self._get_int(config, "type_concurrency", 0)
+            self._priority_events = split_patterns(config.get("priority_events", PRIORITY_EVENTS))
+            self._low_priority_events = split_patterns(config.get("low_priority_events"))
+            self._starvation_ms = self._get_int(config, "starvation_ms", 2000)
+            self._shards = self._get_int(config, "shards", 0)
+            self._shard_key = split_patterns(config.get("shard_key"))
+            self._exec_mode = config.get("exec_mode") or "spawn"
+            self._coprocess_ack = config.get("coprocess_ack", False)
+            self._batch_window = self._get_int(config, "batch_window", 0)
+            self._batch_size = self._get_int(config, "batch_size", 100, minimum=1)
+            self._payload_transport = config.get("payload_transport") or "auto"
+            self._payload_threshold = self._get_int(config, "payload_threshold", DEFAULT_THRESHOLD)
+            self._env_allowlist = split_patterns(config.get("env_allowlist"))
+            self._dedup_mode = config.get("dedup_mode") or "off"
+            self._dedup_window = self._get_int(config, "dedup_window", 60)
+            self._dedup_keys = split_patterns(config.get("dedup_keys"))
+            self._dedup_events = config.get("dedup_events") or ""
+            self._dedup_size = self._get_int(config, "dedup_size", 1024, minimum=1)
+            self._rate_limit = self._get_int(config, "rate_limit", 0)
+            self._rate_burst = self._get_int(config, "rate_burst", 10, minimum=1)
+            self._overflow_policy = config.get("overflow_policy") or "queue"
+            self._rate_backlog = self._get_int(config, "rate_backlog", 1000, minimum=1)
+            self._rate_sample = self._get_int(config, "rate_sample", 10, minimum=1)
+            self._retry_attempts = self._get_int(config, "retry_attempts", 1, minimum=1)
+            self._retry_backoff = self._get_int(config, "retry_backoff", 5)
+            self._retry_max_backoff = self._get_int(config, "retry_max_backoff", 300)
+            self._retry_exit_codes = config.get("retry_exit_codes") or ""
+            self._dead_letter_enabled = config.get("dead_letter_enabled", False)
+            self._breaker_enabled = config.get("breaker_enabled", False)
+            self._breaker_ratio = min(100, self._get_int(config, "breaker_ratio", 50, minimum=1))
+            self._breaker_min_calls = self._get_int(config, "breaker_min_calls", 10, minimum=1)
+            self._breaker_timeouts = self._get_int(config, "breaker_timeouts", 3)
+            self._breaker_open_seconds = self._get_int(config, "breaker_open_seconds", 60, minimum=1)
+            self._journal_enabled = config.get("journal_enabled", False)
+            self._journal_retention_days = self._get_int(config, "journal_retention_days", 7)
+            self._journal_max_events = self._get_int(config, "journal_max_events", 100000)
+            self._journal_output_limit = self._get_int(config, "journal_output_limit", 4096)
+            self._pretty_json = config.get("pretty_json", False)
+            self._max_depth = self._get_int(config, "max_depth", 32, minimum=1)
+            self._max_nodes = self._get_int(config, "max_nodes", 100000, minimum=1)
+            self._rules = parse_rules(config.get("rules"), default_timeout=self._timeout)
+        self._serializer = Serializer(max_depth=self._max_depth, max_nodes=self._max_nodes)
+        self._rule_index = self._compile_rules()
+        self._base_env = build_base_env(self._env_allowlist)
+        self._lane_selectors = self._compile_lanes()
+        self._lane_cache = {}
+        self._shard_paths = self._compile_shard_key()
 
         if self._enabled:
             logger.info("事件执行器插件已启用")
@@ -62,7 +286,349 @@ class EventExecutor(_PluginBase):
                 logger.info(f"监听事件：{self._event_type}")
             else:
                 logger.info("监听所有广播事件")
+            if self._exclude_events:
+                logger.info(f"排除事件：{', '.join(self._exclude_events)}")
             logger.info(f"命令超时时间：{self._timeout}秒")
+            if self._rules:
+                logger.info(f"规则数：{len(self._rules)}")
+            if self._env_allowlist:
+                logger.info(f"传递的环境变量：{', '.join(self._env_allowlist)}，共 {len(self._base_env)} 个")
+            if self._exec_mode == "coprocess":
+                self._coprocesses = {}
+                for rule in self._rule_index.rules:
+                    if rule.argv is not None or rule.handler is not None or rule.http is not None:
+                        # argv 规则按事件生成参数，每个事件执行一次；Python 处理函数与 HTTP 规则在插件进程内执行
+                        continue
+                    coprocess = Coprocess(command=rule.command,
+                                          ack=self._coprocess_ack,
+                                          ack_timeout=rule.timeout,
+                                          log_output=self._log_events,
+                                          env=self._base_env)
+                    coprocess.start()
+                    self._coprocesses[rule.name] = coprocess
+                logger.info(f"常驻进程模式，等待确认：{'是' if self._coprocess_ack else '否'}")
+            if self._use_async_engine():
+                self._pool = AsyncEngine(handler=self._process_job_async,
+                                         concurrency=self._async_concurrency,
+                                         queue_size=self._queue_size,
+                                         key_limit=self._type_concurrency)
+                self._pool.start()
+                logger.info(f"asyncio 执行引擎，最大并发命令数：{self._async_concurrency}，队列容量：{self._queue_size}")
+            elif self._max_workers > 0 and self._shard_paths:
+                self._pool = ShardedPool(handler=self._process_job,
+                                         shards=self._shards,
+                                         queue_size=self._queue_size)
+                self._pool.start()
+                logger.info(f"分片执行：{self._shards} 个分片，分片字段：{', '.join(self._shard_key)}")
+            elif self._max_workers > 0:
+                self._pool = WorkerPool(handler=self._process_job,
+                                        workers=self._max_workers,
+                                        queue_size=self._queue_size,
+                                        key_limit=self._type_concurrency,
+                                        lanes=3,
+                                        max_wait=self._starvation_ms / 1000)
+                self._pool.start()
+                logger.info(f"工作线程数：{self._max_workers}，队列容量：{self._queue_size}")
+                if self._priority_events:
+                    logger.info(f"高优先级事件：{', '.join(self._priority_events)}")
+            if self._batch_window > 0 and self._exec_mode != "coprocess":
+                self._batcher = Batcher(handler=self._submit_batch,
+                                        window=self._batch_window / 1000,
+                                        max_size=self._batch_size)
+                self._batcher.start()
+                logger.info(f"批处理窗口：{self._batch_window}毫秒，单批最大事件数：{self._batch_size}")
+            if self._dedup_mode in ("dedup", "debounce"):
+                self._init_dedup()
+            self._init_limiter()
+            self._init_resource_limits()
+            if self._fork_server:
+                self._init_spawner()
+            if self._shell_pool_size > 0 and self._exec_mode != "coprocess":
+                self._init_shell_pool()
+            if any(rule.handler is not None for rule in self._rule_index.rules):
+                self._init_handlers()
+            if any(rule.http is not None for rule in self._rule_index.rules):
+                self._init_http()
+            self._init_retry()
+            self._init_breakers()
+            if self._journal_enabled:
+                self._init_journal()
+
+    def _use_async_engine(self) -> bool:
+        """
+        是否使用 asyncio 执行引擎：常驻进程模式、分片执行与不支持 pidfd 的系统仍使用工作线程
+        """
+        if self._engine != "asyncio":
+            return False
+        if self._exec_mode == "coprocess":
+            logger.warning("[事件执行器] 常驻进程模式不使用 asyncio 执行引擎")
+        elif self._shard_paths:
+            logger.warning("[事件执行器] 分片执行需要按分片保序，不使用 asyncio 执行引擎")
+        elif not aioengine.supported():
+            logger.warning("[事件执行器] 系统不支持 pidfd（需要 Linux 5.3 以上），不使用 asyncio 执行引擎")
+        else:
+            return True
+        return False
+
+    def _init_limiter(self):
+        """
+        初始化令牌桶限流：全局限流与规则的 rate_limit 选项，均未配置时不启用
+        """
+        try:
+            default = Limit(per_minute=self._rate_limit, burst=self._rate_burst,
+                            policy=self._overflow_policy, backlog=self._rate_backlog,
+                            sample=self._rate_sample)
+        except ValueError as e:
+            logger.error(f"[事件执行器] 限流配置无效，不启用全局限流：{str(e)}")
+            default = Limit(per_minute=0, burst=self._rate_burst)
+        limits: Dict[str, Limit] = {}
+        for rule in self._rule_index.rules:
+            try:
+                limit = Limit.from_options(rule.options, default)
+            except (ValueError, TypeError) as e:
+                logger.error(f"[事件执行器] 规则 {rule.name} 限流配置无效，已忽略：{str(e)}")
+                continue
+            if limit:
+                limits[rule.name] = limit
+        if not default.bucket and not limits:
+            return
+        self._limiter = RateLimiter(handler=self._dispatch_limited,
+                                    global_limit=default if default.bucket else None)
+        for rule in self._rule_index.rules:
+            self._limiter.add_rule(rule.name, limits.get(rule.name))
+        self._limiter.start()
+        if default.bucket:
+            logger.info(f"全局限流：{self._rate_limit}次/分钟，超限策略：{self._overflow_policy}")
+        for name, limit in limits.items():
+            logger.info(f"规则 {name} 限流：{limit.per_minute}次/分钟，超限策略：{limit.policy}")
+
+    def _init_dedup(self):
+        """
+        初始化去重 / 防抖，关键字段或事件选择器无效时不启用
+        """
+        try:
+            self._fingerprint = Fingerprint(self._dedup_keys, dumps=self._serializer.dumps)
+            self._dedup_selector = EventSelector(self._dedup_events)
+        except ValueError as e:
+            logger.error(f"[事件执行器] 去重配置无效，不启用去重：{str(e)}")
+            self._fingerprint = None
+            return
+        if self._dedup_mode == "debounce":
+            self._debouncer = Debouncer(handler=self._dispatch,
+                                        quiet=self._dedup_window,
+                                        max_keys=self._dedup_size)
+            self._debouncer.start()
+            logger.info(f"防抖静默期：{self._dedup_window}秒")
+        else:
+            self._dedup_cache = TTLCache(max_size=self._dedup_size, ttl=self._dedup_window)
+            logger.info(f"去重窗口期：{self._dedup_window}秒，指纹缓存容量：{self._dedup_size}")
+
+    def _init_resource_limits(self):
+        """
+        初始化规则的资源限制（CPU 时间、内存、打开文件数、nice、ionice），规则选项覆盖全局设置
+        """
+        self._processes = ProcessTracker()
+        try:
+            default = ResourceLimits(cpu_seconds=self._cpu_limit, memory_mb=self._memory_limit,
+                                     open_files=self._open_files, nice=self._nice,
+                                     ioprio=parse_ionice(self._ionice))
+        except ValueError as e:
+            logger.error(f"[事件执行器] 资源限制配置无效，不启用全局资源限制：{str(e)}")
+            default = ResourceLimits()
+        limits: Dict[str, ResourceLimits] = {}
+        for rule in self._rule_index.rules:
+            try:
+                limits[rule.name] = ResourceLimits.from_options(rule.options, default)
+            except (ValueError, TypeError) as e:
+                logger.error(f"[事件执行器] 规则 {rule.name} 资源限制配置无效，使用全局设置：{str(e)}")
+                limits[rule.name] = default
+            if limits[rule.name].enabled:
+                logger.info(f"规则 {rule.name} 资源限制：{limits[rule.name].describe()}")
+        self._limits = limits
+
+    def _init_spawner(self):
+        """
+        启动命令启动进程：命令由独立的小进程通过 posix_spawn 启动，不再从 MoviePilot 进程 fork
+        """
+        spawner = ForkServer()
+        try:
+            spawner.start()
+        except Exception as e:
+            logger.error(f"[事件执行器] 启动进程启动失败，在插件进程内启动命令：{str(e)}")
+            return
+        self._spawner = spawner
+        logger.info(f"命令启动进程：{spawner.pid}")
+
+    def _init_shell_pool(self):
+        """
+        启动预热 shell 池：保持若干个已启动的 bash 等待任务，命令交给空闲的 bash 后在其进程中执行
+        """
+        if not shutil.which("bash"):
+            logger.error("[事件执行器] 未找到 bash，不启用预热 shell 池")
+            return
+        self._shell_pool = ShellPool(self._shell_pool_size, env=self._get_base_env(), spawner=self._spawner)
+        self._shell_pool.start()
+        logger.info(f"预热 shell 数：{self._shell_pool_size}")
+
+    def _rule_shell_pool(self, rule: Rule) -> Optional[ShellPool]:
+        """
+        规则使用的预热 shell 池，不使用时返回 None
+        argv 规则、设置了资源限制或 prewarm 选项为 false 的规则不使用预热 shell
+        """
+        pool = self._shell_pool
+        limits = self._limits.get(rule.name)
+        if (pool is None or rule.argv is not None or (limits is not None and limits.enabled)
+                or rule.options.get("prewarm", True) is False):
+            return None
+        return pool
+
+    def _acquire_shell(self, rule: Rule, pool: ShellPool, pass_fds: Tuple[int, ...]) -> Any:
+        """
+        从预热 shell 池取出空闲进程，未命中时返回 None
+        """
+        worker = pool.acquire(pass_fds)
+        self._get_metrics().inc("shell_pool_total", rule=rule.name, result="hit" if worker else "miss")
+        return worker
+
+    def _init_handlers(self):
+        """
+        启动 Python 处理函数的执行线程池
+        """
+        self._handlers = HandlerRunner(workers=self._handler_workers)
+        logger.info(f"Python 处理函数线程数：{self._handler_workers}")
+
+    def _get_handlers(self) -> HandlerRunner:
+        """
+        获取 Python 处理函数的执行线程池（未调用 init_plugin 时创建）
+        """
+        if self._handlers is None:
+            self._handlers = HandlerRunner(workers=self._handler_workers)
+        return self._handlers
+
+    def _init_http(self):
+        """
+        启动 HTTP 规则的请求线程池与连接池
+        """
+        self._http = HttpSink(concurrency=self._http_concurrency)
+        logger.info(f"HTTP 规则最大并发请求数：{self._http_concurrency}")
+
+    def _get_http(self) -> HttpSink:
+        """
+        获取 HTTP 规则的请求线程池（未调用 init_plugin 时创建）
+        """
+        if self._http is None:
+            self._http = HttpSink(concurrency=self._http_concurrency)
+        return self._http
+
+    def _init_retry(self):
+        """
+        初始化重试策略与死信队列：有规则允许重试时启动时间轮
+        """
+        try:
+            default = RetryPolicy(attempts=self._retry_attempts, backoff=self._retry_backoff,
+                                  max_backoff=self._retry_max_backoff,
+                                  exit_codes=parse_exit_codes(self._retry_exit_codes))
+        except ValueError as e:
+            logger.error(f"[事件执行器] 重试配置无效，不启用全局重试：{str(e)}")
+            default = RetryPolicy()
+        policies: Dict[str, RetryPolicy] = {}
+        for rule in self._rule_index.rules:
+            try:
+                policies[rule.name] = RetryPolicy.from_options(rule.options, default)
+            except (ValueError, TypeError) as e:
+                logger.error(f"[事件执行器] 规则 {rule.name} 重试配置无效，使用全局设置：{str(e)}")
+                policies[rule.name] = default
+        self._retry_policies = policies
+        if any(policy.attempts > 1 for policy in policies.values()):
+            self._timer = TimerWheel(handler=self._enqueue)
+            self._timer.start()
+            for name, policy in policies.items():
+                if policy.attempts > 1:
+                    logger.info(f"规则 {name} 最多执行 {policy.attempts} 次，退避 {policy.backoff}~{policy.max_backoff}秒")
+        if self._dead_letter_enabled:
+            dead_letters = DeadLetterQueue(self.get_data_path() / "dead_letter.db")
+            try:
+                dead_letters.open()
+            except Exception as e:
+                logger.error(f"[事件执行器] 死信队列打开失败：{str(e)}")
+                return
+            self._dead_letters = dead_letters
+            logger.info(f"死信队列：{dead_letters.path}，现有 {dead_letters.count()} 个事件")
+
+    def _init_breakers(self):
+        """
+        初始化规则的熔断器：全局启用时作用于所有规则，规则也可通过 breaker 选项单独启用或关闭
+        """
+        default = None
+        if self._breaker_enabled:
+            default = CircuitBreaker(failure_ratio=self._breaker_ratio / 100,
+                                     min_calls=self._breaker_min_calls,
+                                     window=self._breaker_min_calls * 2,
+                                     timeouts=self._breaker_timeouts,
+                                     open_seconds=self._breaker_open_seconds)
+        breakers: Dict[str, CircuitBreaker] = {}
+        metrics = self._get_metrics()
+        for rule in self._rule_index.rules:
+            try:
+                breaker = CircuitBreaker.from_options(
+                    rule.options, default,
+                    on_change=lambda previous, state, name=rule.name: self._on_breaker_change(name, previous, state))
+            except (ValueError, TypeError) as e:
+                logger.error(f"[事件执行器] 规则 {rule.name} 熔断配置无效，已忽略：{str(e)}")
+                continue
+            if breaker is not None:
+                breakers[rule.name] = breaker
+                metrics.set("breaker_state", BREAKER_STATES.index(breaker.state), rule=rule.name)
+        self._breakers = breakers
+        if breakers:
+            logger.info(f"熔断器：{', '.join(breakers)}")
+
+    def _on_breaker_change(self, name: str, previous: str, state: str):
+        """
+        熔断器状态变化：更新指标并记录日志
+        """
+        metrics = self._get_metrics()
+        metrics.set("breaker_state", BREAKER_STATES.index(state), rule=name)
+        metrics.inc("breaker_transitions_total", rule=name, state=state)
+        if state == "open":
+            breaker = self._breakers.get(name)
+            seconds = f"{breaker.open_seconds:g}" if breaker else "-"
+            logger.warning(f"[事件执行器] 规则 {name} 连续失败，熔断 {seconds} 秒，期间的事件不再执行")
+        elif state == "half_open":
+            logger.info(f"[事件执行器] 规则 {name} 熔断结束，试探执行")
+        else:
+            logger.info(f"[事件执行器] 规则 {name} 已恢复正常执行")
+
+    def _init_journal(self):
+        """
+        打开执行日志数据库，失败时不记录执行日志
+        """
+        journal = Journal(self.get_data_path() / "journal.db",
+                          retention_days=self._journal_retention_days,
+                          max_events=self._journal_max_events,
+                          output_limit=self._journal_output_limit)
+        try:
+            journal.open()
+        except Exception as e:
+            logger.error(f"[事件执行器] 执行日志打开失败：{str(e)}")
+            return
+        self._journal = journal
+        logger.info(f"执行日志：{journal.path}，保留 {self._journal_retention_days} 天，"
+                    f"最多 {self._journal_max_events} 个事件")
+
+    @staticmethod
+    def _get_int(config: dict, key: str, default: int, minimum: int = 0) -> int:
+        """
+        读取整数配置（Web 表单传来的是字符串），无效时使用默认值
+        """
+        value = config.get(key, default)
+        if value is None or value == "":
+            return default
+        try:
+            return max(minimum, int(value))
+        except (ValueError, TypeError):
+            logger.warning(f"[事件执行器] 配置项 {key} 无效，使用默认值 {default}")
+            return default
 
     def get_state(self) -> bool:
         """获取插件状态"""
@@ -75,7 +641,285 @@ class EventExecutor(_PluginBase):
 
     def get_api(self) -> List[Dict[str, Any]]:
         """注册 API"""
-        pass
+        return [
+            {
+                "path": "/stats",
+                "endpoint": self.get_stats,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "运行统计",
+                "description": "队列、去重与防抖的计数"
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "执行指标",
+                "description": "按事件类型与规则的计数器及耗时直方图（JSON）"
+            },
+            {
+                "path": "/metrics/prometheus",
+                "endpoint": self.get_prometheus_metrics,
+                "methods": ["GET"],
+                "auth": "apikey",
+                "summary": "执行指标（Prometheus）",
+                "description": "Prometheus 文本格式的执行指标"
+            },
+            {
+                "path": "/journal",
+                "endpoint": self.get_journal,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "执行日志",
+                "description": "按时间、事件类型、规则与状态分页查询执行记录"
+            },
+            {
+                "path": "/journal/replay",
+                "endpoint": self.replay_journal,
+                "methods": ["POST"],
+                "auth": "bear",
+                "summary": "重放事件",
+                "description": "按当前规则以限定速率重新执行时间范围内或失败的事件"
+            },
+            {
+                "path": "/dead_letter",
+                "endpoint": self.get_dead_letters,
+                "methods": ["GET"],
+                "auth": "bear",
+                "summary": "死信队列",
+                "description": "分页查看重试耗尽的事件"
+            },
+            {
+                "path": "/dead_letter/drain",
+                "endpoint": self.drain_dead_letters,
+                "methods": ["POST"],
+                "auth": "bear",
+                "summary": "处理死信",
+                "description": "批量取出死信，以限定速率重新执行或直接清空"
+            }
+        ]
+
+    def get_journal(self, page: int = 1, count: int = 50, event_type: str = None, status: str = None,
+                    rule: str = None, start: str = None, end: str = None,
+                    payload: bool = False) -> Dict[str, Any]:
+        """
+        分页查询执行日志
+        status 可为逗号分隔的多个状态，failed 表示全部失败状态（failed、timeout、error）；
+        start / end 为 Unix 时间戳或 ISO 格式时间
+        """
+        if not self._journal:
+            return {"success": False, "message": "未启用执行日志"}
+        try:
+            result = self._journal.query(page=page, count=count, include_payload=payload,
+                                         event_type=event_type, status=self._journal_statuses(status),
+                                         rule=rule, start=parse_time(start), end=parse_time(end))
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        return {"success": True, **result}
+
+    def replay_journal(self, start: str = None, end: str = None, status: str = None, event_type: str = None,
+                       rule: str = None, rate: float = 1.0, limit: int = 1000) -> Dict[str, Any]:
+        """
+        重放执行日志中的事件：按条件选出事件，用当前规则重新匹配，每秒最多提交 rate 个
+        未指定时间范围与状态时重放全部失败的事件，同一时间只运行一个重放任务
+        """
+        if not self._enabled or not self._journal:
+            return {"success": False, "message": "未启用执行日志"}
+        if self._replay and self._replay.running:
+            return {"success": False, "message": "已有重放任务在运行", "replay": self._replay.stats()}
+        try:
+            start_time, end_time = parse_time(start), parse_time(end)
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        statuses = self._journal_statuses(status)
+        if not statuses and start_time is None and end_time is None:
+            statuses = list(FAILED_STATUSES)
+        entries = self._journal.events_for_replay(limit=limit, event_type=event_type, status=statuses,
+                                                  rule=rule, start=start_time, end=end_time)
+        self._replay = Replay(entries, handler=self._replay_event, rate=rate)
+        self._replay.start()
+        logger.info(f"[事件执行器] 开始重放 {len(entries)} 个事件，速率：{rate}个/秒")
+        return {"success": True, "replay": self._replay.stats()}
+
+    def get_dead_letters(self, page: int = 1, count: int = 50, rule: str = None,
+                         payload: bool = False) -> Dict[str, Any]:
+        """
+        分页查看死信队列
+        """
+        if not self._dead_letters:
+            return {"success": False, "message": "未启用死信队列"}
+        rules = split_patterns(rule) or None
+        return {"success": True, **self._dead_letters.list(page=page, count=count, rules=rules,
+                                                           include_payload=payload)}
+
+    def drain_dead_letters(self, rule: str = None, limit: int = 1000, rate: float = 1.0,
+                           discard: bool = False) -> Dict[str, Any]:
+        """
+        批量处理死信：discard 为真时直接清空，否则取出后按原规则以每秒 rate 个的速率重新执行
+        只取出当前仍存在的规则的死信，与重放共用一个后台任务
+        """
+        if not self._enabled or not self._dead_letters:
+            return {"success": False, "message": "未启用死信队列"}
+        rules = split_patterns(rule) or None
+        if discard:
+            removed = self._dead_letters.discard(rules)
+            logger.info(f"[事件执行器] 已清空 {removed} 个死信")
+            return {"success": True, "discarded": removed}
+        if self._replay and self._replay.running:
+            return {"success": False, "message": "已有重放任务在运行", "replay": self._replay.stats()}
+        if self._rule_index is None:
+            self._rule_index = self._compile_rules()
+        names = [item.name for item in self._rule_index.rules if rules is None or item.name in rules]
+        # 死信在重新提交后才从队列删除，中途停止或提交失败的仍保留在队列中
+        entries = self._dead_letters.fetch(limit=limit, rules=names)
+        remaining = self._dead_letters.count() - len(entries)
+        self._replay = Replay(entries, handler=self._redeliver, rate=rate)
+        self._replay.start()
+        logger.info(f"[事件执行器] 开始重新执行 {len(entries)} 个死信，速率：{rate}个/秒")
+        return {"success": True, "remaining": remaining, "replay": self._replay.stats()}
+
+    @staticmethod
+    def _journal_statuses(status: Optional[str]) -> Optional[List[str]]:
+        """
+        解析执行状态过滤条件，failed 展开为全部失败状态
+        """
+        statuses = []
+        for item in split_patterns(status):
+            statuses.extend(FAILED_STATUSES if item == "failed" else [item])
+        return statuses or None
+
+    @staticmethod
+    def _event_from_payload(event_type: str, payload: Optional[str]) -> Optional[Event]:
+        """
+        由保存的事件类型与事件数据 JSON 重建事件，事件类型已不存在时返回 None
+        """
+        try:
+            return Event(EventType(event_type), json.loads(payload) if payload else None)
+        except ValueError:
+            logger.warning(f"[事件执行器] 无法重建事件：未知的事件类型 {event_type}")
+            return None
+
+    def _replay_event(self, entry_id: int, event_type: str, payload: str) -> bool:
+        """
+        重放一个日志中的事件：跳过去重，按当前规则匹配后提交
+        """
+        event = self._event_from_payload(event_type, payload)
+        if event is None:
+            return False
+        rules = self._match_rules(event)
+        if not rules:
+            return False
+        self._dispatch(EventJob(event, rules, time.monotonic(), replay_of=entry_id))
+        return True
+
+    def _redeliver(self, entry_id: int, event_type: str, payload: str, rule_name: str) -> bool:
+        """
+        重新执行一个死信：只提交给原来失败的规则，不检查规则条件与规则限流（由重新执行的速率控制），
+        提交成功后从死信队列删除
+        """
+        event = self._event_from_payload(event_type, payload)
+        rule = next((rule for rule in self._rule_index.rules if rule.name == rule_name), None)
+        if event is None or rule is None:
+            return False
+        if not self._enqueue(EventJob(event, [rule], time.monotonic())):
+            return False
+        dead_letters = self._dead_letters
+        if dead_letters:
+            dead_letters.ack(entry_id)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        执行指标：按规则、事件类型与处理阶段汇总，以及原始计数器与直方图
+        """
+        return {**self._metrics_summary(), "raw": self._get_metrics().snapshot()}
+
+    def get_prometheus_metrics(self) -> Any:
+        """
+        Prometheus 文本格式的执行指标
+        """
+        text = self._get_metrics().to_prometheus()
+        if PlainTextResponse is None:
+            return text
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    def _metrics_summary(self) -> Dict[str, Any]:
+        """
+        汇总指标：各处理阶段的耗时分布、每个规则与每个事件类型的计数
+        """
+        metrics = self._get_metrics()
+
+        def timing(name: str, **labels) -> Dict[str, Any]:
+            histogram = metrics.histogram(name, **labels)
+            return {key: value for key, value in histogram.snapshot().items() if key != "buckets"}
+
+        stages = {name: timing(name) for name in
+                  ("queue_wait_seconds", "serialize_seconds", "prepare_seconds", "run_seconds")}
+        rules = {}
+        for name in metrics.label_values("executions_total", "rule"):
+            short_circuited = metrics.counter("executions_total", rule=name, status="short_circuit")
+            rules[name] = {
+                "executions": metrics.counter("executions_total", rule=name) - short_circuited,
+                "failed": metrics.counter("executions_total", rule=name, status="failed"),
+                "errors": metrics.counter("executions_total", rule=name, status="error"),
+                "timeouts": metrics.counter("timeouts_total", rule=name),
+                "short_circuited": short_circuited,
+                "breaker": self._breakers[name].state if name in self._breakers else None,
+                "run": timing("run_seconds", rule=name),
+                "cpu": timing("cpu_seconds", rule=name),
+                "max_rss": timing("max_rss_bytes", rule=name),
+            }
+        event_types = {}
+        for event_type in metrics.label_values("events_total", "event_type"):
+            event_types[event_type] = {
+                "events": metrics.counter("events_total", event_type=event_type),
+                "ignored": metrics.counter("events_ignored_total", event_type=event_type),
+                "payload_bytes": metrics.counter("payload_bytes_total", event_type=event_type),
+                "serialize": timing("serialize_seconds", event_type=event_type),
+                "queue_wait": timing("queue_wait_seconds", event_type=event_type),
+            }
+        return {"uptime": time.time() - metrics.started, "stages": stages,
+                "rules": rules, "event_types": event_types}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        运行统计：队列长度、丢弃数，去重命中 / 未命中数
+        """
+        stats: Dict[str, Any] = {}
+        if self._pool:
+            stats["queue"] = {"size": self._pool.qsize(), "dropped": self._pool.dropped}
+            if isinstance(self._pool, ShardedPool):
+                stats["shards"] = self._pool.shard_stats()
+            elif isinstance(self._pool, AsyncEngine):
+                stats["engine"] = self._pool.stats()
+            else:
+                stats["lanes"] = self._pool.lane_stats()
+        if self._dedup_cache is not None:
+            stats["dedup"] = self._dedup_cache.stats()
+        if self._limiter:
+            stats["rate_limit"] = self._limiter.stats()
+        if self._debouncer:
+            stats["debounce"] = self._debouncer.stats()
+        if self._breakers:
+            stats["breakers"] = {name: breaker.stats() for name, breaker in self._breakers.items()}
+        if self._timer is not None:
+            stats["retry"] = self._timer.stats()
+        if self._dead_letters:
+            stats["dead_letter"] = {"size": self._dead_letters.count()}
+        if self._journal:
+            stats["journal"] = {"path": str(self._journal.path), "dropped": self._journal.dropped}
+        if self._replay:
+            stats["replay"] = self._replay.stats()
+        if self._spawner:
+            stats["fork_server"] = self._spawner.stats()
+        if self._shell_pool:
+            stats["shell_pool"] = self._shell_pool.stats()
+        if self._handlers:
+            stats["handlers"] = self._handlers.stats()
+        if self._http:
+            stats["http"] = self._http.stats()
+        return stats
 
     def get_service(self) -> List[Dict[str, Any]]:
         """注册服务"""
@@ -111,7 +955,14 @@ class EventExecutor(_PluginBase):
             {"title": "配置项更新 (config.updated)", "value": "config.updated"},
             {"title": "消息交互动作 (message.action)", "value": "message.action"},
             {"title": "执行工作流 (workflow.execute)", "value": "workflow.execute"},
+            {"title": "🔀 全部插件事件 (plugin.*)", "value": "plugin.*"},
+            {"title": "🔀 全部站点事件 (site.*)", "value": "site.*"},
+            {"title": "🔀 全部下载事件 (download.*)", "value": "download.*"},
+            {"title": "🔀 全部订阅事件 (subscribe.*)", "value": "subscribe.*"},
         ]
+        # 具体事件类型（用于排除、优先级等多选项）
+        type_options = [option for option in event_options
+                           if option["value"] and "*" not in option["value"]]
 
         return [
             {
@@ -171,17 +1022,48 @@ class EventExecutor(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12},
+                                'props': {'cols': 12, 'md': 4},
                                 'content': [
                                     {
-                                        'component': 'VSelect',
+                                        'component': 'VTextField',
                                         'props': {
-                                            'model': 'event_type',
-                                            'label': '监听的事件类型',
-                                            'hint': '选择要监听的单个事件类型，或选择"全部事件"',
-                                            'persistent-hint': True,
-                                            'clearable': True,
-                                            'items': event_options
+                                            'model': 'max_workers',
+                                            'label': '工作线程数',
+                                            'type': 'number',
+                                            'hint': '并发执行命令的线程数，0 表示在事件线程中同步执行',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'queue_size',
+                                            'label': '队列容量',
+                                            'type': 'number',
+                                            'hint': '待执行事件的最大排队数，超出后丢弃',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'type_concurrency',
+                                            'label': '单类型并发数',
+                                            'type': 'number',
+                                            'hint': '同一事件类型的最大并发数，0 表示不限制',
+                                            'persistent-hint': True
                                         }
                                     }
                                 ]
@@ -193,17 +1075,67 @@ class EventExecutor(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12},
+                                'props': {'cols': 12, 'md': 3},
                                 'content': [
                                     {
-                                        'component': 'VTextarea',
+                                        'component': 'VSelect',
                                         'props': {
-                                            'model': 'bash_command',
-                                            'label': 'Bash 命令',
-                                            'placeholder': 'echo "Event: $MP_EVENT_TYPE" >> /var/log/mp-events.log',
-                                            'hint': '事件数据通过环境变量传递：MP_EVENT_TYPE, MP_EVENT_DATA, MP_EVENT_TIME',
-                                            'persistent-hint': True,
-                                            'rows': 3
+                                            'model': 'engine',
+                                            'label': '执行引擎',
+                                            'items': [
+                                                {"title": "工作线程", "value": "thread"},
+                                                {"title": "asyncio（单线程并发）", "value": "asyncio"},
+                                            ],
+                                            'hint': 'asyncio 由一个事件循环线程同时等待所有命令，适合大量并发的短命令',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'async_concurrency',
+                                            'label': 'asyncio 最大并发数',
+                                            'type': 'number',
+                                            'hint': 'asyncio 执行引擎同时执行的最大命令数',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'handler_workers',
+                                            'label': 'Python 处理函数线程数',
+                                            'type': 'number',
+                                            'hint': '执行 python / handler 规则的线程数',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'http_concurrency',
+                                            'label': 'HTTP 最大并发请求数',
+                                            'type': 'number',
+                                            'hint': 'http 规则同时发送的最大请求数',
+                                            'persistent-hint': True
                                         }
                                     }
                                 ]
@@ -215,137 +1147,1912 @@ class EventExecutor(_PluginBase):
                         'content': [
                             {
                                 'component': 'VCol',
-                                'props': {'cols': 12},
+                                'props': {'cols': 12, 'md': 5},
                                 'content': [
                                     {
-                                        'component': 'VAlert',
+                                        'component': 'VSelect',
                                         'props': {
-                                            'type': 'info',
-                                            'variant': 'tonal',
-                                            'style': 'white-space: pre-line;',
-                                            'text': '💡 环境变量说明：\n'
-                                                    '• MP_EVENT_TYPE：事件类型（如 transfer.complete）\n'
-                                                    '• MP_EVENT_DATA：事件数据（JSON 格式）\n'
-                                                    '• MP_EVENT_TIME：事件触发时间（ISO 格式）\n\n'
-                                                    '⚠️ 注意事项：\n'
-                                                    '• 建议使用 jq 工具解析 JSON 数据\n'
-                                                    '• 查看插件目录下的 README.md 获取详细示例\n'
-                                                    '• ⭐ 标记的事件是最常用的事件类型'
+                                            'model': 'priority_events',
+                                            'label': '高优先级事件',
+                                            'hint': '排队时优先执行，默认为标记 ⭐ 的事件',
+                                            'persistent-hint': True,
+                                            'multiple': True,
+                                            'chips': True,
+                                            'clearable': True,
+                                            'items': type_options
                                         }
                                     }
                                 ]
-                            }
-                        ]
-                    }
-                ]
-            }
-        ], {
-            "enabled": False,
-            "bash_command": "",
-            "event_type": "",  # 默认为空（全部事件）
-            "timeout": 60,
-            "log_events": False
-        }
-
-    def get_page(self) -> List[dict]:
-        """插件页面"""
-        pass
-
-    def stop_service(self):
-        """停止服务"""
-        pass
-
-    @staticmethod
-    def __to_dict(obj: Any) -> Any:
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'low_priority_events',
+                                            'label': '低优先级事件',
+                                            'hint': '排在其他事件之后执行，如 notice.message',
+                                            'persistent-hint': True,
+                                            'multiple': True,
+                                            'chips': True,
+                                            'clearable': True,
+                                            'items': type_options
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'starvation_ms',
+                                            'label': '最长等待（毫秒）',
+                                            'type': 'number',
+                                            'hint': '低优先级事件等待超过该时间后优先执行，0 表示严格按优先级',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'shards',
+                                            'label': '分片数',
+                                            'type': 'number',
+                                            'hint': '大于 0 时按分片字段将事件分配到 N 个串行线程，0 表示不分片',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 8},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'shard_key',
+                                            'label': '分片字段',
+                                            'placeholder': 'mediainfo.tmdb_id, transferinfo.target_diritem.path',
+                                            'hint': '同一字段值的事件按到达顺序依次执行，不同值并行执行；依次取第一个存在的字段',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'event_type',
+                                            'label': '监听的事件类型',
+                                            'hint': '选择要监听的单个事件类型、一类事件（🔀）或"全部事件"',
+                                            'persistent-hint': True,
+                                            'clearable': True,
+                                            'items': event_options
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'exclude_events',
+                                            'label': '排除的事件类型',
+                                            'hint': '不处理的事件，如 notice.message、user.message',
+                                            'persistent-hint': True,
+                                            'multiple': True,
+                                            'chips': True,
+                                            'clearable': True,
+                                            'items': type_options
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'pretty_json',
+                                            'label': '格式化 JSON',
+                                            'hint': '事件数据输出带缩进的 JSON，默认输出紧凑格式',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'max_depth',
+                                            'label': '最大转换深度',
+                                            'type': 'number',
+                                            'hint': '超出深度的对象输出为 "<max depth>"',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'max_nodes',
+                                            'label': '最大转换节点数',
+                                            'type': 'number',
+                                            'hint': '超出数量后剩余对象输出为 "<truncated>"',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'payload_transport',
+                                            'label': '事件数据传递方式',
+                                            'hint': '自动模式下超过阈值的数据改用内存文件，'
+                                                    '命令需读取 MP_EVENT_DATA_FILE（见说明）',
+                                            'persistent-hint': True,
+                                            'items': [
+                                                {"title": "自动（按大小选择）", "value": "auto"},
+                                                {"title": "环境变量 MP_EVENT_DATA", "value": "env"},
+                                                {"title": "内存文件 MP_EVENT_DATA_FILE", "value": "file"},
+                                                {"title": "标准输入", "value": "stdin"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'payload_threshold',
+                                            'label': '文件传递阈值（字节）',
+                                            'type': 'number',
+                                            'hint': '自动模式下数据超过该大小（默认 130048，略低于环境变量的 128KB 上限）'
+                                                    '时改用内存文件传递',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'env_allowlist',
+                                            'label': '传递的环境变量',
+                                            'placeholder': 'PYTHONPATH, LC_*, TG_*',
+                                            'hint': '逗号分隔，支持通配符；留空传递全部环境变量，配置后 PATH、HOME、LANG、TZ 等始终保留',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'output_log',
+                                            'label': '命令输出记录',
+                                            'hint': '逐行记录时输出产生即写入日志',
+                                            'persistent-hint': True,
+                                            'items': [
+                                                {"title": "失败时记录", "value": "failure"},
+                                                {"title": "逐行实时记录", "value": "stream"},
+                                                {"title": "不记录", "value": "off"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'output_head',
+                                            'label': '保留输出开头（字节）',
+                                            'type': 'number',
+                                            'hint': '每次执行保留的 stdout / stderr 开头部分',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'output_tail',
+                                            'label': '保留输出结尾（字节）',
+                                            'type': 'number',
+                                            'hint': '中间超出的部分只统计字节数，不占用内存',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'cpu_limit',
+                                            'label': 'CPU 时间上限（秒）',
+                                            'type': 'number',
+                                            'hint': '0 表示不限制，超出后命令被终止',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'memory_limit',
+                                            'label': '内存上限（MB）',
+                                            'type': 'number',
+                                            'hint': '虚拟内存（RLIMIT_AS），0 表示不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'open_files',
+                                            'label': '打开文件数上限',
+                                            'type': 'number',
+                                            'hint': '0 表示不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'nice',
+                                            'label': 'nice',
+                                            'type': 'number',
+                                            'hint': '0~19，越大优先级越低',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'ionice',
+                                            'label': 'I/O 优先级',
+                                            'items': [
+                                                {"title": "不修改", "value": ""},
+                                                {"title": "尽力而为（最低级）", "value": "best-effort:7"},
+                                                {"title": "空闲时", "value": "idle"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 8},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'fork_server',
+                                            'label': '使用独立的启动进程',
+                                            'hint': '命令由一个常驻的小进程启动，避免每次从 MoviePilot 进程 fork，事件密集时更快、内存更平稳',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 4},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'shell_pool',
+                                            'label': '预热 shell 数',
+                                            'type': 'number',
+                                            'hint': '保持已启动的 bash 等待执行命令，0 表示不预热',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'dedup_mode',
+                                            'label': '重复事件处理',
+                                            'hint': '按事件指纹合并重复事件',
+                                            'persistent-hint': True,
+                                            'items': [
+                                                {"title": "不处理", "value": "off"},
+                                                {"title": "去重（只执行第一个）", "value": "dedup"},
+                                                {"title": "防抖（只执行最后一个）", "value": "debounce"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'dedup_window',
+                                            'label': '去重窗口 / 防抖静默期（秒）',
+                                            'type': 'number',
+                                            'hint': '去重：窗口期内的重复事件被忽略；防抖：静默期后执行最后一个',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'dedup_keys',
+                                            'label': '指纹关键字段',
+                                            'placeholder': 'hash, mediainfo.tmdb_id',
+                                            'hint': '逗号分隔的字段路径，留空使用整个事件数据',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'dedup_events',
+                                            'label': '参与去重的事件',
+                                            'placeholder': 'site.refreshed, download.*',
+                                            'hint': '事件类型选择器，留空表示全部事件',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'rate_limit',
+                                            'label': '全局限流（次/分钟）',
+                                            'type': 'number',
+                                            'hint': '所有规则合计的执行速率，0 表示不限制；规则可单独配置 rate_limit',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'rate_burst',
+                                            'label': '突发次数',
+                                            'type': 'number',
+                                            'hint': '令牌桶容量，空闲后允许连续执行的次数',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'overflow_policy',
+                                            'label': '超限策略',
+                                            'hint': '超出限流时如何处理事件',
+                                            'persistent-hint': True,
+                                            'items': [
+                                                {"title": "排队等待", "value": "queue"},
+                                                {"title": "丢弃新事件", "value": "drop_newest"},
+                                                {"title": "丢弃最早的事件", "value": "drop_oldest"},
+                                                {"title": "抽样（每 N 个保留 1 个）", "value": "sample"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'rate_sample',
+                                            'label': '抽样间隔 N',
+                                            'type': 'number',
+                                            'hint': '抽样策略下每 N 个超限事件保留 1 个',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'retry_attempts',
+                                            'label': '最大执行次数',
+                                            'type': 'number',
+                                            'hint': '失败后重试，包含第一次执行，1 表示不重试',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'retry_backoff',
+                                            'label': '退避时间（秒）',
+                                            'type': 'number',
+                                            'hint': '第一次重试前的等待时间，之后每次翻倍',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'retry_max_backoff',
+                                            'label': '最大退避（秒）',
+                                            'type': 'number',
+                                            'hint': '两次执行之间的最长等待时间',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'retry_exit_codes',
+                                            'label': '可重试的退出码',
+                                            'hint': '逗号分隔，留空表示任意非 0 退出码',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'dead_letter_enabled',
+                                            'label': '死信队列',
+                                            'hint': '重试耗尽的事件保存到磁盘，可批量重新执行',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'breaker_enabled',
+                                            'label': '熔断器',
+                                            'hint': '规则持续失败时暂停执行，保护系统资源',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'breaker_ratio',
+                                            'label': '熔断失败比例（%）',
+                                            'type': 'number',
+                                            'hint': '最近执行中失败达到该比例时熔断',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'breaker_min_calls',
+                                            'label': '最少执行次数',
+                                            'type': 'number',
+                                            'hint': '执行次数达到后才按失败比例判断',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 2},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'breaker_timeouts',
+                                            'label': '连续超时次数',
+                                            'type': 'number',
+                                            'hint': '连续超时达到该次数时熔断，0 表示不按超时熔断',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'breaker_open_seconds',
+                                            'label': '熔断时间（秒）',
+                                            'type': 'number',
+                                            'hint': '熔断结束后试探执行一次，成功则恢复',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'journal_enabled',
+                                            'label': '记录执行日志',
+                                            'hint': '将事件数据与执行结果写入数据库，可查询与重放',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'journal_retention_days',
+                                            'label': '日志保留天数',
+                                            'type': 'number',
+                                            'hint': '超过天数的记录定期清理，0 表示不按时间清理',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'journal_max_events',
+                                            'label': '日志最大事件数',
+                                            'type': 'number',
+                                            'hint': '超出时清理最早的记录，0 表示不限制',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 3},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'journal_output_limit',
+                                            'label': '输出保留字符数',
+                                            'type': 'number',
+                                            'hint': '每次执行保留的标准输出 / 错误字符数',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'batch_window',
+                                            'label': '批处理窗口（毫秒）',
+                                            'type': 'number',
+                                            'hint': '窗口期内的事件合并为一批执行一次命令，0 表示不启用',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'batch_size',
+                                            'label': '单批最大事件数',
+                                            'type': 'number',
+                                            'hint': '达到该数量时立即执行，不等待窗口期结束',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'exec_mode',
+                                            'label': '执行模式',
+                                            'hint': '常驻进程模式下命令只启动一次，每个事件以一行 JSON 写入其标准输入',
+                                            'persistent-hint': True,
+                                            'items': [
+                                                {"title": "每个事件执行一次命令", "value": "spawn"},
+                                                {"title": "常驻进程（NDJSON 标准输入）", "value": "coprocess"},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12, 'md': 6},
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'coprocess_ack',
+                                            'label': '等待确认',
+                                            'hint': '常驻进程模式下，每个事件等待进程从标准输出回复一行',
+                                            'persistent-hint': True
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'bash_command',
+                                            'label': 'Bash 命令',
+                                            'placeholder': 'echo "Event: $MP_EVENT_TYPE" >> /var/log/mp-events.log',
+                                            'hint': '事件数据通过环境变量传递：MP_EVENT_TYPE, MP_EVENT_DATA, MP_EVENT_TIME',
+                                            'persistent-hint': True,
+                                            'rows': 3
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'rules',
+                                            'label': '规则列表（JSON）',
+                                            'placeholder': '[\n'
+                                                           '  {"name": "整理通知", "event": "transfer.complete", '
+                                                           '"command": "/scripts/notify.sh", "timeout": 30, "enabled": true}\n'
+                                                           ']',
+                                            'hint': '每条规则独立配置监听的事件（event）、命令（command）、超时（timeout）、'
+                                                    '条件（condition）与开关（enabled），'
+                                                    '与上方默认命令同时生效',
+                                            'persistent-hint': True,
+                                            'rows': 6
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {'cols': 12},
+                                'content': [
+                                    {
+                                        'component': 'VAlert',
+                                        'props': {
+                                            'type': 'info',
+                                            'variant': 'tonal',
+                                            'style': 'white-space: pre-line;',
+                                            'text': '💡 环境变量说明：\n'
+                                                    '• MP_EVENT_TYPE：事件类型（如 transfer.complete）\n'
+                                                    '• MP_EVENT_DATA：事件数据（JSON 格式），数据较大时改为 MP_EVENT_DATA_FILE 文件路径\n'
+                                                    '• MP_EVENT_TIME：事件触发时间（ISO 格式）\n'
+                                                    '• MP_EVENT_BATCH / MP_EVENT_COUNT：批处理模式下的事件数组及事件数\n\n'
+                                                    '⚠️ 注意事项：\n'
+                                                    '• 建议使用 jq 工具解析 JSON 数据\n'
+                                                    '• 查看插件目录下的 README.md 获取详细示例\n'
+                                                    '• ⭐ 标记的事件是最常用的事件类型'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ], {
+            "enabled": False,
+            "bash_command": "",
+            "event_type": "",  # 默认为空（全部事件）
+            "exclude_events": [],
+            "timeout": 60,
+            "log_events": False,
+            "output_log": "failure",
+            "output_head": 4096,
+            "output_tail": 4096,
+            "cpu_limit": 0,
+            "memory_limit": 0,
+            "open_files": 0,
+            "nice": 0,
+            "ionice": "",
+            "fork_server": False,
+            "shell_pool": 0,
+            "max_workers": 4,
+            "engine": "thread",
+            "async_concurrency": 100,
+            "handler_workers": 4,
+            "http_concurrency": 8,
+            "queue_size": 1000,
+            "type_concurrency": 0,
+            "priority_events": PRIORITY_EVENTS,
+            "low_priority_events": [],
+            "starvation_ms": 2000,
+            "shards": 0,
+            "shard_key": "",
+            "exec_mode": "spawn",
+            "coprocess_ack": False,
+            "batch_window": 0,
+            "batch_size": 100,
+            "payload_transport": "auto",
+            "payload_threshold": DEFAULT_THRESHOLD,
+            "env_allowlist": "",
+            "dedup_mode": "off",
+            "dedup_window": 60,
+            "dedup_keys": "",
+            "dedup_events": "",
+            "dedup_size": 1024,
+            "rate_limit": 0,
+            "rate_burst": 10,
+            "overflow_policy": "queue",
+            "rate_backlog": 1000,
+            "rate_sample": 10,
+            "retry_attempts": 1,
+            "retry_backoff": 5,
+            "retry_max_backoff": 300,
+            "retry_exit_codes": "",
+            "dead_letter_enabled": False,
+            "breaker_enabled": False,
+            "breaker_ratio": 50,
+            "breaker_min_calls": 10,
+            "breaker_timeouts": 3,
+            "breaker_open_seconds": 60,
+            "journal_enabled": False,
+            "journal_retention_days": 7,
+            "journal_max_events": 100000,
+            "journal_output_limit": 4096,
+            "pretty_json": False,
+            "max_depth": 32,
+            "max_nodes": 100000,
+            "rules": ""
+        }
+
+    def get_page(self) -> List[dict]:
+        """插件页面：执行指标仪表盘"""
+        summary = self._metrics_summary()
+        rules, event_types = summary["rules"], summary["event_types"]
+        ms = lambda seconds: f"{seconds * 1000:.1f}"
+        cards = [
+            ("收到事件", sum(item["events"] for item in event_types.values())),
+            ("未执行事件", sum(item["ignored"] for item in event_types.values())),
+            ("命令执行", sum(item["executions"] for item in rules.values())),
+            ("执行失败", sum(item["failed"] + item["errors"] for item in rules.values())),
+            ("执行超时", sum(item["timeouts"] for item in rules.values())),
+            ("排队中", self._pool.qsize() if self._pool else 0),
+        ]
+        breaker_names = {"closed": "关闭", "open": "打开", "half_open": "半开"}
+        stage_names = {
+            "queue_wait_seconds": "排队等待",
+            "serialize_seconds": "序列化",
+            "prepare_seconds": "数据传递准备",
+            "run_seconds": "命令执行",
+        }
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    {
+                        'component': 'VCol',
+                        'props': {'cols': 6, 'md': 2},
+                        'content': [
+                            {
+                                'component': 'VCard',
+                                'props': {'variant': 'tonal'},
+                                'content': [
+                                    {'component': 'VCardText', 'props': {'class': 'text-caption'}, 'text': title},
+                                    {'component': 'VCardText', 'props': {'class': 'text-h6 pt-0'}, 'text': f"{value:g}"}
+                                ]
+                            }
+                        ]
+                    } for title, value in cards
+                ]
+            },
+            self._page_table(
+                "处理阶段耗时（毫秒）",
+                ["阶段", "次数", "平均", "P50", "P95", "P99", "最大"],
+                [[stage_names[name], f"{item['count']:g}", ms(item["avg"]), ms(item["p50"]), ms(item["p95"]),
+                  ms(item["p99"]), ms(item["max"])] for name, item in summary["stages"].items()]
+            ),
+            self._page_table(
+                "规则",
+                ["规则", "执行", "失败", "超时", "熔断", "P50（毫秒）", "P95（毫秒）"],
+                [[name, f"{item['executions']:g}", f"{item['failed'] + item['errors']:g}", f"{item['timeouts']:g}",
+                  breaker_names.get(item["breaker"], "-"), ms(item["run"]["p50"]), ms(item["run"]["p95"])]
+                 for name, item in rules.items()]
+            ),
+            self._page_table(
+                "事件类型",
+                ["事件类型", "收到", "未执行", "数据量（KB）", "序列化 P95（毫秒）", "排队 P95（毫秒）"],
+                [[name, f"{item['events']:g}", f"{item['ignored']:g}", f"{item['payload_bytes'] / 1024:.1f}",
+                  ms(item["serialize"]["p95"]), ms(item["queue_wait"]["p95"])] for name, item in event_types.items()]
+            ),
+        ]
+
+    @staticmethod
+    def _page_table(title: str, headers: List[str], rows: List[List[str]]) -> dict:
         """
-        递归将对象转换为字典（参考官方 webhook 插件实现）
-        """
-        if isinstance(obj, dict):
-            return {k: EventExecutor.__to_dict(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [EventExecutor.__to_dict(item) for item in obj]
-        elif isinstance(obj, tuple):
-            return tuple(EventExecutor.__to_dict(list(obj)))
-        elif isinstance(obj, set):
-            return list(EventExecutor.__to_dict(list(obj)))
-        elif hasattr(obj, 'to_dict'):
-            return EventExecutor.__to_dict(obj.to_dict())
-        elif hasattr(obj, '__dict__'):
-            return EventExecutor.__to_dict(obj.__dict__)
-        elif isinstance(obj, (int, float, str, bool, type(None))):
-            return obj
-        else:
-            return str(obj)
+        插件页面中的表格卡片
+        """
+        return {
+            'component': 'VCard',
+            'props': {'class': 'mt-3'},
+            'content': [
+                {'component': 'VCardTitle', 'text': title},
+                {
+                    'component': 'VTable',
+                    'props': {'hover': True, 'density': 'compact'},
+                    'content': [
+                        {
+                            'component': 'thead',
+                            'content': [
+                                {
+                                    'component': 'tr',
+                                    'content': [{'component': 'th', 'text': header} for header in headers]
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'tbody',
+                            'content': [
+                                {
+                                    'component': 'tr',
+                                    'content': [{'component': 'td', 'text': cell} for cell in row]
+                                } for row in rows
+                            ] or [
+                                {
+                                    'component': 'tr',
+                                    'content': [{'component': 'td', 'props': {'colspan': len(headers)},
+                                                 'text': '暂无数据'}]
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+
+    def stop_service(self):
+        """停止服务，等待队列中的事件执行完成"""
+        if self._replay:
+            replay, self._replay = self._replay, None
+            replay.stop()
+        if self._debouncer:
+            # 防抖等待中的事件立即执行
+            debouncer, self._debouncer = self._debouncer, None
+            debouncer.stop()
+        if self._dedup_cache is not None:
+            stats = self._dedup_cache.stats()
+            logger.info(f"[事件执行器] 去重命中 {stats['hits']} 次，未命中 {stats['misses']} 次")
+        self._fingerprint = None
+        self._dedup_cache = None
+        if self._limiter:
+            limiter, self._limiter = self._limiter, None
+            remaining = limiter.stop()
+            if remaining:
+                logger.warning(f"[事件执行器] 停止服务时仍有 {remaining} 个限流积压事件未执行，已丢弃")
+        if self._timer is not None:
+            # 等待重试的事件不再执行，加入死信队列以便重启后处理
+            timer, self._timer = self._timer, None
+            pending = timer.stop()
+            for job in pending:
+                for rule in job.rules:
+                    self._dead_letter(job.event, rule, job.attempt - 1, "stopped", error="停止服务时等待重试")
+            if pending and not self._dead_letters:
+                logger.warning(f"[事件执行器] 停止服务时仍有 {len(pending)} 个事件等待重试，已丢弃")
+        if self._batcher:
+            # 先刷新未满的批次，再等待工作线程执行
+            batcher, self._batcher = self._batcher, None
+            batcher.stop()
+        if self._pool:
+            pool, self._pool = self._pool, None
+            remaining = pool.stop(timeout=self._timeout)
+            if remaining:
+                logger.warning(f"[事件执行器] 停止服务时仍有 {remaining} 个事件未执行，已丢弃")
+            if pool.dropped:
+                logger.warning(f"[事件执行器] 运行期间因队列已满丢弃 {pool.dropped} 个事件")
+        if self._processes is not None:
+            # 等待超时后仍在执行的命令连同其子进程一起终止
+            processes, self._processes = self._processes, None
+            killed = processes.kill_all()
+            if killed:
+                logger.warning(f"[事件执行器] 停止服务时终止了 {killed} 个仍在执行的命令")
+        if self._shell_pool:
+            shell_pool, self._shell_pool = self._shell_pool, None
+            shell_pool.stop()
+        if self._spawner:
+            spawner, self._spawner = self._spawner, None
+            spawner.stop()
+        if self._handlers:
+            # 执行队列已停止，不再有等待结果的调用
+            handlers, self._handlers = self._handlers, None
+            handlers.stop()
+        if self._http:
+            http_sink, self._http = self._http, None
+            http_sink.stop()
+        self._limits = {}
+        if self._coprocesses:
+            coprocesses, self._coprocesses = self._coprocesses, {}
+            for coprocess in coprocesses.values():
+                coprocess.stop()
+        if self._dead_letters:
+            dead_letters, self._dead_letters = self._dead_letters, None
+            dead_letters.close()
+        self._retry_policies = {}
+        self._breakers = {}
+        if self._journal:
+            # 最后关闭，写入停止前执行完成的记录
+            journal, self._journal = self._journal, None
+            journal.close()
 
-    def _should_handle_event(self, event_type: str) -> bool:
+    @staticmethod
+    def __to_dict(obj: Any) -> Any:
         """
-        判断是否应该处理该事件
-        空字符串表示监听所有事件
+        将对象转换为字典（使用默认深度与数量限制）
         """
-        if not self._event_type:
-            # 未配置或配置为空字符串，处理所有事件
-            return True
-        # 精确匹配配置的事件类型
-        return event_type == self._event_type
+        return _default_serializer.to_dict(obj)
 
-    def _execute_bash_command(self, event: Event):
+    def _default_rule(self) -> Optional[Rule]:
         """
-        执行 Bash 命令
-        将事件信息作为环境变量传递
+        由「Bash 命令」「监听的事件类型」配置构成的默认规则
         """
         if not self._bash_command:
-            return
+            return None
+        try:
+            return Rule(name=DEFAULT_RULE_NAME,
+                        command=self._bash_command,
+                        events=tuple(split_patterns(self._event_type)),
+                        exclude=tuple(self._exclude_events),
+                        timeout=self._timeout)
+        except ValueError as e:
+            logger.error(f"[事件执行器] 监听的事件类型无效：{str(e)}")
+            return None
+
+    def _compile_rules(self) -> RuleIndex:
+        """
+        编译默认规则与规则列表为事件类型索引
+        """
+        rules = []
+        default_rule = self._default_rule()
+        if default_rule:
+            rules.append(default_rule)
+        rules.extend(self._rules)
+        return RuleIndex(rules, known_types=[event_type.value for event_type in EventType])
+
+    def _compile_lanes(self) -> List[Tuple[int, EventSelector]]:
+        """
+        编译优先级车道的事件选择器，高优先级优先匹配
+        """
+        selectors = []
+        for lane, patterns in ((LANE_HIGH, self._priority_events), (LANE_LOW, self._low_priority_events)):
+            if not patterns:
+                continue
+            try:
+                selectors.append((lane, EventSelector(patterns)))
+            except ValueError as e:
+                logger.error(f"[事件执行器] 优先级事件配置无效：{str(e)}")
+        return selectors
+
+    def _compile_shard_key(self) -> List[Tuple[Any, ...]]:
+        """
+        编译分片字段路径，未启用分片或路径无效时返回空列表
+        """
+        if self._shards <= 0 or not self._shard_key:
+            return []
+        try:
+            return [compile_path(path) for path in self._shard_key]
+        except ValueError as e:
+            logger.error(f"[事件执行器] 分片字段无效，不启用分片执行：{str(e)}")
+            return []
+
+    def _shard_key_of(self, event: Event) -> Optional[str]:
+        """
+        事件的分片 key：第一个存在的分片字段值，都不存在时为 None（不保证顺序）
+        """
+        for path in self._shard_paths:
+            value = resolve_path(event.event_data, path)
+            if value is not MISSING and value is not None:
+                return str(value)
+        return None
+
+    def _lane_of(self, event: Event) -> int:
+        """
+        事件所在的优先级车道（按事件类型缓存）
+        """
+        event_type = event.event_type.value
+        lane = self._lane_cache.get(event_type)
+        if lane is None:
+            lane = next((lane for lane, selector in self._lane_selectors if selector.matches(event_type)),
+                        LANE_NORMAL)
+            self._lane_cache[event_type] = lane
+        return lane
 
-        # 转换事件数据为字典
-        event_data_dict = self.__to_dict(event.event_data)
+    def _match_rules(self, event: Event) -> List[Rule]:
+        """
+        查找匹配事件类型且条件成立的规则
+        """
+        if self._rule_index is None:
+            self._rule_index = self._compile_rules()
+        return self._rule_index.match_event(event.event_type.value, event.event_data)
 
-        # 构建事件信息（参考 webhook 插件的格式）
-        event_info = {
+    def _build_event_info(self, event: Event) -> Dict[str, Any]:
+        """
+        构建事件信息（参考 webhook 插件的格式）
+        """
+        return {
             "type": event.event_type.value,
-            "data": event_data_dict
+            "data": self._serializer.to_dict(event.event_data)
         }
 
-        # 序列化为 JSON
+    def _submit_batch(self, jobs: List[EventJob]) -> bool:
+        """
+        提交一批事件执行
+        :return: 是否全部提交（执行队列已满时为 False）
+        """
+        if not self._pool:
+            self._execute_batch(jobs)
+            return True
+        if self._shard_paths:
+            # 按分片拆分批次：同一 key 的事件仍由同一分片按顺序执行，不同分片的事件并行执行
+            groups: Dict[Optional[int], Tuple[Optional[str], List[EventJob]]] = {}
+            for job in jobs:
+                key = self._shard_key_of(job.event)
+                shard = self._pool.shard_of(key) if key is not None else None
+                groups.setdefault(shard, (key, []))[1].append(job)
+            parts = list(groups.values())
+        else:
+            # 单一事件类型的批次按事件类型计入单类型并发数
+            event_types = {job.event.event_type.value for job in jobs}
+            parts = [(event_types.pop() if len(event_types) == 1 else "batch", jobs)]
+        submitted = True
+        for key, part in parts:
+            if not self._pool.submit(key, part, lane=min(self._lane_of(job.event) for job in part)):
+                submitted = False
+                metrics = self._get_metrics()
+                for job in part:
+                    metrics.inc("events_ignored_total", event_type=job.event.event_type.value, reason="queue_full")
+                logger.warning(f"[事件执行器] 执行队列已满，丢弃 {len(part)} 个批处理事件")
+        return submitted
+
+    def _process_job(self, job: Any):
+        """
+        工作线程任务入口：单个事件或一批事件
+        """
+        self._drive(self._job_steps(job))
+
+    async def _process_job_async(self, job: Any):
+        """
+        asyncio 执行引擎的任务入口，在事件循环线程中执行
+        """
+        await self._drive_async(self._job_steps(job))
+
+    @staticmethod
+    def _drive(steps: Generator[Union[Launch, HandlerTask, HttpTask], Any, Any]) -> Any:
+        """
+        在当前线程中执行：逐个启动生成器请求的命令（或等待处理函数与 HTTP 请求），结束后送回结果（异常抛回生成器）
+        """
+        try:
+            step = next(steps)
+            while True:
+                try:
+                    if isinstance(step, Launch):
+                        result = process.run_process(step.command, **step.options)
+                    else:
+                        result = step.result()
+                except BaseException as e:
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    async def _drive_async(steps: Generator[Union[Launch, HandlerTask, HttpTask], Any, Any]) -> Any:
+        """
+        在事件循环中执行：与 _drive 相同，等待命令、处理函数与 HTTP 请求时不占用线程
+        """
         try:
-            event_data_json = json.dumps(event_info, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"[事件执行器] 事件数据序列化失败：{str(e)}")
+            step = next(steps)
+            while True:
+                try:
+                    if isinstance(step, Launch):
+                        result = await aioengine.run_process(step.command, **step.options)
+                    else:
+                        result = await step.result_async()
+                except BaseException as e:
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def _job_steps(self, job: Any) -> Generator[Launch, Any, None]:
+        """
+        单个事件或一批事件的执行步骤
+        """
+        jobs = [job] if isinstance(job, EventJob) else job
+        metrics = self._get_metrics()
+        now = time.monotonic()
+        for item in jobs:
+            if item.created:
+                metrics.observe("queue_wait_seconds", now - item.created, event_type=item.event.event_type.value)
+        if isinstance(job, EventJob):
+            yield from self._event_steps(job.event, job.rules,
+                                         queue_wait=now - job.created if job.created else None,
+                                         replay_of=job.replay_of, attempt=job.attempt)
+        else:
+            yield from self._batch_steps(job)
+
+    def _process_event(self, event: Event, rules: List[Rule], queue_wait: Optional[float] = None,
+                       replay_of: Optional[int] = None, attempt: int = 1):
+        """
+        处理单个事件：事件数据只转换、序列化一次，再分发给所有匹配的规则
+        执行失败的规则按重试策略重试；启用执行日志时，全部规则执行完成后记录事件数据与每个规则的结果
+        """
+        self._drive(self._event_steps(event, rules, queue_wait, replay_of, attempt))
+
+    def _event_steps(self, event: Event, rules: List[Rule], queue_wait: Optional[float] = None,
+                     replay_of: Optional[int] = None, attempt: int = 1) -> Generator[Launch, Any, None]:
+        """
+        单个事件的执行步骤（见 _process_event），每个规则的命令以启动请求产出
+        """
+        if not rules:
+            return
+
+        metrics = self._get_metrics()
+        event_type = event.event_type.value
+        start = time.perf_counter()
+        event_info = self._build_event_info(event)
+        # 转换耗时，计入第一次序列化
+        convert_time = time.perf_counter() - start
+        event_time = datetime.now().isoformat()
+        # 按需生成：普通规则使用的 JSON、常驻进程使用的单行 JSON 与 HTTP 规则的请求体
+        event_data_json = None
+        event_line = None
+        http_json = None
+        executions: List[Execution] = []
+
+        if self._log_events:
+            logger.info(f"[事件执行器] 事件类型：{event.event_type.value}，匹配规则：{len(rules)}")
+
+        for rule in rules:
+            breaker = self._breakers.get(rule.name)
+            if breaker is not None and not breaker.allow():
+                execution = self._short_circuit(rule)
+                executions.append(execution)
+                self._handle_result(event, rule, execution, attempt, event_info)
+                continue
+            if rule.handler is not None:
+                execution = yield from self._handler_steps(rule, event_info)
+                executions.append(execution)
+                self._handle_result(event, rule, execution, attempt, event_info)
+                continue
+            coprocess = self._coprocesses.get(rule.name)
+            try:
+                if coprocess:
+                    if event_line is None:
+                        start = time.perf_counter()
+                        event_line = to_json({**event_info, "time": event_time})
+                        self._observe_payload(event_type, event_line, time.perf_counter() - start + convert_time)
+                        convert_time = 0.0
+                    execution = self._send_to_coprocess(coprocess, rule, event, event_line)
+                    executions.append(execution)
+                    self._handle_result(event, rule, execution, attempt, event_info)
+                    continue
+                if rule.http is not None:
+                    if http_json is None and rule.http.body is None:
+                        start = time.perf_counter()
+                        http_json = to_json(event_info)
+                        self._observe_payload(event_type, http_json, time.perf_counter() - start + convert_time)
+                        convert_time = 0.0
+                elif event_data_json is None:
+                    start = time.perf_counter()
+                    event_data_json = to_json(event_info, pretty=self._pretty_json)
+                    self._observe_payload(event_type, event_data_json, time.perf_counter() - start + convert_time)
+                    convert_time = 0.0
+                    if self._log_events:
+                        logger.debug(f"[事件执行器] 事件数据：\n{event_data_json}")
+            except Exception as e:
+                # 与其他执行失败一样计入指标、熔断、重试与执行日志，继续执行其余规则
+                execution = self._serialization_failed(rule, e)
+                executions.append(execution)
+                self._handle_result(event, rule, execution, attempt, event_info)
+                continue
+
+            if rule.http is not None:
+                execution = yield from self._http_steps(rule, event_info["data"], http_json)
+                executions.append(execution)
+                self._handle_result(event, rule, execution, attempt, event_info)
+                continue
+
+            # 在基础环境变量上叠加事件变量
+            env = {**self._get_base_env(),
+                   'MP_EVENT_TYPE': event.event_type.value,
+                   'MP_EVENT_TIME': event_time}
+            execution = yield from self._command_steps(rule, env, 'MP_EVENT_DATA', event_data_json, event=event)
+            executions.append(execution)
+            self._handle_result(event, rule, execution, attempt, event_info)
+
+        if self._journal:
+            self._journal_event(event_type, event_info, executions, queue_wait, replay_of)
+
+    def _handle_result(self, event: Event, rule: Rule, execution: Execution, attempt: int,
+                       event_info: Optional[Dict[str, Any]] = None):
+        """
+        记录执行结果到规则的熔断器；执行失败时按规则的重试策略在时间轮上安排重试，
+        不再重试或被熔断跳过的事件加入死信队列
+        """
+        short_circuited = execution.status == "short_circuit"
+        breaker = self._breakers.get(rule.name)
+        if breaker is not None and not short_circuited:
+            breaker.record(execution.status)
+        if execution.status == "ok":
             return
+        policy = self._retry_policies.get(rule.name)
+        if (not short_circuited and self._timer is not None and policy
+                and policy.should_retry(execution.status, execution.exit_code, attempt)):
+            delay = policy.delay(attempt)
+            if self._timer.schedule(delay, EventJob(event, [rule], attempt=attempt + 1)):
+                self._get_metrics().inc("retries_total", rule=rule.name)
+                logger.warning(f"[事件执行器] 规则 {rule.name} 第 {attempt} 次执行失败，{delay:.1f}秒后重试")
+                return
+        self._dead_letter(event, rule, attempt, execution.status, execution.exit_code,
+                          execution.stderr, event_info)
+
+    def _render_argv(self, rule: Rule, event: Optional[Event]) -> List[str]:
+        """
+        按原始事件数据生成 argv 规则的命令参数，字典与对象字段使用插件的序列化设置输出为 JSON
+        """
+        return rule.argv.render(event.event_data if event else None,
+                                dumps=lambda value: to_json(self._serializer.to_dict(value)))
+
+    def _observe_usage(self, rule: Rule, usage: Any):
+        """
+        记录 wait4 统计的资源使用：CPU 时间与最大常驻内存（Linux 下 ru_maxrss 单位为 KB）
+        """
+        metrics = self._get_metrics()
+        metrics.observe("cpu_seconds", usage.ru_utime + usage.ru_stime, rule=rule.name)
+        metrics.observe("max_rss_bytes", usage.ru_maxrss * 1024, rule=rule.name)
 
-        # 准备环境变量
-        env = os.environ.copy()
-        env['MP_EVENT_TYPE'] = event.event_type.value
-        env['MP_EVENT_DATA'] = event_data_json
-        env['MP_EVENT_TIME'] = datetime.now().isoformat()
+    @staticmethod
+    def _output_logger(rule: Rule, name: str) -> Callable[[str], None]:
+        """
+        逐行实时记录命令输出
+        """
+        def log_line(line: str):
+            logger.info(f"[事件执行器] 规则 {rule.name} {name}：{line}")
+        return log_line
 
+    def _short_circuit(self, rule: Rule) -> Execution:
+        """
+        规则熔断中，跳过执行
+        """
+        self._get_metrics().inc("executions_total", rule=rule.name, status="short_circuit")
         if self._log_events:
-            logger.info(f"[事件执行器] 事件类型：{event.event_type.value}")
-            logger.debug(f"[事件执行器] 事件数据：\n{event_data_json}")
+            logger.info(f"[事件执行器] 规则 {rule.name} 熔断中，跳过执行")
+        return Execution(rule=rule.name, status="short_circuit")
+
+    def _serialization_failed(self, rule: Rule, error: Exception, batch: bool = False) -> Execution:
+        """
+        事件数据序列化失败，记为规则的执行异常
+        """
+        message = f"{'批处理' if batch else ''}事件数据序列化失败：{str(error)}"
+        logger.error(f"[事件执行器] 规则 {rule.name} {message}")
+        self._get_metrics().inc("executions_total", rule=rule.name, status="error")
+        return Execution(rule=rule.name, status="error", stderr=message)
+
+    def _dead_letter(self, event: Event, rule: Rule, attempts: int, status: str, exit_code: Optional[int] = None,
+                     error: str = "", event_info: Optional[Dict[str, Any]] = None):
+        """
+        将事件加入死信队列（未启用时忽略）
+        """
+        if not self._dead_letters:
+            return
+        event_type = event.event_type.value
+        try:
+            data = event_info["data"] if event_info is not None else self._serializer.to_dict(event.event_data)
+            payload = to_json(data)
+        except Exception as e:
+            logger.error(f"[事件执行器] 死信事件数据序列化失败：{str(e)}")
+            payload = None
+        if self._dead_letters.add(event_type, rule.name, payload, attempts, status, exit_code, error):
+            self._get_metrics().inc("dead_letters_total", rule=rule.name)
+            logger.warning(f"[事件执行器] 规则 {rule.name} 执行 {attempts} 次仍失败，已加入死信队列：{event_type}")
+
+    def _journal_event(self, event_type: str, event_info: Optional[Dict[str, Any]], executions: List[Execution],
+                       queue_wait: Optional[float] = None, replay_of: Optional[int] = None):
+        """
+        记录事件数据（转换后的 data 部分，转换失败时为空）与执行结果到执行日志
+        """
+        try:
+            payload = to_json(event_info["data"]) if event_info is not None else None
+        except Exception as e:
+            logger.error(f"[事件执行器] 执行日志事件数据序列化失败：{str(e)}")
+            payload = None
+        self._journal.record(event_type, payload, executions, queue_wait=queue_wait, replay_of=replay_of)
+
+    def _get_base_env(self) -> Dict[str, str]:
+        """
+        获取基础环境变量（未调用 init_plugin 时按当前配置构建并缓存）
+        """
+        if self._base_env is None:
+            self._base_env = build_base_env(self._env_allowlist)
+        return self._base_env
+
+    def _get_metrics(self) -> Metrics:
+        """
+        获取指标（未调用 init_plugin 时创建）
+        """
+        if self._metrics is None:
+            self._metrics = Metrics()
+        return self._metrics
+
+    def _observe_payload(self, event_type: str, payload: str, elapsed: float):
+        """
+        记录事件数据的序列化耗时与字节数
+        """
+        metrics = self._get_metrics()
+        size = len(payload.encode("utf-8"))
+        metrics.observe("serialize_seconds", elapsed, event_type=event_type)
+        metrics.observe("payload_bytes", size, event_type=event_type)
+        metrics.inc("payload_bytes_total", size, event_type=event_type)
+
+    def _send_to_coprocess(self, coprocess: Coprocess, rule: Rule, event: Event, line: str) -> Execution:
+        """
+        将事件以一行 JSON 写入规则的常驻进程标准输入
+        """
+        metrics = self._get_metrics()
+        start = time.perf_counter()
+        sent = coprocess.send(line)
+        duration = time.perf_counter() - start
+        status = "ok" if sent else "failed"
+        metrics.observe("run_seconds", duration, rule=rule.name)
+        metrics.inc("executions_total", rule=rule.name, status=status)
+        if not sent:
+            logger.error(f"[事件执行器] 规则 {rule.name} 事件发送到常驻进程失败：{event.event_type.value}")
+        return Execution(rule=rule.name, status=status, duration=duration)
+
+    def _execute_bash_command(self, event: Event):
+        """
+        执行默认规则的 Bash 命令
+        将事件信息作为环境变量传递
+        """
+        default_rule = self._default_rule()
+        if not default_rule:
+            return
+        self._process_event(event, [default_rule])
+
+    def _execute_batch(self, jobs: List[EventJob]):
+        """
+        整批执行 Bash 命令，每个规则对其匹配的事件执行一次
+        MP_EVENT_BATCH 为事件信息的 JSON 数组，MP_EVENT_COUNT 为事件数
+        """
+        self._drive(self._batch_steps(jobs))
+
+    def _batch_steps(self, jobs: List[EventJob]) -> Generator[Launch, Any, None]:
+        """
+        一批事件的执行步骤（见 _execute_batch）
+        """
+        if not jobs:
+            return
 
+        # 每个事件只转换一次，供所有规则共用
+        event_infos: Dict[int, Dict[str, Any]] = {}
+        # 事件 -> 各规则的执行结果，供执行日志使用
+        executions: Dict[int, List[Execution]] = {}
+        for rule in self._rule_index.rules if self._rule_index else []:
+            matched_jobs = [job for job in jobs if rule in job.rules]
+            if not matched_jobs:
+                continue
+            matched = [job.event for job in matched_jobs]
+            breaker = self._breakers.get(rule.name)
+            if breaker is not None and not breaker.allow():
+                execution = self._short_circuit(rule)
+                for job in matched_jobs:
+                    info = event_infos.get(id(job.event)) or self._build_event_info(job.event)
+                    event_infos[id(job.event)] = info
+                    executions.setdefault(id(job.event), []).append(execution)
+                    self._handle_result(job.event, rule, execution, job.attempt, info)
+                continue
+            fields = rule.argv.fields if rule.argv is not None else rule.http.fields if rule.http is not None else ()
+            if rule.handler is not None or fields:
+                # 处理函数以单个事件为参数、参数与请求模板按事件取值，批次中的事件逐个执行
+                for job in matched_jobs:
+                    try:
+                        info = event_infos.get(id(job.event)) or self._build_event_info(job.event)
+                        event_infos[id(job.event)] = info
+                        payload = (None if rule.handler is not None
+                                   else to_json(info) if rule.http is not None
+                                   else to_json(info, pretty=self._pretty_json))
+                    except Exception as e:
+                        execution = self._serialization_failed(rule, e)
+                    else:
+                        if rule.handler is not None:
+                            execution = yield from self._handler_steps(rule, info)
+                        elif rule.http is not None:
+                            execution = yield from self._http_steps(rule, info["data"], payload)
+                        else:
+                            env = {**self._get_base_env(),
+                                   'MP_EVENT_TYPE': job.event.event_type.value,
+                                   'MP_EVENT_TIME': datetime.now().isoformat()}
+                            execution = yield from self._command_steps(rule, env, 'MP_EVENT_DATA', payload,
+                                                                       event=job.event)
+                    executions.setdefault(id(job.event), []).append(execution)
+                    self._handle_result(job.event, rule, execution, job.attempt, event_infos.get(id(job.event)))
+                continue
+            try:
+                start = time.perf_counter()
+                for event in matched:
+                    if id(event) not in event_infos:
+                        event_infos[id(event)] = self._build_event_info(event)
+                batch_json = to_json([event_infos[id(event)] for event in matched],
+                                     pretty=self._pretty_json)
+                self._observe_payload("batch", batch_json, time.perf_counter() - start)
+            except Exception as e:
+                # 规则匹配的每个事件都记为执行异常，继续执行其余规则
+                execution = self._serialization_failed(rule, e, batch=True)
+                for job in matched_jobs:
+                    executions.setdefault(id(job.event), []).append(execution)
+                    self._handle_result(job.event, rule, execution, job.attempt, event_infos.get(id(job.event)))
+                continue
+
+            env = {**self._get_base_env(),
+                   'MP_EVENT_COUNT': str(len(matched)),
+                   'MP_EVENT_TIME': datetime.now().isoformat()}
+
+            if self._log_events:
+                logger.info(f"[事件执行器] 规则 {rule.name} 批处理事件数：{len(matched)}")
+
+            if rule.http is not None:
+                # 请求体为事件信息的 JSON 数组，与 MP_EVENT_BATCH 相同
+                execution = yield from self._http_steps(rule, None, batch_json)
+            else:
+                execution = yield from self._command_steps(rule, env, 'MP_EVENT_BATCH', batch_json)
+            for job in matched_jobs:
+                executions.setdefault(id(job.event), []).append(execution)
+                self._handle_result(job.event, rule, execution, job.attempt, event_infos[id(job.event)])
+
+        if self._journal:
+            now = time.monotonic()
+            for job in jobs:
+                if id(job.event) in executions:
+                    self._journal_event(job.event.event_type.value, event_infos.get(id(job.event)),
+                                        executions[id(job.event)],
+                                        queue_wait=now - job.created if job.created else None,
+                                        replay_of=job.replay_of)
+
+    def _command_steps(self, rule: Rule, env: Dict[str, str], payload_name: str, payload: str,
+                       event: Optional[Event] = None) -> Generator[Launch, Any, Execution]:
+        """
+        执行规则的 Bash 命令并记录结果：产出启动请求，由调用方执行后送回 ProcessResult
+        事件数据按配置的传递方式通过环境变量、临时文件（{payload_name}_FILE）或标准输入传递
+        配置了 argv 的规则按事件字段生成参数，不经过 shell 直接执行
+        """
+        metrics = self._get_metrics()
+        status = "error"
+        exit_code, stdout, stderr = None, "", ""
+        stream = self._output_log == "stream"
+        stdout_buffer = OutputBuffer(self._output_head, self._output_tail,
+                                     on_line=self._output_logger(rule, "输出") if stream else None)
+        stderr_buffer = OutputBuffer(self._output_head, self._output_tail,
+                                     on_line=self._output_logger(rule, "错误输出") if stream else None)
+        start = time.perf_counter()
         try:
-            # 执行命令，使用配置的超时时间
-            result = subprocess.run(
-                self._bash_command,
-                shell=True,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=self._timeout
-            )
-
-            if result.returncode != 0:
+            with open_payload(payload_name, payload,
+                              transport=self._payload_transport,
+                              threshold=self._payload_threshold) as channel:
+                env.update(channel.env)
+                command = self._render_argv(rule, event) if rule.argv is not None else rule.command
+                shell = rule.argv is None
+                # 使用预热 shell 的规则由 bash 执行：命中时交给空闲的 bash，未命中时新启动 bash
+                worker = None
+                shell_pool = self._rule_shell_pool(rule)
+                if shell_pool is not None:
+                    worker = self._acquire_shell(rule, shell_pool, channel.pass_fds)
+                    if worker is None:
+                        command, shell = shell_pool.argv(command), False
+                launched = time.perf_counter()
+                metrics.observe("prepare_seconds", launched - start, rule=rule.name)
+                # 执行命令，使用规则的超时时间；输出边读边写入有界缓冲
+                try:
+                    result = yield Launch(command, dict(
+                        shell=shell,
+                        env=env,
+                        input=channel.input,
+                        pass_fds=channel.pass_fds,
+                        timeout=rule.timeout,
+                        stdout=stdout_buffer,
+                        stderr=stderr_buffer,
+                        on_spawn=lambda _: metrics.observe("spawn_seconds", time.perf_counter() - launched,
+                                                           rule=rule.name),
+                        limits=self._limits.get(rule.name),
+                        tracker=self._processes,
+                        spawner=self._spawner,
+                        worker=worker,
+                        on_exit=lambda usage: self._observe_usage(rule, usage)
+                    ))
+                finally:
+                    metrics.observe("run_seconds", time.perf_counter() - launched, rule=rule.name)
+
+            metrics.inc("exit_codes_total", rule=rule.name, code=result.returncode)
+            status = "ok" if result.returncode == 0 else "failed"
+            exit_code, stdout, stderr = result.returncode, result.stdout, result.stderr
+            if result.returncode != 0 and self._output_log == "failure":
                 logger.error(
-                    f"[事件执行器] 命令执行失败 (退出码 {result.returncode})：\n"
+                    f"[事件执行器] 规则 {rule.name} 命令执行失败 (退出码 {result.returncode})：\n"
                     f"STDOUT: {result.stdout}\n"
                     f"STDERR: {result.stderr}"
                 )
-            elif self._log_events and result.stdout:
-                logger.info(f"[事件执行器] 命令输出：\n{result.stdout}")
+            elif result.returncode != 0:
+                logger.error(f"[事件执行器] 规则 {rule.name} 命令执行失败 (退出码 {result.returncode})")
+            elif self._log_events and result.stdout and self._output_log == "failure":
+                logger.info(f"[事件执行器] 规则 {rule.name} 命令输出：\n{result.stdout}")
 
         except subprocess.TimeoutExpired:
-            logger.error(f"[事件执行器] 命令执行超时（>{self._timeout}秒）")
+            status = "timeout"
+            stdout, stderr = stdout_buffer.text(), stderr_buffer.text()
+            metrics.inc("timeouts_total", rule=rule.name)
+            logger.error(f"[事件执行器] 规则 {rule.name} 命令执行超时（>{rule.timeout}秒）")
+        except Exception as e:
+            stderr = str(e)
+            logger.error(f"[事件执行器] 规则 {rule.name} 命令执行异常：{str(e)}")
+        finally:
+            metrics.inc("executions_total", rule=rule.name, status=status)
+            for name, buffer in (("stdout", stdout_buffer), ("stderr", stderr_buffer)):
+                if buffer.bytes:
+                    metrics.inc("output_bytes_total", buffer.bytes, rule=rule.name, stream=name)
+        return Execution(rule=rule.name, status=status, exit_code=exit_code,
+                         duration=time.perf_counter() - start, stdout=stdout or "", stderr=stderr or "")
+
+    def _handler_steps(self, rule: Rule, event_info: Dict[str, Any]) -> Generator[HandlerTask, Any, Execution]:
+        """
+        调用规则的 Python 处理函数：产出已提交的调用，由调用方等待后送回返回值
+        返回值记录为输出（非字符串输出为 JSON），异常记录为失败并保留调用栈，超过规则的超时时间时中断
+        """
+        metrics = self._get_metrics()
+        status = "error"
+        stdout, stderr = "", ""
+        start = time.perf_counter()
+        try:
+            task = self._get_handlers().submit(rule.handler, event_info, timeout=rule.timeout)
+        except RuntimeError as e:
+            # 停止服务后线程池不再接受调用
+            logger.error(f"[事件执行器] 规则 {rule.name} 处理函数提交失败：{str(e)}")
+            metrics.inc("executions_total", rule=rule.name, status=status)
+            return Execution(rule=rule.name, status=status, stderr=str(e))
+        try:
+            result = yield task
+            status = "ok"
+            if result is not None:
+                stdout = result if isinstance(result, str) else to_json(self._serializer.to_dict(result))
+            if self._log_events and stdout:
+                logger.info(f"[事件执行器] 规则 {rule.name} 处理函数返回：\n{stdout}")
+        except HandlerTimeout:
+            status = "timeout"
+            metrics.inc("timeouts_total", rule=rule.name)
+            logger.error(f"[事件执行器] 规则 {rule.name} 处理函数执行超时（>{rule.timeout}秒）")
         except Exception as e:
-            logger.error(f"[事件执行器] 命令执行异常：{str(e)}")
+            status = "failed"
+            stderr = "".join(traceback.format_exception(type(e), e, e.__traceback__))
+            metrics.inc("handler_errors_total", rule=rule.name, error=type(e).__name__)
+            if self._output_log == "off":
+                logger.error(f"[事件执行器] 规则 {rule.name} 处理函数异常：{type(e).__name__}: {str(e)}")
+            else:
+                logger.error(f"[事件执行器] 规则 {rule.name} 处理函数异常：\n{stderr}")
+        finally:
+            duration = time.perf_counter() - start
+            metrics.observe("run_seconds", duration, rule=rule.name)
+            metrics.inc("executions_total", rule=rule.name, status=status)
+        return Execution(rule=rule.name, status=status, duration=duration, stdout=stdout, stderr=stderr)
+
+    def _http_steps(self, rule: Rule, data: Any, payload: Optional[str]) -> Generator[HttpTask, Any, Execution]:
+        """
+        发送规则的 HTTP 请求：产出已提交的请求，由调用方等待后送回响应
+        2xx 为成功，其他状态码为失败并记为退出码（可用于 retry_exit_codes），响应体记为输出
+        :param data: 替换请求模板中字段的事件数据
+        :param payload: 未配置请求体模板时的请求体
+        """
+        metrics = self._get_metrics()
+        status = "error"
+        exit_code, stdout, stderr = None, "", ""
+        start = time.perf_counter()
+        try:
+            request = rule.http.render(data, payload,
+                                       dumps=lambda value: to_json(self._serializer.to_dict(value)))
+            response = yield self._get_http().submit(request, timeout=rule.timeout)
+            metrics.inc("http_requests_total", rule=rule.name, connection="reused" if response.reused else "new")
+            metrics.inc("exit_codes_total", rule=rule.name, code=response.status)
+            exit_code = response.status
+            text = response.body.decode("utf-8", errors="replace")
+            if 200 <= response.status < 300:
+                status, stdout = "ok", text
+                if self._log_events and text and self._output_log == "failure":
+                    logger.info(f"[事件执行器] 规则 {rule.name} 响应：\n{text}")
+            else:
+                status, stderr = "failed", text
+                if self._output_log == "off":
+                    logger.error(f"[事件执行器] 规则 {rule.name} 请求失败 ({response.status} {response.reason})")
+                else:
+                    logger.error(f"[事件执行器] 规则 {rule.name} 请求失败 ({response.status} {response.reason})：\n{text}")
+        except (TimeoutError, socket.timeout):
+            status = "timeout"
+            metrics.inc("timeouts_total", rule=rule.name)
+            logger.error(f"[事件执行器] 规则 {rule.name} 请求超时（>{rule.timeout}秒）")
+        except Exception as e:
+            stderr = str(e)
+            logger.error(f"[事件执行器] 规则 {rule.name} 请求异常：{str(e)}")
+        finally:
+            duration = time.perf_counter() - start
+            metrics.observe("run_seconds", duration, rule=rule.name)
+            metrics.inc("executions_total", rule=rule.name, status=status)
+        return Execution(rule=rule.name, status=status, exit_code=exit_code, duration=duration,
+                         stdout=stdout, stderr=stderr)
 
     @eventmanager.register(EventType)
     def on_event(self, event: Event = None):
@@ -355,9 +3062,75 @@ class EventExecutor(_PluginBase):
         if not self._enabled or not event or not event.event_type:
             return
 
-        # 检查是否应该处理此事件
-        if not self._should_handle_event(event.event_type.value):
+        metrics = self._get_metrics()
+        event_type = event.event_type.value
+        metrics.inc("events_total", event_type=event_type)
+        # 查找匹配的规则（含条件过滤），没有规则匹配时直接忽略，不转换事件数据
+        rules = self._match_rules(event)
+        if not rules:
+            metrics.inc("events_ignored_total", event_type=event_type, reason="no_rule")
+            return
+
+        job = EventJob(event, rules, time.monotonic())
+        if self._fingerprint and self._dedup_selector.matches(event.event_type.value):
+            try:
+                key = self._fingerprint(event.event_type.value, event.event_data)
+            except Exception as e:
+                logger.error(f"[事件执行器] 事件指纹计算失败：{str(e)}")
+            else:
+                # 防抖模式下由防抖线程在静默期结束后提交
+                if self._debouncer and self._debouncer.add(key, job):
+                    return
+                if self._dedup_cache is not None and self._dedup_cache.seen(key):
+                    metrics.inc("events_ignored_total", event_type=event_type, reason="duplicate")
+                    if self._log_events:
+                        logger.info(f"[事件执行器] 忽略重复事件：{event.event_type.value}")
+                    return
+        self._dispatch(job)
+
+    def _dispatch(self, job: EventJob):
+        """
+        提交事件：启用限流时先按规则取令牌，再加入批次、同步执行或放入工作线程队列
+        """
+        if self._limiter:
+            self._limiter.submit(job, [rule.name for rule in job.rules])
             return
+        self._enqueue(job)
+
+    def _dispatch_limited(self, job: EventJob, names: List[str]):
+        """
+        限流放行的规则继续提交
+        """
+        if len(names) == len(job.rules):
+            self._enqueue(job)
+        else:
+            self._enqueue(job._replace(rules=[rule for rule in job.rules if rule.name in names]))
+
+    def _enqueue(self, job: EventJob) -> bool:
+        """
+        加入批次、同步执行或放入工作线程队列
+        :return: 是否已提交（执行队列已满时为 False）
+        """
+        event = job.event
+        # 批处理模式下加入当前批次，由批处理线程按窗口期提交
+        batcher = self._batcher
+        if batcher:
+            if batcher.add(job):
+                return True
+            # 批处理线程正在停止（已刷新最后的批次），单独作为一批提交，命令仍收到 MP_EVENT_BATCH
+            return self._submit_batch([job])
+
+        # 未启用工作线程池时在事件线程中同步执行
+        if not self._pool:
+            self._process_job(job)
+            return True
 
-        # 执行 bash 命令
-        self._execute_bash_command(event)
+        # 仅入队，由工作线程执行，避免阻塞事件分发线程
+        if self._shard_paths:
+            submitted = self._pool.submit(self._shard_key_of(event), job)
+        else:
+            submitted = self._pool.submit(event.event_type.value, job, lane=self._lane_of(event))
+        if not submitted:
+            self._get_metrics().inc("events_ignored_total", event_type=event.event_type.value, reason="queue_full")
+            logger.warning(f"[事件执行器] 执行队列已满，丢弃事件：{event.event_type.value}")
+        return submitted
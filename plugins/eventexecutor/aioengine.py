@@ -0,0 +1,341 @@
+import asyncio
+import functools
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Union
+
+from app.log import logger
+
+from .process import (_CHUNK_SIZE, _DRAIN_TIMEOUT, OutputBuffer, ProcessResult, ProcessTracker, ResourceLimits,
+                      spawn_process)
+
+# 执行引擎：thread 由工作线程阻塞等待命令；asyncio 由一个事件循环线程同时等待所有命令
+ENGINES = ("thread", "asyncio")
+
+
+def supported() -> bool:
+    """
+    是否支持 asyncio 执行引擎：需要 pidfd（Linux 5.3+）在事件循环中等待进程退出
+    """
+    if not hasattr(os, "pidfd_open"):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return False
+    return True
+
+
+class AsyncEngine:
+    """
+    asyncio 执行引擎：独立的事件循环线程，submit 通过 call_soon_threadsafe 把任务交给事件循环，
+    每个任务是一个协程，数百个命令同时执行也只占用一个线程。接口与 WorkerPool 一致；
+    同时执行的任务数不超过 concurrency，同一 key（事件类型）的并发数可单独限制，
+    等待执行的任务超过 queue_size 时丢弃；启动命令由 spawn_workers 个线程完成（事件循环的默认线程池）
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], concurrency: int = 100,
+                 queue_size: int = 1000, key_limit: int = 0, name: str = "eventexecutor-asyncio",
+                 spawn_workers: int = 4):
+        self._handler = handler
+        self._concurrency = max(1, concurrency)
+        self.spawn_workers = max(1, spawn_workers)
+        self._queue_size = max(1, queue_size)
+        self._key_limit = max(0, key_limit)
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._key_slots: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # 已接受但尚未执行完成的任务数（等待中 + 执行中）
+        self._unfinished = 0
+        self._active = 0
+        self._accepting = False
+        self.completed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self):
+        """启动事件循环线程"""
+        if self._thread:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=self.spawn_workers,
+                                                           thread_name_prefix=f"{self._name}-spawn"))
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._slots = asyncio.Semaphore(self._concurrency)
+            self._loop.call_soon(ready.set)
+            try:
+                self._loop.run_forever()
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name=self._name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._accepting = True
+
+    def submit(self, key: str, job: Any, lane: int = 0) -> bool:
+        """
+        提交任务（可在任意线程调用），等待执行的任务已满或已停止时丢弃并返回 False
+        :param lane: 与 WorkerPool 兼容，事件循环中按到达顺序执行，不区分车道
+        """
+        if not self._accepting:
+            return False
+        with self._lock:
+            if self._unfinished - self._active >= self._queue_size:
+                self.dropped += 1
+                return False
+            self._unfinished += 1
+        try:
+            self._loop.call_soon_threadsafe(self._schedule, key, job)
+        except RuntimeError:
+            # 事件循环已关闭
+            self._finish(executed=False)
+            return False
+        return True
+
+    def qsize(self) -> int:
+        """等待执行的任务数"""
+        with self._lock:
+            return self._unfinished - self._active
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"engine": "asyncio", "concurrency": self._concurrency, "active": self._active,
+                    "pending": self._unfinished - self._active, "completed": self.completed,
+                    "dropped": self.dropped}
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        停止接收新任务，等待已接受的任务执行完成后停止事件循环，超时后取消仍未完成的任务（杀死其命令）
+        :return: 超时后仍未完成的任务数
+        """
+        self._accepting = False
+        with self._lock:
+            self._idle.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+            remaining = self._unfinished
+        if self._thread is None:
+            return remaining
+        if remaining:
+            try:
+                asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result(timeout=10)
+            except Exception as e:
+                logger.error(f"[事件执行器] 取消未完成的任务失败：{str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+        return remaining
+
+    async def _cancel_all(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _schedule(self, key: str, job: Any):
+        task = self._loop.create_task(self._run(key, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: str, job: Any):
+        executed = False
+        try:
+            # 先取得 key 的名额再占用全局名额，等待中的同类事件不占用全局名额
+            if self._key_limit:
+                if key not in self._key_slots:
+                    self._key_slots[key] = asyncio.Semaphore(self._key_limit)
+                await self._key_slots[key].acquire()
+            try:
+                async with self._slots:
+                    with self._lock:
+                        self._active += 1
+                    executed = True
+                    try:
+                        await self._handler(job)
+                    except Exception as e:
+                        logger.error(f"[事件执行器] 任务执行异常：{str(e)}")
+            finally:
+                if self._key_limit:
+                    self._key_slots[key].release()
+        finally:
+            self._finish(executed)
+
+    def _finish(self, executed: bool = True):
+        with self._lock:
+            self._unfinished -= 1
+            if executed:
+                self._active -= 1
+                self.completed += 1
+            self._idle.notify_all()
+
+
+class _Reader:
+    """在事件循环中读取管道，写入有界缓冲"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, pipe: IO[bytes], buffer: OutputBuffer):
+        self._loop = loop
+        self._pipe = pipe
+        self._fd = pipe.fileno()
+        self._buffer = buffer
+        self.done = loop.create_future()
+        os.set_blocking(self._fd, False)
+        loop.add_reader(self._fd, self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, _CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if data:
+            self._buffer.feed(data)
+        else:
+            self.close()
+
+    def close(self):
+        if self.done.done():
+            return
+        self._loop.remove_reader(self._fd)
+        self._buffer.close()
+        self._pipe.close()
+        self.done.set_result(None)
+
+
+class _Writer:
+    """在事件循环中把数据写入标准输入，写完后关闭"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, pipe: IO[bytes], data: bytes):
+        self._loop = loop
+        self._pipe = pipe
+        self._fd = pipe.fileno()
+        self._data = memoryview(data)
+        self._closed = False
+        os.set_blocking(self._fd, False)
+        if self._data:
+            loop.add_writer(self._fd, self._on_writable)
+        else:
+            self.close()
+
+    def _on_writable(self):
+        try:
+            written = os.write(self._fd, self._data[:_CHUNK_SIZE])
+        except BlockingIOError:
+            return
+        except OSError:
+            # 命令不读取标准输入时忽略
+            self.close()
+            return
+        self._data = self._data[written:]
+        if not self._data:
+            self.close()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._loop.remove_writer(self._fd)
+        try:
+            self._pipe.close()
+        except OSError:
+            pass
+
+
+async def run_process(command: Union[str, List[str]], shell: bool = True, env: Optional[Dict[str, str]] = None,
+                      input: Optional[str] = None, pass_fds: Sequence[int] = (), timeout: Optional[float] = None,
+                      stdout: Optional[OutputBuffer] = None, stderr: Optional[OutputBuffer] = None,
+                      on_spawn: Optional[Callable[[Any], None]] = None,
+                      limits: Optional[ResourceLimits] = None, tracker: Optional[ProcessTracker] = None,
+                      on_exit: Optional[Callable[[Any], None]] = None,
+                      spawner: Any = None, worker: Any = None) -> ProcessResult:
+    """
+    在事件循环中执行命令，参数与结果和 process.run_process 一致：命令由事件循环的默认线程池启动
+    （fork / posix_spawn 不阻塞事件循环），输出由事件循环读取，通过 pidfd（启动进程启动的命令为通知管道）
+    等待进程退出，不为每个命令占用线程，超时由事件循环的定时器杀死进程组
+    asyncio.create_subprocess_exec 由子进程监视器回收进程，Python 3.12 以前每个命令占用一个线程，
+    且无法取得 wait4 的资源使用，因此这里直接启动进程并自行回收
+    """
+    loop = asyncio.get_running_loop()
+    stdout = stdout if stdout is not None else OutputBuffer()
+    stderr = stderr if stderr is not None else OutputBuffer()
+    spawning = loop.run_in_executor(None, functools.partial(
+        spawn_process, command, shell=shell, env=env, input=input, pass_fds=pass_fds, limits=limits,
+        spawner=spawner, worker=worker))
+    try:
+        child, stdin_pipe, stdout_pipe, stderr_pipe = await asyncio.shield(spawning)
+    except asyncio.CancelledError:
+        # 任务被取消时命令可能正在启动，启动完成后杀死
+        spawning.add_done_callback(_discard_spawned)
+        raise
+    readers = [_Reader(loop, stdout_pipe, stdout), _Reader(loop, stderr_pipe, stderr)]
+    writer = _Writer(loop, stdin_pipe, input.encode("utf-8")) if input is not None else None
+    if tracker is not None:
+        tracker.add(child)
+    if on_spawn:
+        on_spawn(child)
+    exit_fd = child.open_exit_fd()
+    exited = loop.create_future()
+    loop.add_reader(exit_fd, lambda: exited.done() or exited.set_result(None))
+    timer = loop.call_later(timeout, child.expire) if timeout is not None else None
+    try:
+        await exited
+    except BaseException:
+        # 任务被取消（停止服务），杀死进程组后回收
+        child.kill()
+        _wait_quietly(child)
+        for reader in readers:
+            reader.close()
+        raise
+    finally:
+        loop.remove_reader(exit_fd)
+        os.close(exit_fd)
+        if timer is not None:
+            timer.cancel()
+        if writer is not None:
+            writer.close()
+        if tracker is not None:
+            tracker.discard(child)
+    rusage = child.reap()
+    if on_exit and rusage is not None:
+        on_exit(rusage)
+    # 后台子进程可能仍持有管道，最多再等待 _DRAIN_TIMEOUT 秒
+    await asyncio.wait([reader.done for reader in readers], timeout=_DRAIN_TIMEOUT)
+    for reader in readers:
+        reader.close()
+    if child.timed_out:
+        raise subprocess.TimeoutExpired(command, timeout, output=stdout.text(), stderr=stderr.text())
+    return ProcessResult(child.returncode, stdout.text(), stderr.text())
+
+
+def _wait_quietly(child: Any):
+    try:
+        child.wait()
+    except OSError:
+        pass
+
+
+def _discard_spawned(spawning: "asyncio.Future"):
+    """杀死并回收已取消的任务启动的命令"""
+    if spawning.cancelled() or spawning.exception() is not None:
+        return
+    child, *pipes = spawning.result()
+    child.kill()
+    for pipe in pipes:
+        if pipe is not None:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+    _wait_quietly(child)
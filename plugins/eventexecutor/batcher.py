@@ -0,0 +1,74 @@
+import threading
+import time
+from typing import Any, Callable, List
+
+from app.log import logger
+
+
+class Batcher:
+    """
+    微批处理
+    收集事件，在窗口期结束、达到批大小或停止时整批交给处理函数，停止时不会丢失事件
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], None], window: float, max_size: int = 100):
+        self._handler = handler
+        # 窗口期（秒），从批次中第一个事件到达开始计算
+        self._window = window
+        self._max_size = max(1, max_size)
+        self._items: List[Any] = []
+        self._deadline = 0.0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="eventexecutor-batcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, item: Any) -> bool:
+        """加入当前批次，已停止时返回 False"""
+        with self._cond:
+            if self._stopping:
+                return False
+            if not self._items:
+                self._deadline = time.monotonic() + self._window
+            self._items.append(item)
+            # 新批次开始计时或批次已满时唤醒批处理线程
+            if len(self._items) == 1 or len(self._items) >= self._max_size:
+                self._cond.notify()
+        return True
+
+    def stop(self, timeout: float = None):
+        """停止并刷新剩余事件"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if not self._items:
+                        self._cond.wait()
+                        continue
+                    if len(self._items) >= self._max_size:
+                        break
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._items[:self._max_size]
+                del self._items[:self._max_size]
+                if self._items:
+                    # 剩余事件开始新的窗口期
+                    self._deadline = time.monotonic() + self._window
+                done = self._stopping and not self._items
+            if batch:
+                try:
+                    self._handler(batch)
+                except Exception as e:
+                    logger.error(f"[事件执行器] 批处理执行异常：{str(e)}")
+            if done:
+                return
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# 熔断器状态：closed 正常执行；open 直接跳过；half_open 放行少量试探执行
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+BREAKER_STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# 计入失败的执行状态
+_FAILURES = ("failed", "timeout", "error")
+
+
+class CircuitBreaker:
+    """
+    单个规则的熔断器
+    最近 window 次执行中失败比例达到 failure_ratio（至少 min_calls 次），或连续超时达到 timeouts 次时打开；
+    打开 open_seconds 秒后进入半开，放行 probes 次试探执行：全部成功则关闭，任一失败则重新打开
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, min_calls: int = 10, window: int = 20, timeouts: int = 3,
+                 open_seconds: float = 60, probes: int = 1,
+                 on_change: Optional[Callable[[str, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_ratio = failure_ratio
+        self.min_calls = max(1, min_calls)
+        # 0 表示不按连续超时打开
+        self.timeouts = timeouts
+        self.open_seconds = open_seconds
+        self.probes = max(1, probes)
+        # on_change(原状态, 新状态)
+        self._on_change = on_change
+        self._clock = clock
+        self._lock = threading.Lock()
+        # 最近执行结果，True 表示失败
+        self._window: Deque[bool] = deque(maxlen=max(self.min_calls, window))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._consecutive_timeouts = 0
+        # 半开状态下已放行与已成功的试探次数
+        self._probing = 0
+        self._probe_successes = 0
+        self.opened = 0
+        self.short_circuited = 0
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any], default: Optional["CircuitBreaker"],
+                     on_change: Optional[Callable[[str, str], None]] = None) -> Optional["CircuitBreaker"]:
+        """
+        从规则配置读取熔断参数：breaker（是否启用）、breaker_ratio（失败比例，0~1）、breaker_min_calls、
+        breaker_timeouts、breaker_open_seconds，未配置的项使用全局设置；未启用时返回 None
+        """
+        enabled = options.get("breaker")
+        if enabled is None:
+            # 全局未启用时，配置了熔断参数的规则单独启用
+            enabled = default is not None or any(key.startswith("breaker_") for key in options)
+        if not enabled:
+            return None
+        base = default or cls()
+
+        def get(key: str, current: Any, convert: Callable[[Any], Any]) -> Any:
+            value = options.get(key)
+            return current if value is None or value == "" else convert(value)
+
+        return cls(failure_ratio=get("breaker_ratio", base.failure_ratio, float),
+                   min_calls=get("breaker_min_calls", base.min_calls, int),
+                   window=base._window.maxlen,
+                   timeouts=get("breaker_timeouts", base.timeouts, int),
+                   open_seconds=get("breaker_open_seconds", base.open_seconds, float),
+                   probes=base.probes,
+                   on_change=on_change,
+                   clock=base._clock)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            changed = self._check_half_open()
+            state = self._state
+        self._notify(changed)
+        return state
+
+    def allow(self) -> bool:
+        """是否允许执行，不允许时计为一次短路"""
+        with self._lock:
+            changed = self._check_half_open()
+            if self._state == CLOSED:
+                allowed = True
+            elif self._state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                allowed = True
+            else:
+                self.short_circuited += 1
+                allowed = False
+        self._notify(changed)
+        return allowed
+
+    def record(self, status: str):
+        """记录一次执行结果（ok、failed、timeout、error）"""
+        failed = status in _FAILURES
+        with self._lock:
+            changed = None
+            self._consecutive_timeouts = self._consecutive_timeouts + 1 if status == "timeout" else 0
+            if self._state == HALF_OPEN:
+                if failed:
+                    changed = self._transition(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        changed = self._transition(CLOSED)
+            elif self._state == CLOSED:
+                self._window.append(failed)
+                if self._should_open():
+                    changed = self._transition(OPEN)
+        self._notify(changed)
+
+    def _should_open(self) -> bool:
+        if self.timeouts > 0 and self._consecutive_timeouts >= self.timeouts:
+            return True
+        calls = len(self._window)
+        return calls >= self.min_calls and sum(self._window) / calls >= self.failure_ratio
+
+    def _check_half_open(self) -> Optional[Tuple[str, str]]:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            return self._transition(HALF_OPEN)
+        return None
+
+    def _transition(self, state: str) -> Tuple[str, str]:
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.opened += 1
+        elif state == CLOSED:
+            self._window.clear()
+            self._consecutive_timeouts = 0
+        self._probing = 0
+        self._probe_successes = 0
+        return previous, state
+
+    def _notify(self, changed: Optional[Tuple[str, str]]):
+        if changed and self._on_change:
+            self._on_change(*changed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            changed = self._check_half_open()
+            calls = len(self._window)
+            stats = {
+                "state": self._state,
+                "calls": calls,
+                "failure_ratio": round(sum(self._window) / calls, 3) if calls else 0.0,
+                "consecutive_timeouts": self._consecutive_timeouts,
+                "opened": self.opened,
+                "short_circuited": self.short_circuited,
+                "open_remaining": round(max(0.0, self._opened_at + self.open_seconds - self._clock()), 1)
+                if self._state == OPEN else 0,
+            }
+        self._notify(changed)
+        return stats
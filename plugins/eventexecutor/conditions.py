@@ -0,0 +1,178 @@
+import re
+from enum import Enum
+from typing import Any, Callable, Tuple
+
+Predicate = Callable[[Any], bool]
+
+# 字段不存在
+MISSING = object()
+
+
+class ConditionError(ValueError):
+    """条件表达式无效"""
+    pass
+
+
+def compile_path(path: str) -> Tuple[Any, ...]:
+    """
+    编译字段路径，如 mediainfo.tmdb_id、transferinfo.file_list.0
+    数字段用于列表下标
+    """
+    if not path or not isinstance(path, str):
+        raise ConditionError(f"无效的字段路径：{path!r}")
+    parts = path.split(".")
+    if not all(parts):
+        raise ConditionError(f"无效的字段路径：{path!r}")
+    return tuple(int(part) if part.isdigit() else part for part in parts)
+
+
+def resolve_path(data: Any, path: Tuple[Any, ...]) -> Any:
+    """
+    在原始事件数据上按路径取值：字典取键、对象取属性、列表取下标，枚举取其值
+    """
+    value = data
+    for part in path:
+        if value is None:
+            return MISSING
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(part, int) and isinstance(value, (list, tuple)):
+            value = value[part] if -len(value) <= part < len(value) else MISSING
+        else:
+            value = getattr(value, part, MISSING) if isinstance(part, str) else MISSING
+        if value is MISSING:
+            return MISSING
+    if isinstance(value, Enum):
+        value = value.value
+    return value
+
+
+def _equals(value: Any, expected: Any) -> bool:
+    # 表单与事件数据中的数字常以字符串出现，如 year
+    return value == expected or (value is not MISSING and str(value) == str(expected))
+
+
+def _number(value: Any) -> float:
+    return float(value)
+
+
+def _compare(op: Callable[[float, float], bool], expected: Any) -> Predicate:
+    try:
+        target = _number(expected)
+    except (TypeError, ValueError):
+        raise ConditionError(f"比较运算需要数字：{expected!r}")
+
+    def predicate(value: Any) -> bool:
+        try:
+            return op(_number(value), target)
+        except (TypeError, ValueError):
+            return False
+
+    return predicate
+
+
+def _compile_operator(op: str, expected: Any) -> Predicate:
+    """编译单个运算符，返回对字段值的判断函数"""
+    if op == "eq":
+        return lambda value: _equals(value, expected)
+    if op == "ne":
+        return lambda value: value is not MISSING and not _equals(value, expected)
+    if op in ("in", "not_in"):
+        if not isinstance(expected, (list, tuple)):
+            raise ConditionError(f"{op} 运算需要列表：{expected!r}")
+        options = {str(item) for item in expected}
+        if op == "in":
+            return lambda value: value is not MISSING and str(value) in options
+        return lambda value: value is not MISSING and str(value) not in options
+    if op == "gt":
+        return _compare(lambda a, b: a > b, expected)
+    if op == "ge":
+        return _compare(lambda a, b: a >= b, expected)
+    if op == "lt":
+        return _compare(lambda a, b: a < b, expected)
+    if op == "le":
+        return _compare(lambda a, b: a <= b, expected)
+    if op == "regex":
+        try:
+            pattern = re.compile(str(expected))
+        except re.error as e:
+            raise ConditionError(f"无效的正则表达式 {expected!r}：{str(e)}")
+        return lambda value: value is not MISSING and value is not None and pattern.search(str(value)) is not None
+    if op == "startswith":
+        prefix = str(expected)
+        return lambda value: isinstance(value, str) and value.startswith(prefix)
+    if op == "endswith":
+        suffix = str(expected)
+        return lambda value: isinstance(value, str) and value.endswith(suffix)
+    if op == "contains":
+        return lambda value: value is not MISSING and value is not None and _contains(value, expected)
+    if op == "exists":
+        wanted = bool(expected)
+        return lambda value: (value is not MISSING and value is not None) == wanted
+    raise ConditionError(f"不支持的运算符：{op}")
+
+
+def _contains(value: Any, expected: Any) -> bool:
+    if isinstance(value, str):
+        return str(expected) in value
+    try:
+        return expected in value
+    except TypeError:
+        return False
+
+
+def _compile_field(path: str, spec: Any) -> Predicate:
+    """编译字段条件：值为字典时按运算符匹配，否则为相等匹配"""
+    compiled_path = compile_path(path)
+    if isinstance(spec, dict):
+        if not spec:
+            raise ConditionError(f"字段 {path} 的条件为空")
+        checks = [_compile_operator(op, expected) for op, expected in spec.items()]
+    else:
+        checks = [_compile_operator("eq", spec)]
+
+    if len(checks) == 1:
+        check = checks[0]
+        return lambda data: check(resolve_path(data, compiled_path))
+
+    def predicate(data: Any) -> bool:
+        value = resolve_path(data, compiled_path)
+        return all(check(value) for check in checks)
+
+    return predicate
+
+
+def compile_condition(spec: Any) -> Predicate:
+    """
+    编译条件表达式为判断函数，作用于原始事件数据（event.event_data）
+
+    {"mediainfo.type": "电影"}                                  字段相等
+    {"transferinfo.target_path": {"startswith": "/media/anime"}} 运算符：eq ne in not_in gt ge lt le
+                                                                 regex startswith endswith contains exists
+    {"any": [条件, ...]} / {"all": [条件, ...]} / {"not": 条件}    组合条件
+    同一对象中的多个键之间为「且」关系
+    """
+    if not isinstance(spec, dict):
+        raise ConditionError("条件应为 JSON 对象")
+    predicates = []
+    for key, value in spec.items():
+        if key in ("any", "all"):
+            if not isinstance(value, list) or not value:
+                raise ConditionError(f"{key} 需要非空的条件列表")
+            children = [compile_condition(child) for child in value]
+            if key == "any":
+                predicates.append(lambda data, c=children: any(p(data) for p in c))
+            else:
+                predicates.append(lambda data, c=children: all(p(data) for p in c))
+        elif key == "not":
+            child = compile_condition(value)
+            predicates.append(lambda data, c=child: not c(data))
+        else:
+            predicates.append(_compile_field(key, value))
+
+    if not predicates:
+        return lambda data: True
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda data: all(p(data) for p in predicates)
+
@@ -0,0 +1,208 @@
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from typing import IO, Dict, Optional
+
+from app.log import logger
+
+
+class Coprocess:
+    """
+    常驻子进程
+    命令只启动一次，每个事件以一行 JSON（NDJSON）写入其标准输入；
+    可选地从标准输出读取一行作为确认（ack）。进程退出后按指数退避重启，退避期间的事件直接返回失败。
+    进程在独立的会话（进程组）中运行，结束时连同其启动的子进程一起结束
+    """
+
+    def __init__(self, command: str, ack: bool = False, ack_timeout: float = 60,
+                 log_output: bool = False, min_backoff: float = 1, max_backoff: float = 30,
+                 env: Optional[Dict[str, str]] = None):
+        self._command = command
+        self._env = env
+        self._ack = ack
+        self._ack_timeout = ack_timeout
+        self._log_output = log_output
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._backoff = min_backoff
+        # 下一次允许启动的时间（单调时钟）
+        self._next_start = 0.0
+        self._process: Optional[subprocess.Popen] = None
+        self._acks: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.restarts = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process else None
+
+    def alive(self) -> bool:
+        return self._process is not None and not _exited(self._process)
+
+    def start(self):
+        """启动子进程（已在运行时忽略）"""
+        with self._lock:
+            self._ensure_started()
+
+    def send(self, line: str) -> bool:
+        """
+        发送一行事件数据，启用 ack 时等待子进程回复一行
+        :return: 是否发送成功（及收到确认）
+        """
+        with self._lock:
+            if self._stopped:
+                return False
+            if not self._ensure_started():
+                return False
+            try:
+                self._process.stdin.write(line.rstrip("\n") + "\n")
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                logger.error(f"[事件执行器] 常驻进程写入失败：{str(e)}")
+                self._kill()
+                self._on_crash()
+                return False
+            if not self._ack:
+                self._backoff = self._min_backoff
+                return True
+            try:
+                reply = self._acks.get(timeout=self._ack_timeout)
+            except queue.Empty:
+                # 确认超时后无法再保证请求与回复一一对应，重启进程
+                logger.error(f"[事件执行器] 常驻进程确认超时（>{self._ack_timeout}秒），重启进程")
+                self._kill()
+                self._on_crash()
+                return False
+            if reply is None:
+                logger.error("[事件执行器] 常驻进程在确认前退出")
+                self._kill()
+                self._on_crash()
+                return False
+            # 收到确认说明进程工作正常，重置退避时间
+            self._backoff = self._min_backoff
+            if self._log_output:
+                logger.info(f"[事件执行器] 常驻进程确认：{reply}")
+            return True
+
+    def stop(self, timeout: float = 5):
+        """关闭标准输入让子进程自行退出，超时后强制结束，进程组中剩余的进程一并结束"""
+        with self._lock:
+            self._stopped = True
+            process, self._process = self._process, None
+        if not process:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        if not _exited(process, timeout):
+            _kill_group(process, signal.SIGTERM)
+            if not _exited(process, 2):
+                _kill_group(process, signal.SIGKILL)
+        _reap(process)
+
+    def _ensure_started(self) -> bool:
+        """确保子进程在运行，处于退避期时返回 False（不在持有锁时等待）"""
+        if self.alive():
+            return True
+        if self._process is not None:
+            _reap(self._process)
+            logger.warning(f"[事件执行器] 常驻进程已退出（退出码 {self._process.returncode}）")
+            self._on_crash()
+        delay = self._next_start - time.monotonic()
+        if delay > 0:
+            logger.warning(f"[事件执行器] 常驻进程等待重启（{delay:.1f}秒后），事件未发送")
+            return False
+        try:
+            self._process = subprocess.Popen(
+                self._command,
+                shell=True,
+                env=self._env if self._env is not None else os.environ.copy(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                start_new_session=True
+            )
+        except Exception as e:
+            logger.error(f"[事件执行器] 常驻进程启动失败：{str(e)}")
+            self._process = None
+            self._schedule_restart()
+            return False
+        self._acks = queue.Queue()
+        threading.Thread(target=self._read_stdout, args=(self._process.stdout, self._acks),
+                         name="eventexecutor-coprocess-stdout", daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(self._process.stderr,),
+                         name="eventexecutor-coprocess-stderr", daemon=True).start()
+        logger.info(f"[事件执行器] 常驻进程已启动（PID {self._process.pid}）")
+        return True
+
+    def _on_crash(self):
+        """记录崩溃并计算下次重启时间"""
+        self._process = None
+        self.restarts += 1
+        self._schedule_restart()
+
+    def _schedule_restart(self):
+        self._next_start = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self._max_backoff)
+
+    def _kill(self):
+        if self._process:
+            _kill_group(self._process, signal.SIGKILL)
+            _reap(self._process)
+
+    def _read_stdout(self, stream: IO[str], acks: queue.Queue):
+        """读取标准输出：启用 ack 时作为确认，否则按需记录日志"""
+        for line in stream:
+            line = line.rstrip("\n")
+            if self._ack:
+                acks.put(line)
+            elif self._log_output and line:
+                logger.info(f"[事件执行器] 常驻进程输出：{line}")
+        acks.put(None)
+
+    @staticmethod
+    def _read_stderr(stream: IO[str]):
+        for line in stream:
+            line = line.rstrip("\n")
+            if line:
+                logger.warning(f"[事件执行器] 常驻进程错误输出：{line}")
+
+
+def _exited(process: subprocess.Popen, timeout: float = 0) -> bool:
+    """
+    等待进程退出（最多 timeout 秒），只等待不回收：回收前进程组号不会被复用，可以安全地向进程组发送信号
+    """
+    deadline = time.monotonic() + timeout
+    while process.returncode is None:
+        try:
+            if os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT | os.WNOHANG) is not None:
+                return True
+        except ChildProcessError:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _kill_group(process: subprocess.Popen, sig: int):
+    """向进程组发送信号（进程已回收时不再发送）"""
+    if process.returncode is not None:
+        return
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _reap(process: subprocess.Popen):
+    """结束进程组中剩余的进程（后台任务等）后回收进程"""
+    _kill_group(process, signal.SIGKILL)
+    process.wait()
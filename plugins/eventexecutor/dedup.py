@@ -0,0 +1,168 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.log import logger
+
+from .conditions import MISSING, compile_path, resolve_path
+
+# 去重方式：off 不去重；dedup 窗口期内重复事件只执行第一个；debounce 静默期后只执行最后一个
+DEDUP_MODES = ("off", "dedup", "debounce")
+
+
+class Fingerprint:
+    """
+    事件指纹：事件类型加上配置的关键字段值
+    未配置关键字段时使用整个事件数据的 JSON 摘要
+    """
+
+    def __init__(self, fields: Iterable[str] = (), dumps: Optional[Callable[[Any], str]] = None):
+        self.fields = tuple(fields)
+        self._paths = [compile_path(field) for field in self.fields]
+        self._dumps = dumps
+
+    def __call__(self, event_type: str, event_data: Any) -> Hashable:
+        if self._paths:
+            values = []
+            for path in self._paths:
+                value = resolve_path(event_data, path)
+                values.append(None if value is MISSING else str(value))
+            return (event_type, *values)
+        digest = hashlib.blake2b(self._dumps(event_data).encode("utf-8"), digest_size=16).digest()
+        return event_type, digest
+
+
+class TTLCache:
+    """
+    大小与存活时间双重限制的 LRU 指纹缓存
+    seen 在指纹已存在且未过期时计为命中，否则记录指纹并计为未命中
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._clock = clock
+        # 指纹 -> 过期时间，按最近使用排序
+        self._items: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def seen(self, key: Hashable) -> bool:
+        now = self._clock()
+        with self._lock:
+            expires = self._items.get(key)
+            if expires is not None and expires > now:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            self._items[key] = now + self.ttl
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+class Debouncer:
+    """
+    防抖：同一指纹的事件在静默期内不断被替换，静默期结束后只把最后一个交给处理函数
+    等待中的指纹数超过上限时立即执行最早的一个，停止时执行全部等待中的事件
+    """
+
+    def __init__(self, handler: Callable[[Any], None], quiet: float, max_keys: int = 1024):
+        self._handler = handler
+        self._quiet = quiet
+        self._max_keys = max(1, max_keys)
+        # 指纹 -> (到期时间, 事件)，按最后一次更新排序，即按到期时间排序
+        self._pending: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="eventexecutor-debouncer", daemon=True)
+        self.hits = 0
+        self.misses = 0
+        self.fired = 0
+
+    def start(self):
+        self._thread.start()
+
+    def add(self, key: Hashable, item: Any) -> bool:
+        """加入或替换指纹对应的事件，已停止时返回 False"""
+        overflow = None
+        with self._cond:
+            if self._stopping:
+                return False
+            if self._pending.pop(key, None) is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._pending[key] = (time.monotonic() + self._quiet, item)
+            if len(self._pending) > self._max_keys:
+                overflow = self._pending.popitem(last=False)[1][1]
+            if len(self._pending) == 1:
+                self._cond.notify()
+        if overflow is not None:
+            self._fire(overflow)
+        return True
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stop(self, timeout: float = None):
+        """停止并执行全部等待中的事件"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"pending": len(self._pending), "hits": self.hits,
+                    "misses": self.misses, "fired": self.fired}
+
+    def _fire(self, item: Any):
+        with self._cond:
+            self.fired += 1
+        try:
+            self._handler(item)
+        except Exception as e:
+            logger.error(f"[事件执行器] 防抖事件执行异常：{str(e)}")
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    remaining = next(iter(self._pending.values()))[0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                now = time.monotonic()
+                due = []
+                while self._pending:
+                    key, (deadline, item) = next(iter(self._pending.items()))
+                    if not self._stopping and deadline > now:
+                        break
+                    del self._pending[key]
+                    due.append(item)
+                done = self._stopping and not self._pending
+            for item in due:
+                self._fire(item)
+            if done:
+                return
@@ -0,0 +1,31 @@
+import fnmatch
+import os
+import re
+from typing import Dict, Iterable, Mapping, Optional
+
+# 配置允许列表时始终传递的环境变量，保证命令能正常查找程序、处理编码与时区
+ESSENTIAL_VARS = ("PATH", "HOME", "USER", "SHELL", "LANG", "LC_ALL", "TZ", "TMPDIR")
+
+
+def build_base_env(allow: Optional[Iterable[str]] = None,
+                   environ: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    """
+    构建命令的基础环境变量（普通字典），在插件加载配置时构建一次
+    每个事件只需在其上叠加 MP_EVENT_* 变量，不再复制 os.environ
+
+    :param allow: 允许传递的变量名，支持通配符（如 LC_*）；为空时传递全部环境变量
+    :param environ: 来源环境变量，默认为 os.environ
+    """
+    source = os.environ if environ is None else environ
+    patterns = [p for p in (allow or ()) if p]
+    if not patterns:
+        return dict(source)
+    names, globs = set(ESSENTIAL_VARS), []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            globs.append(fnmatch.translate(pattern))
+        else:
+            names.add(pattern)
+    matcher = re.compile("|".join(globs)) if globs else None
+    return {key: value for key, value in source.items()
+            if key in names or (matcher is not None and matcher.match(key))}
@@ -0,0 +1,240 @@
+import asyncio
+import builtins
+import hashlib
+import importlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from app.log import logger
+
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
+
+# 编译后的代码缓存的最大条目数，超过后清空（规则修改后旧的代码不再使用）
+_CACHE_SIZE = 256
+
+_cache: Dict[str, CodeType] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+class HandlerError(ValueError):
+    """Python 处理函数配置无效"""
+
+
+class HandlerTimeout(Exception):
+    """Python 处理函数执行超时"""
+
+
+def compile_source(source: str) -> CodeType:
+    """
+    编译代码片段，按源码的 sha256 缓存：重新加载配置时未修改的片段不再编译
+    :raises HandlerError: 语法错误
+    """
+    key = hashlib.sha256(source.encode("utf-8", "surrogateescape")).hexdigest()
+    with _cache_lock:
+        code = _cache.get(key)
+        if code is not None:
+            _cache_stats["hits"] += 1
+            return code
+    try:
+        code = compile(source, "<eventexecutor>", "exec")
+    except (SyntaxError, ValueError) as e:
+        raise HandlerError(f"代码片段语法错误：{str(e)}")
+    with _cache_lock:
+        _cache_stats["misses"] += 1
+        if len(_cache) >= _CACHE_SIZE:
+            _cache.clear()
+        _cache[key] = code
+    return code
+
+
+def cache_stats() -> Dict[str, int]:
+    with _cache_lock:
+        return {"size": len(_cache), **_cache_stats}
+
+
+def resolve_entry(entry: str) -> Callable[[Dict[str, Any]], Any]:
+    """
+    解析 模块:函数 形式的入口（函数可以是 类.方法 形式的属性路径）
+    :raises HandlerError: 格式错误、模块无法导入或入口不可调用
+    """
+    module_name, _, attr_path = entry.partition(":")
+    if not module_name or not attr_path:
+        raise HandlerError(f"入口应为 模块:函数 形式：{entry}")
+    try:
+        target = importlib.import_module(module_name.strip())
+    except Exception as e:
+        raise HandlerError(f"模块 {module_name} 导入失败：{str(e)}")
+    for attr in attr_path.strip().split("."):
+        try:
+            target = getattr(target, attr)
+        except AttributeError:
+            raise HandlerError(f"模块 {module_name} 中没有 {attr_path}")
+    if not callable(target):
+        raise HandlerError(f"{entry} 不可调用")
+    return target
+
+
+class PythonHandler:
+    """
+    在插件进程内执行的 Python 处理函数，参数为转换后的事件字典 {"type": ..., "data": ...}
+    source 为代码片段：全局变量 event 为事件字典、logger 为日志，可将返回值赋给 result；
+    entry 为 模块:函数 形式的入口，以事件字典为参数调用，返回值作为结果
+    事件字典由同一事件的所有规则共用，处理函数不应修改
+    """
+
+    def __init__(self, source: Union[str, List[str], None] = None, entry: Optional[str] = None):
+        if source and entry:
+            raise HandlerError("python 与 handler 只能配置一个")
+        if isinstance(source, (list, tuple)):
+            source = "\n".join(str(line) for line in source)
+        self.source = source
+        self.entry = entry
+        if source:
+            self.code = compile_source(source)
+            self.function = None
+            self.description = f"python:{hashlib.sha256(source.encode('utf-8', 'surrogateescape')).hexdigest()[:12]}"
+        elif entry:
+            self.code = None
+            self.function = resolve_entry(entry)
+            self.description = f"handler:{entry}"
+        else:
+            raise HandlerError("未配置代码片段或入口")
+
+    def __call__(self, event: Dict[str, Any]) -> Any:
+        if self.function is not None:
+            return self.function(event)
+        namespace = {"__builtins__": builtins, "__name__": "eventexecutor_handler",
+                     "event": event, "logger": logger, "result": None}
+        exec(self.code, namespace)
+        return namespace.get("result")
+
+
+def _interrupt_thread(ident: int, exc: Optional[type]) -> bool:
+    """在指定线程中异步抛出异常（exc 为 None 时清除未送达的异常），仅 CPython 支持"""
+    if ctypes is None or not hasattr(ctypes, "pythonapi"):
+        return False
+    return ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(ident), ctypes.py_object(exc) if exc is not None else None) == 1
+
+
+class HandlerTask:
+    """
+    已提交的处理函数调用，由执行步骤产出，调用方等待结果（超时时中断处理函数并抛出 HandlerTimeout）
+    """
+
+    def __init__(self, runner: "HandlerRunner", handler: PythonHandler, event: Dict[str, Any],
+                 timeout: Optional[float]):
+        self.runner = runner
+        self.handler = handler
+        self.event = event
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.future: Optional[Future] = None
+        # 执行该任务的线程，未开始或已结束时为 None
+        self.thread: Optional[int] = None
+        self.expired = False
+
+    def _remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def result(self) -> Any:
+        """在当前线程等待结果"""
+        try:
+            return self.future.result(self._remaining())
+        except FutureTimeoutError:
+            self.runner.expire(self)
+            raise HandlerTimeout(f"执行超时（>{self.timeout}秒）")
+
+    async def result_async(self) -> Any:
+        """在事件循环中等待结果，不占用线程"""
+        done, _ = await asyncio.wait({asyncio.wrap_future(self.future)}, timeout=self._remaining())
+        if not done:
+            self.runner.expire(self)
+            raise HandlerTimeout(f"执行超时（>{self.timeout}秒）")
+        return self.future.result()
+
+
+class HandlerRunner:
+    """
+    Python 处理函数的执行线程池：处理函数在工作线程中执行，异常由 Future 带回调用方，不影响插件；
+    超过时间预算时在执行线程中抛出 HandlerTimeout 中断处理函数（阻塞在系统调用中的处理函数
+    要等调用返回后才会中断，期间计为 overrun 并继续占用一个线程）
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="eventexecutor-handler")
+        self._lock = threading.Lock()
+        self._overrun: Dict[int, HandlerTask] = {}
+        self.running = 0
+        self.completed = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def submit(self, handler: PythonHandler, event: Dict[str, Any], timeout: Optional[float] = None) -> HandlerTask:
+        """
+        提交调用，返回的任务由调用方等待；timeout 从提交时开始计算，包含等待执行线程的时间
+        """
+        task = HandlerTask(self, handler, event, timeout)
+        task.future = self._executor.submit(self._call, task)
+        return task
+
+    def expire(self, task: HandlerTask):
+        """任务超时：未开始的不再执行，执行中的在其线程中抛出 HandlerTimeout"""
+        with self._lock:
+            task.expired = True
+            self.timeouts += 1
+            if task.thread is not None:
+                self._overrun[id(task)] = task
+                _interrupt_thread(task.thread, HandlerTimeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.workers, "running": self.running, "completed": self.completed,
+                    "errors": self.errors, "timeouts": self.timeouts, "overrun": len(self._overrun),
+                    "code_cache": cache_stats()}
+
+    def stop(self, wait: bool = False):
+        """停止线程池，未开始的调用不再执行"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _call(self, task: HandlerTask) -> Any:
+        with self._lock:
+            if task.expired:
+                raise HandlerTimeout("等待执行线程时已超时")
+            task.thread = threading.get_ident()
+            self.running += 1
+        failed = False
+        try:
+            return task.handler(task.event)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            # 中断的异常可能在处理函数返回后才送达，重复执行直到在锁内完成登记并清除未送达的异常
+            while True:
+                try:
+                    self._finish(task, failed)
+                    break
+                except HandlerTimeout:
+                    failed = True
+
+    def _finish(self, task: HandlerTask, failed: bool):
+        with self._lock:
+            if task.thread is None:
+                return
+            if task.expired:
+                _interrupt_thread(task.thread, None)
+                self._overrun.pop(id(task), None)
+            elif failed:
+                self.errors += 1
+            task.thread = None
+            self.running -= 1
+            self.completed += 1
@@ -0,0 +1,326 @@
+import asyncio
+import gzip
+import http.client
+import select
+import socket
+import ssl
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Deque, Dict, NamedTuple, Optional, Tuple, Union
+from urllib.parse import quote, urlsplit
+
+from .template import TemplateError, TextTemplate
+
+# 支持的请求方法
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+_USER_AGENT = "MoviePilot-EventExecutor"
+# 保留的响应体字节数，超出的部分不读取（连接随之关闭）
+_MAX_BODY = 64 * 1024
+# 空闲连接的最长保留时间（秒），超过后不再复用
+_IDLE_TIMEOUT = 60
+# 复用空闲连接时对端可能已关闭连接，收到响应前出现这些异常时在新连接上重试一次
+_STALE_ERRORS = (ConnectionError, http.client.BadStatusLine)
+# 幂等的请求方法：请求已发出后连接断开，对端可能已经处理，只有这些方法可以重发
+_IDEMPOTENT = ("GET", "PUT", "DELETE")
+
+
+def _dropped(connection: http.client.HTTPConnection) -> bool:
+    """空闲连接可读（对端已关闭或发来了意外的数据）时不能再复用"""
+    if connection.sock is None:
+        return True
+    # poll 没有 select 的描述符编号不超过 1024 的限制（MoviePilot 进程打开的描述符很多）
+    poller = select.poll()
+    try:
+        poller.register(connection.sock, select.POLLIN)
+        return bool(poller.poll(0))
+    except (OSError, ValueError):
+        return True
+
+
+class HttpError(ValueError):
+    """HTTP 规则配置无效"""
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    url: str
+    headers: Dict[str, str]
+    body: Optional[bytes] = None
+    verify: bool = True
+
+
+class HttpResponse(NamedTuple):
+    status: int
+    reason: str
+    body: bytes
+    # 是否复用了空闲连接
+    reused: bool = False
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class HttpTarget:
+    """
+    HTTP 规则的请求模板：url 为字符串，或包含 url、method、headers、body、gzip、verify 的对象
+    URL、请求头与请求体中的 {字段路径} 在请求时替换为事件字段值（URL 中的字段值按 URL 编码）；
+    未配置 body 时请求体为事件信息 {"type": ..., "data": {...}} 的 JSON（GET 请求没有请求体）
+    """
+
+    def __init__(self, spec: Union[str, Dict[str, Any]]):
+        if isinstance(spec, str):
+            spec = {"url": spec}
+        if not isinstance(spec, dict) or not spec.get("url"):
+            raise HttpError("http 应为 URL 或包含 url 的对象")
+        self.method = str(spec.get("method") or "POST").upper()
+        if self.method not in METHODS:
+            raise HttpError(f"不支持的请求方法：{self.method}")
+        url = str(spec["url"]).strip()
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc or "{" in parts.netloc:
+            raise HttpError(f"URL 应以 http:// 或 https:// 开头，主机不能包含占位符：{url}")
+        headers = spec.get("headers") or {}
+        if not isinstance(headers, dict):
+            raise HttpError("headers 应为对象")
+        try:
+            self.url = TextTemplate(url)
+            self.headers = {str(name): TextTemplate(value) for name, value in headers.items()}
+            self.body = TextTemplate(spec["body"]) if spec.get("body") is not None else None
+        except TemplateError as e:
+            raise HttpError(str(e))
+        self.gzip = _to_bool(spec.get("gzip", False))
+        self.verify = _to_bool(spec.get("verify", True))
+        templates = [self.url, *self.headers.values(), *([self.body] if self.body else [])]
+        self.fields = tuple(field for template in templates for field in template.fields)
+
+    @property
+    def description(self) -> str:
+        """用于日志与显示的请求"""
+        return f"{self.method} {self.url.text}"
+
+    def render(self, data: Any, payload: Optional[str] = None,
+               dumps: Optional[Callable[[Any], str]] = None) -> HttpRequest:
+        """
+        按事件数据生成请求
+        :param payload: 未配置 body 时使用的请求体（事件信息的 JSON）
+        """
+        url = self.url.render(data, dumps, quote=lambda value: quote(value, safe=""))
+        headers = {"User-Agent": _USER_AGENT}
+        headers.update((name, template.render(data, dumps)) for name, template in self.headers.items())
+        if self.body is not None:
+            text = self.body.render(data, dumps)
+        elif self.method != "GET":
+            text = payload
+        else:
+            text = None
+        body = None
+        if text is not None:
+            body = text.encode("utf-8")
+            if not any(name.lower() == "content-type" for name in headers):
+                headers["Content-Type"] = "application/json; charset=utf-8"
+            if self.gzip:
+                body = gzip.compress(body, compresslevel=6)
+                headers["Content-Encoding"] = "gzip"
+        return HttpRequest(self.method, url, headers, body, self.verify)
+
+
+class HttpTask:
+    """
+    已提交的请求，由执行步骤产出，调用方等待响应（超时时断开连接并抛出 TimeoutError）
+    """
+
+    def __init__(self, sink: "HttpSink", request: HttpRequest, timeout: Optional[float]):
+        self.sink = sink
+        self.request = request
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.future: Optional[Future] = None
+        # 正在使用的连接，超时时由等待方断开
+        self.connection: Optional[http.client.HTTPConnection] = None
+        self.expired = False
+
+    def _remaining(self) -> Optional[float]:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def result(self) -> HttpResponse:
+        """在当前线程等待响应"""
+        try:
+            return self.future.result(self._remaining())
+        except FutureTimeoutError:
+            self.sink.expire(self)
+            raise TimeoutError(f"请求超时（>{self.timeout}秒）")
+
+    async def result_async(self) -> HttpResponse:
+        """在事件循环中等待响应，不占用线程"""
+        done, _ = await asyncio.wait({asyncio.wrap_future(self.future)}, timeout=self._remaining())
+        if not done:
+            self.sink.expire(self)
+            raise TimeoutError(f"请求超时（>{self.timeout}秒）")
+        return self.future.result()
+
+
+class HttpSink:
+    """
+    HTTP 请求的执行线程池：同时执行的请求数不超过 concurrency；
+    每个主机保持 keep-alive 的空闲连接，后续请求直接复用，省去每次的 TCP 与 TLS 握手
+    """
+
+    def __init__(self, concurrency: int = 8):
+        self.concurrency = max(1, concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="eventexecutor-http")
+        self._lock = threading.Lock()
+        # (scheme, 主机, 端口, 是否校验证书) -> [(连接, 归还时间)]，后进先出
+        self._idle: Dict[Tuple[str, str, int, bool], Deque[Tuple[http.client.HTTPConnection, float]]] = {}
+        self._contexts: Dict[bool, ssl.SSLContext] = {}
+        self._stopped = False
+        self.active = 0
+        self.requests = 0
+        self.opened = 0
+        self.reused = 0
+
+    def submit(self, request: HttpRequest, timeout: Optional[float] = None) -> HttpTask:
+        """
+        提交请求，返回的任务由调用方等待；timeout 从提交时开始计算，同时作为连接与读写的超时时间
+        :raises RuntimeError: 已停止
+        """
+        task = HttpTask(self, request, timeout)
+        task.future = self._executor.submit(self._perform, task)
+        return task
+
+    def expire(self, task: HttpTask):
+        """请求超时：未开始的不再执行，执行中的断开连接"""
+        with self._lock:
+            task.expired = True
+            sock = task.connection.sock if task.connection is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def idle(self) -> int:
+        with self._lock:
+            return sum(len(connections) for connections in self._idle.values())
+
+    def stats(self) -> Dict[str, Any]:
+        idle = self.idle()
+        with self._lock:
+            return {"concurrency": self.concurrency, "active": self.active, "requests": self.requests,
+                    "opened": self.opened, "reused": self.reused, "idle": idle}
+
+    def stop(self):
+        """停止线程池，未开始的请求不再执行，关闭空闲连接"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._stopped = True
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+    def _perform(self, task: HttpTask) -> HttpResponse:
+        request = task.request
+        parts = urlsplit(request.url)
+        https = parts.scheme == "https"
+        key = (parts.scheme, parts.hostname or "", parts.port or (443 if https else 80), request.verify)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        with self._lock:
+            self.active += 1
+            self.requests += 1
+        try:
+            for attempt in range(2):
+                # 连接与读写的超时为剩余的时间预算
+                remaining = task._remaining()
+                if remaining == 0:
+                    raise TimeoutError(f"请求超时（>{task.timeout}秒）")
+                connection, reused = self._checkout(key, remaining)
+                with self._lock:
+                    if task.expired:
+                        connection.close()
+                        raise TimeoutError("等待执行线程时已超时")
+                    task.connection = connection
+                sent = False
+                try:
+                    connection.request(request.method, path, body=request.body, headers=request.headers)
+                    sent = True
+                    response = connection.getresponse()
+                    body = response.read(_MAX_BODY)
+                    # 响应体未读完时连接不能复用
+                    complete = response.isclosed() or not response.read(1)
+                except _STALE_ERRORS:
+                    connection.close()
+                    # 请求未发完时对端没有处理，可以重发；已发出的只重发幂等的请求
+                    if (reused and attempt == 0 and not task.expired
+                            and (not sent or request.method in _IDEMPOTENT)):
+                        continue
+                    raise
+                except BaseException:
+                    connection.close()
+                    raise
+                finally:
+                    with self._lock:
+                        task.connection = None
+                if complete and not response.will_close:
+                    self._checkin(key, connection)
+                else:
+                    connection.close()
+                return HttpResponse(response.status, response.reason, body, reused)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _checkout(self, key: Tuple[str, str, int, bool],
+                  timeout: Optional[float]) -> Tuple[http.client.HTTPConnection, bool]:
+        """取出主机的空闲连接（跳过超时与已被对端关闭的连接），没有时新建"""
+        now = time.monotonic()
+        expired = []
+        connection = None
+        with self._lock:
+            connections = self._idle.get(key)
+            while connections:
+                candidate, returned = connections.pop()
+                if now - returned < _IDLE_TIMEOUT and not _dropped(candidate):
+                    connection = candidate
+                    self.reused += 1
+                    break
+                expired.append(candidate)
+            if connection is None:
+                self.opened += 1
+        for candidate in expired:
+            candidate.close()
+        if connection is not None:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            return connection, True
+        scheme, host, port, verify = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self._context(verify)), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def _checkin(self, key: Tuple[str, str, int, bool], connection: http.client.HTTPConnection):
+        """归还连接，每个主机最多保留 concurrency 个空闲连接"""
+        with self._lock:
+            connections = self._idle.setdefault(key, deque())
+            if not self._stopped and len(connections) < self.concurrency:
+                connections.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def _context(self, verify: bool) -> ssl.SSLContext:
+        with self._lock:
+            context = self._contexts.get(verify)
+            if context is None:
+                context = ssl.create_default_context()
+                if not verify:
+                    context.check_hostname = False
+                    context.verify_mode = ssl.CERT_NONE
+                self._contexts[verify] = context
+            return context
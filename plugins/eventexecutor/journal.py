@@ -0,0 +1,340 @@
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from app.log import logger
+
+# 失败的执行状态（重放「全部失败」时使用）
+FAILED_STATUSES = ("failed", "timeout", "error")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    payload TEXT,
+    replay_of INTEGER
+);
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    time REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    status TEXT NOT NULL,
+    exit_code INTEGER,
+    queue_wait REAL,
+    duration REAL,
+    stdout TEXT,
+    stderr TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events(time);
+CREATE INDEX IF NOT EXISTS idx_executions_time ON executions(time);
+CREATE INDEX IF NOT EXISTS idx_executions_type_time ON executions(event_type, time);
+CREATE INDEX IF NOT EXISTS idx_executions_status_time ON executions(status, time);
+CREATE INDEX IF NOT EXISTS idx_executions_event ON executions(event_id);
+"""
+
+# 写入线程退出标记
+_STOP = object()
+
+
+class Execution(NamedTuple):
+    """一次规则执行的结果"""
+    rule: str
+    status: str
+    exit_code: Optional[int] = None
+    duration: float = 0.0
+    stdout: str = ""
+    stderr: str = ""
+
+
+class _Entry(NamedTuple):
+    time: float
+    event_type: str
+    payload: str
+    executions: List[Execution]
+    queue_wait: Optional[float]
+    replay_of: Optional[int]
+
+
+def parse_time(value: Union[str, float, int, None]) -> Optional[float]:
+    """解析时间：Unix 时间戳或 ISO 格式（如 2025-01-01T12:00:00）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        raise ValueError(f"无效的时间：{value}")
+
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    if not text:
+        return ""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"\n...（已截断 {len(text) - limit} 个字符）"
+
+
+class Journal:
+    """
+    执行日志（SQLite）
+    事件数据与每个规则的执行结果只追加写入，由后台线程批量提交，不阻塞执行线程；
+    按时间、事件类型与状态建立索引，按保留天数与最大条数定期清理
+    """
+
+    def __init__(self, path: Union[str, Path], retention_days: int = 7, max_events: int = 100000,
+                 output_limit: int = 4096, flush_interval: float = 1.0):
+        self.path = Path(path)
+        self.retention_days = retention_days
+        self.max_events = max_events
+        self.output_limit = output_limit
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        # flush / close 时打断合并等待
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread = threading.Thread(target=self._writer, name="eventexecutor-journal", daemon=True)
+        # 首次写入时清理一次，之后每小时清理
+        self._last_purge: Optional[float] = None
+        self.dropped = 0
+
+    def open(self):
+        """打开数据库并启动写入线程"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # 清理后空间按需归还文件系统，须在建表前设置
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        self._thread.start()
+
+    def record(self, event_type: str, payload: str, executions: Sequence[Execution],
+               queue_wait: Optional[float] = None, replay_of: Optional[int] = None,
+               timestamp: Optional[float] = None):
+        """追加一条事件记录及其执行结果（异步写入）"""
+        if self._conn is None:
+            return
+        self._queue.put(_Entry(time.time() if timestamp is None else timestamp, event_type, payload,
+                               list(executions), queue_wait, replay_of))
+
+    def flush(self, timeout: float = 5):
+        """等待已提交的记录写入完成"""
+        done = threading.Event()
+        self._queue.put(done)
+        self._wake.set()
+        done.wait(timeout)
+
+    def close(self):
+        """写入剩余记录并关闭数据库"""
+        if self._conn is None:
+            return
+        self._queue.put(_STOP)
+        self._wake.set()
+        self._thread.join(timeout=10)
+        with self._lock:
+            self._conn.close()
+            self._conn = None
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    self.dropped += len(batch)
+                    logger.error(f"[事件执行器] 执行日志写入失败：{str(e)}")
+            if self._last_purge is None or time.monotonic() - self._last_purge > 3600:
+                self.purge()
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+            if batch and self._flush_interval:
+                # 合并一段时间内到达的记录为一次提交
+                self._wake.wait(self._flush_interval)
+                self._wake.clear()
+
+    def _write(self, batch: List[_Entry]):
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                for entry in batch:
+                    cursor = conn.execute(
+                        "INSERT INTO events (time, event_type, payload, replay_of) VALUES (?, ?, ?, ?)",
+                        (entry.time, entry.event_type, entry.payload, entry.replay_of))
+                    event_id = cursor.lastrowid
+                    conn.executemany(
+                        "INSERT INTO executions (event_id, time, event_type, rule, status, exit_code, "
+                        "queue_wait, duration, stdout, stderr) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(event_id, entry.time, entry.event_type, e.rule, e.status, e.exit_code,
+                          entry.queue_wait, e.duration, _truncate(e.stdout, self.output_limit),
+                          _truncate(e.stderr, self.output_limit)) for e in entry.executions])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def purge(self) -> int:
+        """
+        清理超过保留天数或超出最大条数的事件记录
+        :return: 清理的事件数
+        """
+        self._last_purge = time.monotonic()
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                return 0
+            removed = 0
+            try:
+                if self.retention_days > 0:
+                    cutoff = time.time() - self.retention_days * 86400
+                    removed += conn.execute("DELETE FROM events WHERE time < ?", (cutoff,)).rowcount
+                if self.max_events > 0:
+                    row = conn.execute("SELECT id FROM events ORDER BY id DESC LIMIT 1 OFFSET ?",
+                                       (self.max_events,)).fetchone()
+                    if row:
+                        removed += conn.execute("DELETE FROM events WHERE id <= ?", (row[0],)).rowcount
+                if removed:
+                    conn.execute("PRAGMA incremental_vacuum")
+            except sqlite3.Error as e:
+                logger.error(f"[事件执行器] 执行日志清理失败：{str(e)}")
+            return removed
+
+    @staticmethod
+    def _conditions(event_type: Optional[str] = None, status: Optional[Union[str, Sequence[str]]] = None,
+                    rule: Optional[str] = None, start: Optional[float] = None,
+                    end: Optional[float] = None) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if event_type:
+            clauses.append("x.event_type = ?")
+            params.append(event_type)
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            clauses.append(f"x.status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if rule:
+            clauses.append("x.rule = ?")
+            params.append(rule)
+        if start is not None:
+            clauses.append("x.time >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("x.time < ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, page: int = 1, count: int = 50, include_payload: bool = False, **filters) -> Dict[str, Any]:
+        """
+        分页查询执行记录（按时间倒序）
+        filters：event_type、status（字符串或列表）、rule、start、end（Unix 时间戳）
+        """
+        page, count = max(1, page), min(max(1, count), 500)
+        where, params = self._conditions(**filters)
+        columns = "x.id, x.event_id, x.time, x.event_type, x.rule, x.status, x.exit_code, " \
+                  "x.queue_wait, x.duration, x.stdout, x.stderr, e.replay_of"
+        if include_payload:
+            columns += ", e.payload"
+        with self._lock:
+            if self._conn is None:
+                return {"total": 0, "page": page, "count": count, "items": []}
+            total = self._conn.execute(f"SELECT COUNT(*) FROM executions x{where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM executions x JOIN events e ON e.id = x.event_id{where} "
+                f"ORDER BY x.time DESC, x.id DESC LIMIT ? OFFSET ?",
+                params + [count, (page - 1) * count]).fetchall()
+        return {"total": total, "page": page, "count": count, "items": [dict(row) for row in rows]}
+
+    def events_for_replay(self, limit: int = 1000, **filters) -> List[Tuple[int, str, str]]:
+        """
+        按条件查找需要重放的事件（按时间正序，每个事件只返回一次）
+        :return: [(事件记录 id, 事件类型, 事件数据 JSON)]
+        """
+        where, params = self._conditions(**filters)
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                f"SELECT e.id, e.event_type, e.payload FROM events e WHERE e.id IN "
+                f"(SELECT x.event_id FROM executions x{where}) ORDER BY e.time, e.id LIMIT ?",
+                params + [max(1, limit)]).fetchall()
+        return [(row[0], row[1], row[2]) for row in rows]
+
+
+class Replay:
+    """
+    按固定速率重放日志中的事件，由后台线程逐个交给处理函数
+    handler(*entry) 返回是否已提交执行，entry 的第一项为记录 id，如 (事件记录 id, 事件类型, 事件数据 JSON)
+    """
+
+    def __init__(self, entries: List[Tuple[Any, ...]], handler, rate: float = 1.0):
+        self._entries = entries
+        self._handler = handler
+        # 每秒重放的事件数
+        self._interval = 1 / rate if rate > 0 else 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="eventexecutor-replay", daemon=True)
+        self.total = len(entries)
+        self.submitted = 0
+        self.skipped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def wait(self, timeout: float = None):
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": self.running, "total": self.total,
+                "submitted": self.submitted, "skipped": self.skipped}
+
+    def _loop(self):
+        for i, entry in enumerate(self._entries):
+            if self._stop.is_set() or (i and self._interval and self._stop.wait(self._interval)):
+                break
+            try:
+                if self._handler(*entry):
+                    self.submitted += 1
+                else:
+                    self.skipped += 1
+            except Exception as e:
+                self.skipped += 1
+                logger.error(f"[事件执行器] 重放事件 {entry[0]} 失败：{str(e)}")
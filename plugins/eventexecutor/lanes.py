@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# 默认车道：0 高优先级（⭐ 事件）、1 普通、2 低优先级
+LANE_NAMES = ("high", "normal", "low")
+
+# 队列关闭后 get 返回的标记
+CLOSED = object()
+
+
+class _LaneStats:
+    __slots__ = ("submitted", "dropped", "started", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.submitted = 0
+        self.dropped = 0
+        self.started = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class LaneQueue:
+    """
+    多车道优先级队列
+    总是先取优先级最高的非空车道；低车道的队首等待超过 max_wait 秒时先取该任务，避免饥饿。
+    队列已满时，高车道的新任务挤掉最低车道中最新的任务，低车道任务不会挤掉高车道任务
+    """
+
+    def __init__(self, lanes: int = 1, maxsize: int = 1000, max_wait: float = 0):
+        self._lanes: List[Deque[Tuple[float, Any]]] = [deque() for _ in range(max(1, lanes))]
+        self._maxsize = max(1, maxsize)
+        # 0 表示不做饥饿保护（严格优先级）
+        self._max_wait = max_wait
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = [_LaneStats() for _ in self._lanes]
+
+    @property
+    def lanes(self) -> int:
+        return len(self._lanes)
+
+    def put_nowait(self, item: Any, lane: int = 0) -> Optional[Any]:
+        """
+        放入任务，队列已满且没有可挤掉的低车道任务时抛出 queue.Full
+        :return: 被挤掉的任务（没有时为 None）
+        """
+        lane = min(max(0, lane), len(self._lanes) - 1)
+        evicted = None
+        with self._cond:
+            if self._closed:
+                raise queue.Full
+            if self._size >= self._maxsize:
+                victim = next((i for i in range(len(self._lanes) - 1, lane, -1) if self._lanes[i]), None)
+                if victim is None:
+                    self._stats[lane].dropped += 1
+                    raise queue.Full
+                evicted = self._lanes[victim].pop()[1]
+                self._stats[victim].dropped += 1
+                self._size -= 1
+            self._lanes[lane].append((time.monotonic(), item))
+            self._size += 1
+            self._stats[lane].submitted += 1
+            self._cond.notify()
+        return evicted
+
+    def get(self) -> Any:
+        """取出下一个任务，队列为空时阻塞；关闭后返回 CLOSED"""
+        with self._cond:
+            while not self._size:
+                if self._closed:
+                    return CLOSED
+                self._cond.wait()
+            now = time.monotonic()
+            lane = self._select(now)
+            enqueued, item = self._lanes[lane].popleft()
+            self._size -= 1
+            stats = self._stats[lane]
+            wait = now - enqueued
+            stats.started += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            return item
+
+    def _select(self, now: float) -> int:
+        first = next(i for i, lane in enumerate(self._lanes) if lane)
+        if self._max_wait > 0:
+            # 等待最久且已超时的低车道任务优先
+            oldest, oldest_lane = None, None
+            for i in range(first + 1, len(self._lanes)):
+                if self._lanes[i]:
+                    enqueued = self._lanes[i][0][0]
+                    if now - enqueued >= self._max_wait and (oldest is None or enqueued < oldest):
+                        oldest, oldest_lane = enqueued, i
+            if oldest_lane is not None:
+                return oldest_lane
+        return first
+
+    def qsize(self, lane: Optional[int] = None) -> int:
+        with self._cond:
+            return self._size if lane is None else len(self._lanes[lane])
+
+    def clear(self) -> int:
+        """清空队列，返回清除的任务数"""
+        with self._cond:
+            cleared = self._size
+            for lane in self._lanes:
+                lane.clear()
+            self._size = 0
+            return cleared
+
+    def close(self):
+        """关闭队列，唤醒所有等待的线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各车道的排队数、提交数、丢弃数、开始执行数与等待时间（毫秒）"""
+        with self._cond:
+            now = time.monotonic()
+            result = {}
+            for i, (lane, stats) in enumerate(zip(self._lanes, self._stats)):
+                name = LANE_NAMES[i] if len(self._lanes) == len(LANE_NAMES) else str(i)
+                result[name] = {
+                    "depth": len(lane),
+                    "submitted": stats.submitted,
+                    "dropped": stats.dropped,
+                    "started": stats.started,
+                    "wait_avg_ms": round(stats.wait_total / stats.started * 1000, 3) if stats.started else 0,
+                    "wait_max_ms": round(stats.wait_max * 1000, 3),
+                    # 队首任务已等待的时间
+                    "head_wait_ms": round((now - lane[0][0]) * 1000, 3) if lane else 0,
+                }
+            return result
@@ -0,0 +1,87 @@
+import fnmatch
+import re
+from typing import Iterable, List, Optional, Pattern, Tuple, Union
+
+# 正则表达式选择器前缀，如 re:^download\.(added|deleted)$
+REGEX_PREFIX = "re:"
+# 排除选择器前缀，如 !notice.message
+EXCLUDE_PREFIX = "!"
+
+
+class _PatternSet:
+    """一组事件类型模式：精确值用集合匹配，通配符与正则分别合并为一个正则"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.exact = set()
+        globs, regexes = [], []
+        self.match_all = False
+        for pattern in patterns:
+            if pattern in ("*", "**"):
+                self.match_all = True
+            elif pattern.startswith(REGEX_PREFIX):
+                source = pattern[len(REGEX_PREFIX):]
+                try:
+                    re.compile(source)
+                except re.error as e:
+                    raise ValueError(f"无效的正则表达式 {source!r}：{str(e)}")
+                regexes.append(f"(?:{source})")
+            elif any(char in pattern for char in "*?["):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                self.exact.add(pattern)
+        # 通配符需完整匹配，正则按搜索匹配
+        try:
+            self.glob: Optional[Pattern] = re.compile("|".join(globs)) if globs else None
+            self.regex: Optional[Pattern] = re.compile("|".join(regexes)) if regexes else None
+        except re.error as e:
+            raise ValueError(f"无效的事件类型模式：{str(e)}")
+
+    def __bool__(self) -> bool:
+        return self.match_all or bool(self.exact) or self.glob is not None or self.regex is not None
+
+    def matches(self, event_type: str) -> bool:
+        if self.match_all or event_type in self.exact:
+            return True
+        if self.glob is not None and self.glob.match(event_type):
+            return True
+        return self.regex is not None and self.regex.search(event_type) is not None
+
+
+class EventSelector:
+    """
+    事件类型选择器
+    支持精确值（transfer.complete）、通配符（subscribe.*）、正则（re:^download\\.）与排除（!notice.message）；
+    未配置包含模式时匹配全部事件
+    """
+
+    def __init__(self, patterns: Union[str, Iterable[str], None] = None,
+                 exclude: Union[str, Iterable[str], None] = None):
+        includes, excludes = [], list(split_patterns(exclude))
+        for pattern in split_patterns(patterns):
+            if pattern.startswith(EXCLUDE_PREFIX):
+                excludes.append(pattern[len(EXCLUDE_PREFIX):].strip())
+            else:
+                includes.append(pattern)
+        self.patterns: Tuple[str, ...] = tuple(includes)
+        self.excludes: Tuple[str, ...] = tuple(p for p in excludes if p)
+        self._include = _PatternSet(self.patterns)
+        self._exclude = _PatternSet(self.excludes)
+
+    @property
+    def match_all(self) -> bool:
+        """是否匹配全部事件（无包含模式且无排除）"""
+        return not self._include and not self._exclude
+
+    def matches(self, event_type: str) -> bool:
+        if self._include and not self._include.matches(event_type):
+            return False
+        return not self._exclude.matches(event_type)
+
+
+def split_patterns(patterns: Union[str, Iterable[str], None]) -> List[str]:
+    """将逗号分隔的字符串或列表拆分为模式列表"""
+    if not patterns:
+        return []
+    if isinstance(patterns, str):
+        patterns = patterns.split(",")
+    return [str(p).strip() for p in patterns if p is not None and str(p).strip()]
@@ -0,0 +1,231 @@
+import bisect
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 耗时分桶（秒）
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# 字节数分桶
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+# 内存分桶（字节）
+MEMORY_BUCKETS = tuple(2 ** n * 1048576 for n in range(0, 14, 2))
+
+# 计数器：名称 -> 说明
+COUNTERS = {
+    "events_total": "收到的事件数",
+    "events_ignored_total": "未执行的事件数（reason：no_rule 无匹配规则、duplicate 重复、queue_full 队列已满）",
+    "executions_total": "命令执行次数（status：ok、failed、timeout、error、short_circuit 熔断跳过）",
+    "exit_codes_total": "命令退出码（HTTP 规则为响应状态码）",
+    "timeouts_total": "命令超时次数",
+    "retries_total": "安排的重试次数",
+    "dead_letters_total": "重试耗尽后加入死信队列的次数",
+    "breaker_transitions_total": "熔断器状态变化次数（state：变化后的状态）",
+    "payload_bytes_total": "传递给命令的事件数据字节数",
+    "output_bytes_total": "命令输出的字节数（stream：stdout、stderr）",
+    "shell_pool_total": "预热 shell 池的命中次数（result：hit 交给预热的 bash、miss 重新启动）",
+    "handler_errors_total": "Python 处理函数抛出的异常数（error：异常类型）",
+    "http_requests_total": "HTTP 规则收到响应的请求数（connection：reused 复用空闲连接、new 新建连接）",
+}
+
+# 仪表：名称 -> 说明
+GAUGES = {
+    "breaker_state": "规则熔断器状态（0 关闭、1 打开、2 半开）",
+}
+
+# 直方图：名称 -> (分桶, 说明)
+HISTOGRAMS = {
+    "queue_wait_seconds": (TIME_BUCKETS, "事件从到达到开始处理的等待时间"),
+    "serialize_seconds": (TIME_BUCKETS, "事件数据转换与序列化耗时"),
+    "prepare_seconds": (TIME_BUCKETS, "事件数据传递准备耗时（内存文件等）"),
+    "spawn_seconds": (TIME_BUCKETS, "命令进程启动耗时"),
+    "run_seconds": (TIME_BUCKETS, "命令执行耗时（含进程启动）"),
+    "cpu_seconds": (TIME_BUCKETS, "命令消耗的 CPU 时间（用户态 + 内核态，含子进程）"),
+    "max_rss_bytes": (MEMORY_BUCKETS, "命令进程的最大常驻内存"),
+    "payload_bytes": (SIZE_BUCKETS, "单个事件的数据字节数"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    固定分桶直方图，记录数量、总和与最大值，分位数按桶内线性插值估算
+    """
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        # 最后一个桶为 +Inf
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - cumulative) / count)
+            cumulative += count
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, []
+        for bound, count in zip(list(self.bounds) + [math.inf], self.counts):
+            cumulative += count
+            buckets.append(["+Inf" if bound == math.inf else bound, cumulative])
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """
+    进程内指标：带标签的计数器、仪表与直方图
+    可输出为 JSON 结构（snapshot）或 Prometheus 文本格式（to_prometheus）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {name: {} for name in COUNTERS}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {name: {} for name in HISTOGRAMS}
+        self._gauges: Dict[str, Dict[Labels, float]] = {name: {} for name in GAUGES}
+        self.started = time.time()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._gauges[name][key] = value
+
+    def gauge(self, name: str, **labels) -> Optional[float]:
+        key = _labels(labels)
+        with self._lock:
+            return self._gauges[name].get(key)
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name]
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(HISTOGRAMS[name][0])
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        """按标签过滤后的计数器合计"""
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(value for key, value in self._counters[name].items() if wanted <= set(key))
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """按标签过滤后合并的直方图（副本）"""
+        wanted = set(_labels(labels))
+        merged = Histogram(HISTOGRAMS[name][0])
+        with self._lock:
+            for key, histogram in self._histograms[name].items():
+                if not wanted <= set(key):
+                    continue
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+                merged.count += histogram.count
+                merged.sum += histogram.sum
+                merged.max = max(merged.max, histogram.max)
+        return merged
+
+    def label_values(self, name: str, label: str) -> List[str]:
+        """计数器或直方图中某个标签出现过的值"""
+        series = self._counters.get(name) or self._histograms.get(name) or {}
+        with self._lock:
+            values = {dict(key).get(label) for key in series}
+        return sorted(value for value in values if value is not None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "uptime": time.time() - self.started,
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "histograms": {
+                    name: [{"labels": dict(key), **histogram.snapshot()} for key, histogram in series.items()]
+                    for name, series in self._histograms.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._gauges.items()
+                },
+            }
+
+    def to_prometheus(self, prefix: str = "moviepilot_eventexecutor_") -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# HELP {prefix}{name} {COUNTERS[name]}")
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for key, value in series.items():
+                    lines.append(f"{prefix}{name}{_format_labels(key)} {_format_number(value)}")
+            for name, series in self._gauges.items():
+                lines.append(f"# HELP {prefix}{name} {GAUGES[name]}")
+                lines.append(f"# TYPE {prefix}{name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{prefix}{name}{_format_labels(key)} {_format_number(value)}")
+            for name, series in self._histograms.items():
+                lines.append(f"# HELP {prefix}{name} {HISTOGRAMS[name][1]}")
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(histogram.bounds) + [math.inf], histogram.counts):
+                        cumulative += count
+                        le = ("le", _format_number(bound))
+                        lines.append(f"{prefix}{name}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{prefix}{name}_sum{_format_labels(key)} {_format_number(histogram.sum)}")
+                    lines.append(f"{prefix}{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
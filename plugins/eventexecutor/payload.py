@@ -0,0 +1,92 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+# 单个环境变量字符串（含 "名称=" 与结尾的 \0）的内核上限为 128KB（MAX_ARG_STRLEN），
+# 略低于该上限：能放入环境变量的数据仍通过 MP_EVENT_DATA 传递，只依赖该变量的命令不受影响
+DEFAULT_THRESHOLD = 127 * 1024
+
+TRANSPORTS = ("auto", "env", "file", "stdin")
+
+
+class Payload(NamedTuple):
+    """传递给子进程的事件数据"""
+    # 需要合并到子进程环境变量中的键值
+    env: Dict[str, str]
+    # 写入子进程标准输入的内容
+    input: Optional[str]
+    # 需要继承给子进程的文件描述符
+    pass_fds: Tuple[int, ...]
+
+
+def resolve_transport(transport: str, size: int, threshold: int = DEFAULT_THRESHOLD) -> str:
+    """
+    确定实际使用的传递方式，auto 按数据大小在 env 与 file 之间选择
+    """
+    if transport not in TRANSPORTS:
+        transport = "auto"
+    if transport == "auto":
+        return "env" if size <= threshold else "file"
+    return transport
+
+
+@contextmanager
+def open_payload(name: str, data: str, transport: str = "auto",
+                 threshold: int = DEFAULT_THRESHOLD) -> Iterator[Payload]:
+    """
+    按传递方式准备事件数据，退出时清理临时文件
+    :param name: 环境变量名，file 方式下路径写入 {name}_FILE
+    :param data: 事件数据
+    :param transport: auto / env / file / stdin
+    :param threshold: auto 方式下改用文件传递的字节数阈值
+    """
+    raw = data.encode("utf-8")
+    transport = resolve_transport(transport, len(raw), threshold)
+    if transport == "env":
+        yield Payload(env={name: data}, input=None, pass_fds=())
+    elif transport == "stdin":
+        yield Payload(env={}, input=data, pass_fds=())
+    else:
+        with _payload_file(raw) as (path, fds):
+            yield Payload(env={f"{name}_FILE": path}, input=None, pass_fds=fds)
+
+
+@contextmanager
+def _payload_file(raw: bytes) -> Iterator[Tuple[str, Tuple[int, ...]]]:
+    """
+    将数据写入内存文件：优先使用 memfd（子进程通过 /proc/self/fd 读取），
+    不支持时写入 tmpfs（/dev/shm）或系统临时目录
+    """
+    if hasattr(os, "memfd_create"):
+        try:
+            fd = os.memfd_create("mp-event-data")
+        except OSError:
+            fd = None
+        if fd is not None:
+            try:
+                _write_all(fd, raw)
+                yield f"/proc/self/fd/{fd}", (fd,)
+            finally:
+                os.close(fd)
+            return
+    tmpdir = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+    fd, path = tempfile.mkstemp(prefix="mp-event-", suffix=".json", dir=tmpdir)
+    try:
+        try:
+            _write_all(fd, raw)
+        finally:
+            os.close(fd)
+        yield path, ()
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _write_all(fd: int, raw: bytes):
+    view = memoryview(raw)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
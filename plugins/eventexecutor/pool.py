@@ -0,0 +1,236 @@
+import itertools
+import queue
+import threading
+import zlib
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.log import logger
+
+from .lanes import CLOSED, LaneQueue
+
+
+class WorkerPool:
+    """
+    有界队列 + 固定数量工作线程
+    submit 只负责入队，不阻塞调用方；同一 key（事件类型）的并发数可单独限制，
+    超出限制的任务暂存在该 key 的等待队列中，由同 key 任务完成后的线程接力执行。
+    队列可分为多个优先级车道（见 LaneQueue），lane 越小越先执行
+    """
+
+    def __init__(self, handler: Callable[[Any], None], workers: int = 4,
+                 queue_size: int = 1000, key_limit: int = 0, name: str = "eventexecutor",
+                 lanes: int = 1, max_wait: float = 0):
+        self._handler = handler
+        self._workers = max(1, workers)
+        self._queue = LaneQueue(lanes=lanes, maxsize=queue_size, max_wait=max_wait)
+        # 0 表示不单独限制，仅受工作线程数约束
+        self._key_limit = max(0, key_limit)
+        self._name = name
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running: Dict[str, int] = defaultdict(int)
+        self._pending: Dict[str, Deque[Any]] = defaultdict(deque)
+        # 已接受但尚未执行完成的任务数（队列中 + 等待中 + 执行中）
+        self._unfinished = 0
+        self._accepting = False
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self):
+        """启动工作线程"""
+        if self._threads:
+            return
+        self._accepting = True
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._worker, name=f"{self._name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key: str, job: Any, lane: int = 0) -> bool:
+        """
+        提交任务，队列已满（且没有可挤掉的低车道任务）或已停止时丢弃并返回 False
+        """
+        if not self._accepting:
+            return False
+        with self._lock:
+            self._unfinished += 1
+        try:
+            evicted = self._queue.put_nowait((key, job), lane)
+        except queue.Full:
+            self._discard()
+            return False
+        if evicted is not None:
+            logger.warning(f"[事件执行器] 执行队列已满，丢弃低优先级事件：{evicted[0]}")
+            self._discard()
+        return True
+
+    def _discard(self):
+        """记录一个未执行即丢弃的任务"""
+        with self._lock:
+            self._unfinished -= 1
+            self.dropped += 1
+            self._idle.notify_all()
+
+    def qsize(self) -> int:
+        """排队中的任务数（含按 key 限流等待的任务）"""
+        with self._lock:
+            return self._queue.qsize() + sum(len(p) for p in self._pending.values())
+
+    def lane_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各优先级车道的排队数与等待时间"""
+        return self._queue.stats()
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        停止接收新任务，等待已接受的任务执行完成后退出工作线程
+        :param timeout: 最长等待秒数，None 表示一直等待
+        :return: 超时后仍未执行的任务数
+        """
+        self._accepting = False
+        with self._lock:
+            self._idle.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+            remaining = self._unfinished
+            # 超时未执行的任务直接丢弃
+            for pending in self._pending.values():
+                pending.clear()
+        self._queue.clear()
+        self._queue.close()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        return remaining
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is CLOSED:
+                return
+            key, job = item
+            with self._lock:
+                if self._key_limit and self._running[key] >= self._key_limit:
+                    self._pending[key].append(job)
+                    continue
+                self._running[key] += 1
+            self._run(key, job)
+
+    def _run(self, key: str, job: Any):
+        """执行任务，完成后接力执行同 key 的等待任务"""
+        while job is not None:
+            try:
+                self._handler(job)
+            except Exception as e:
+                logger.error(f"[事件执行器] 任务执行异常：{str(e)}")
+            with self._lock:
+                pending = self._pending.get(key)
+                if pending:
+                    job = pending.popleft()
+                else:
+                    job = None
+                    self._running[key] -= 1
+                self._unfinished -= 1
+                self._idle.notify_all()
+
+
+class ShardedPool:
+    """
+    分片执行器：按 key 的哈希将任务分配到 N 个串行工作线程
+    同一 key 的任务始终由同一线程按提交顺序执行，不同 key 并行执行；
+    key 为 None 的任务没有顺序要求，轮流分配到各分片
+    """
+
+    def __init__(self, handler: Callable[[Any], None], shards: int = 4,
+                 queue_size: int = 1000, name: str = "eventexecutor-shard"):
+        self._handler = handler
+        self._shards = max(1, shards)
+        # 每个分片的队列容量
+        capacity = -(-max(1, queue_size) // self._shards)
+        self._queues = [LaneQueue(lanes=1, maxsize=capacity) for _ in range(self._shards)]
+        self._name = name
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._unfinished = 0
+        self._next = itertools.count()
+        self._accepting = False
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self):
+        """启动分片线程"""
+        if self._threads:
+            return
+        self._accepting = True
+        for i, shard in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(shard,), name=f"{self._name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shard_of(self, key: Optional[str]) -> int:
+        """key 所在的分片（crc32 哈希，重启后不变）"""
+        if key is None:
+            return next(self._next) % self._shards
+        return zlib.crc32(str(key).encode("utf-8")) % self._shards
+
+    def submit(self, key: Optional[str], job: Any, lane: int = 0) -> bool:
+        """
+        提交任务到 key 所在的分片，分片队列已满或已停止时丢弃并返回 False
+        分片内严格按提交顺序执行，lane 仅为与 WorkerPool 保持一致而保留
+        """
+        if not self._accepting:
+            return False
+        with self._lock:
+            self._unfinished += 1
+        try:
+            self._queues[self.shard_of(key)].put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._unfinished -= 1
+                self.dropped += 1
+                self._idle.notify_all()
+            return False
+        return True
+
+    def qsize(self) -> int:
+        return sum(shard.qsize() for shard in self._queues)
+
+    def shard_stats(self) -> List[Dict[str, Any]]:
+        """各分片的排队数与等待时间"""
+        return [next(iter(shard.stats().values())) for shard in self._queues]
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """
+        停止接收新任务，等待已接受的任务执行完成后退出分片线程
+        :return: 超时后仍未执行的任务数
+        """
+        self._accepting = False
+        with self._lock:
+            self._idle.wait_for(lambda: self._unfinished == 0, timeout=timeout)
+            remaining = self._unfinished
+        for shard in self._queues:
+            shard.clear()
+            shard.close()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        return remaining
+
+    def _worker(self, shard: LaneQueue):
+        while True:
+            job = shard.get()
+            if job is CLOSED:
+                return
+            try:
+                self._handler(job)
+            except Exception as e:
+                logger.error(f"[事件执行器] 任务执行异常：{str(e)}")
+            with self._lock:
+                self._unfinished -= 1
+                self._idle.notify_all()
@@ -0,0 +1,803 @@
+import json
+import os
+import platform
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, IO, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from app.log import logger
+
+from . import spawnd
+from .spawnd import ioprio_syscall
+
+# 命令输出的处理方式：failure 失败时记录；stream 逐行实时记录；off 不记录（仅保留用于执行日志与死信）
+OUTPUT_MODES = ("failure", "stream", "off")
+
+# 每次读取的最大字节数
+_CHUNK_SIZE = 64 * 1024
+# 进程退出后继续读取剩余输出的秒数（后台子进程可能仍持有管道）
+_DRAIN_TIMEOUT = 1.0
+# 不支持 pidfd 时检查进程是否退出的间隔（秒）
+_POLL_INTERVAL = 0.05
+
+
+# I/O 调度类别：best-effort 可指定 0~7 级，idle 只在磁盘空闲时读写
+_IOPRIO_CLASSES = {"best-effort": 2, "idle": 3}
+_IOPRIO_CLASS_SHIFT = 13
+
+
+def parse_ionice(value: Any) -> int:
+    """
+    解析 I/O 优先级：idle、best-effort 或 best-effort:级别（0 最高，7 最低）
+    :return: ioprio 值，0 表示不修改
+    """
+    if value is None or str(value).strip() == "":
+        return 0
+    name, _, level = str(value).strip().lower().partition(":")
+    if name not in _IOPRIO_CLASSES:
+        raise ValueError(f"无效的 I/O 优先级：{value}")
+    level = int(level) if level else (7 if name == "best-effort" else 0)
+    if not 0 <= level <= 7:
+        raise ValueError(f"无效的 I/O 优先级级别：{level}")
+    return _IOPRIO_CLASSES[name] << _IOPRIO_CLASS_SHIFT | level
+
+
+class ResourceLimits(NamedTuple):
+    """
+    单次执行的资源限制，由子进程在执行命令前设置，对其启动的所有进程生效
+    0 表示不限制
+    """
+    # CPU 时间（秒）
+    cpu_seconds: int = 0
+    # 虚拟内存（MB）
+    memory_mb: int = 0
+    # 打开的文件数
+    open_files: int = 0
+    # nice 增量（0~19，越大优先级越低）
+    nice: int = 0
+    # ioprio 值，见 parse_ionice
+    ioprio: int = 0
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any], default: "ResourceLimits") -> "ResourceLimits":
+        """
+        从规则配置读取资源限制：cpu_limit、memory_limit、open_files、nice、ionice
+        未配置的项使用全局设置
+        """
+        def get(key: str, current: Any, convert: Callable[[Any], Any]) -> Any:
+            value = options.get(key)
+            return current if value is None or value == "" else convert(value)
+
+        return cls(cpu_seconds=get("cpu_limit", default.cpu_seconds, int),
+                   memory_mb=get("memory_limit", default.memory_mb, int),
+                   open_files=get("open_files", default.open_files, int),
+                   nice=get("nice", default.nice, int),
+                   ioprio=get("ionice", default.ioprio, parse_ionice))
+
+    @property
+    def enabled(self) -> bool:
+        return any(self)
+
+    def wrap(self, argv: List[str]) -> List[str]:
+        """
+        返回设置资源限制后再执行 argv 的命令行（python spawnd.py --exec），未设置限制时原样返回
+        限制由新启动的单线程解释器设置后 exec 命令；多线程的插件进程中不使用 preexec_fn，
+        fork 出的子进程可能因其他线程持有的锁（日志、内存分配等）死锁
+        """
+        if not self.enabled:
+            return list(argv)
+        if self.ioprio and ioprio_syscall() is None:
+            logger.warning(f"[事件执行器] 当前平台（{platform.machine()}）不支持设置 I/O 优先级")
+        return spawnd.exec_argv(self, argv)
+
+    def describe(self) -> str:
+        parts = []
+        if self.cpu_seconds:
+            parts.append(f"CPU {self.cpu_seconds}秒")
+        if self.memory_mb:
+            parts.append(f"内存 {self.memory_mb}MB")
+        if self.open_files:
+            parts.append(f"文件数 {self.open_files}")
+        if self.nice:
+            parts.append(f"nice {self.nice}")
+        if self.ioprio:
+            name = {v: k for k, v in _IOPRIO_CLASSES.items()}.get(self.ioprio >> _IOPRIO_CLASS_SHIFT)
+            parts.append(f"ionice {name}:{self.ioprio & 7}")
+        return "、".join(parts)
+
+
+class ChildProcess:
+    """
+    正在执行的命令进程，命令在独立的会话（进程组）中运行，终止时杀死整个进程组，
+    包括 shell 启动的 curl、ffmpeg 等子进程
+    """
+
+    def __init__(self, proc: subprocess.Popen):
+        self.proc = proc
+        self.pid = proc.pid
+        self._lock = threading.Lock()
+        self._exited = False
+        self.timed_out = False
+
+    def expire(self):
+        """执行超时，杀死进程组"""
+        self.kill(timed_out=True)
+
+    def kill(self, sig: int = signal.SIGKILL, timed_out: bool = False) -> bool:
+        """杀死进程组，进程已退出时返回 False"""
+        with self._lock:
+            # 进程退出后、回收前的僵尸状态下 pid 不会被复用，回收后不再发送信号
+            if self._exited:
+                return False
+            self.timed_out = self.timed_out or timed_out
+            try:
+                os.killpg(self.pid, sig)
+            except ProcessLookupError:
+                return False
+            return True
+
+    def wait(self) -> Any:
+        """
+        等待进程退出并回收，返回 wait4 统计的资源使用（含已回收的子进程）
+        """
+        while True:
+            try:
+                # 只等待不回收，标记退出后再回收，避免超时线程向复用的 pid 发送信号
+                os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOWAIT)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+        return self.reap()
+
+    def reap(self) -> Any:
+        """进程已退出（或确认退出）后标记并回收，返回资源使用"""
+        with self._lock:
+            self._exited = True
+        try:
+            _, status, rusage = os.wait4(self.pid, 0)
+        except ChildProcessError:
+            self.proc.wait()
+            return None
+        self.proc.returncode = os.waitstatus_to_exitcode(status)
+        return rusage
+
+    def open_exit_fd(self) -> int:
+        """返回进程退出时可读的描述符（pidfd），由调用方关闭"""
+        return os.pidfd_open(self.pid)
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.proc.returncode
+
+    @property
+    def running(self) -> bool:
+        """进程仍在运行（只检查不回收）"""
+        with self._lock:
+            if self._exited:
+                return False
+            try:
+                return os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None
+            except ChildProcessError:
+                return False
+
+    def close(self):
+        """异常退出时回收已杀死的进程"""
+        if self.proc.returncode is None:
+            self.proc.wait()
+
+
+class ProcessTracker:
+    """正在执行的命令进程，停止服务时杀死仍在运行的进程组"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._children: Set[Union[ChildProcess, "RemoteChild"]] = set()
+
+    def add(self, child: Union[ChildProcess, "RemoteChild"]):
+        with self._lock:
+            self._children.add(child)
+
+    def discard(self, child: Union[ChildProcess, "RemoteChild"]):
+        with self._lock:
+            self._children.discard(child)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._children)
+
+    def kill_all(self) -> int:
+        """杀死所有进程组，返回杀死的数量"""
+        with self._lock:
+            children = list(self._children)
+        return sum(1 for child in children if child.kill())
+
+
+class Usage(NamedTuple):
+    """启动进程回传的资源使用，字段与 resource.struct_rusage 一致"""
+    ru_utime: float
+    ru_stime: float
+    ru_maxrss: int
+
+
+class ForkServerError(OSError):
+    """启动进程不可用，调用方改为在插件进程内启动命令"""
+    pass
+
+
+class RemoteChild:
+    """由启动进程执行的命令，接口与 ChildProcess 一致"""
+
+    def __init__(self, server: "ForkServer", sock: socket.socket, request_id: int):
+        self._server = server
+        self._sock = sock
+        self.id = request_id
+        self.pid = 0
+        self.returncode: Optional[int] = None
+        self.timed_out = False
+        self._usage: Optional[Usage] = None
+        self._error: Optional[OSError] = None
+        self._spawned = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        # open_exit_fd 返回的管道的写入端，命令结束时关闭
+        self._exit_fds: List[int] = []
+
+    def on_message(self, message: Dict[str, Any]):
+        """处理启动进程的响应（由读取线程调用）"""
+        if "pid" in message:
+            self.pid = message["pid"]
+            self._spawned.set()
+        elif "error" in message:
+            self._error = OSError(message.get("errno") or 0, message["error"], message.get("filename"))
+            self._spawned.set()
+            self._finish()
+        else:
+            self.returncode = message.get("status")
+            self.timed_out = bool(message.get("timed_out"))
+            if message.get("rusage"):
+                self._usage = Usage(*message["rusage"])
+            self._finish()
+
+    def on_lost(self):
+        """启动进程意外退出，命令已无法等待，直接杀死其进程组"""
+        if self.pid and not self._done.is_set():
+            try:
+                os.killpg(self.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self._error = self._error or ForkServerError("启动进程已退出")
+        self._spawned.set()
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            fds, self._exit_fds = self._exit_fds, []
+        for fd in fds:
+            os.close(fd)
+
+    def open_exit_fd(self) -> int:
+        """返回命令结束时可读（管道关闭）的描述符，由调用方关闭"""
+        read_fd, write_fd = os.pipe()
+        with self._lock:
+            if not self._done.is_set():
+                self._exit_fds.append(write_fd)
+                return read_fd
+        os.close(write_fd)
+        return read_fd
+
+    @property
+    def running(self) -> bool:
+        return self._spawned.is_set() and not self._done.is_set()
+
+    def wait_spawned(self, timeout: float) -> int:
+        if not self._spawned.wait(timeout):
+            raise ForkServerError("启动进程无响应")
+        if self._error is not None:
+            raise self._error
+        return self.pid
+
+    def expire(self):
+        """执行超时，杀死进程组"""
+        self.kill(timed_out=True)
+
+    def kill(self, sig: int = signal.SIGKILL, timed_out: bool = False) -> bool:
+        """由启动进程杀死进程组（启动进程知道命令是否已回收），命令已结束时返回 False"""
+        if self._done.is_set():
+            return False
+        try:
+            self._server.send(self._sock, {"op": "kill", "id": self.id, "signal": int(sig), "timeout": timed_out})
+        except ForkServerError:
+            return False
+        return True
+
+    def wait(self) -> Optional[Usage]:
+        self._done.wait()
+        return self.reap()
+
+    def reap(self) -> Optional[Usage]:
+        """命令已结束后返回启动进程回传的资源使用"""
+        if self.returncode is None:
+            raise self._error or ForkServerError("命令的退出状态未知")
+        return self._usage
+
+    def close(self):
+        pass
+
+
+class ForkServer:
+    """
+    命令启动进程（见 spawnd.py）的客户端
+    从体积很大的 MoviePilot 进程 fork 需要复制页表，突发时每次启动耗时数毫秒并造成内存尖峰；
+    启动进程是独立的小 Python 解释器，由它通过 posix_spawn 启动命令。启动进程意外退出后，
+    下一次启动命令时自动重启（间隔不少于 restart_interval 秒，期间由调用方改为进程内启动）
+    """
+
+    def __init__(self, python: str = sys.executable, restart_interval: float = 1.0,
+                 spawn_timeout: float = 10):
+        self._python = python
+        self._restart_interval = restart_interval
+        self._spawn_timeout = spawn_timeout
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._proc: Optional[subprocess.Popen] = None
+        # 当前连接上执行中的命令：请求 id -> 命令
+        self._pending: Dict[int, RemoteChild] = {}
+        self._next_id = 0
+        self._started_at = 0.0
+        self._stopped = False
+        self.spawned = 0
+        self.restarts = 0
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc else None
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None
+
+    def start(self):
+        with self._lock:
+            self._stopped = False
+            self._start()
+
+    def _start(self):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            parent.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, spawnd.MAX_MESSAGE)
+            # -I -S：不读取用户环境与 site-packages，只加载标准库
+            self._proc = subprocess.Popen([self._python, "-I", "-S", spawnd.__file__, str(child.fileno())],
+                                          pass_fds=(child.fileno(),), stdin=subprocess.DEVNULL,
+                                          start_new_session=True)
+        except Exception:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        self._sock = parent
+        self._pending = {}
+        self._started_at = time.monotonic()
+        threading.Thread(target=self._reader, args=(parent, self._pending), name="eventexecutor-forkserver",
+                         daemon=True).start()
+
+    def stop(self, timeout: float = 5):
+        """关闭连接，启动进程终止仍在执行的命令后退出"""
+        with self._lock:
+            self._stopped = True
+            sock, self._sock = self._sock, None
+            proc = self._proc
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        if proc is not None:
+            try:
+                proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": self.running, "pid": self.pid, "spawned": self.spawned,
+                "restarts": self.restarts, "executing": len(self._pending)}
+
+    def send(self, sock: socket.socket, message: Dict[str, Any], fds: Sequence[int] = ()):
+        data = json.dumps(message).encode("utf-8")
+        if len(data) > spawnd.MAX_MESSAGE:
+            raise ForkServerError("启动请求过大")
+        with self._send_lock:
+            try:
+                socket.send_fds(sock, [data], list(fds))
+            except OSError as e:
+                raise ForkServerError(e.errno, f"发送启动请求失败：{e.strerror or str(e)}")
+
+    def _connect(self) -> Tuple[socket.socket, Dict[int, RemoteChild], int]:
+        """返回当前连接（必要时重启启动进程）、其执行中的命令与新的请求 id"""
+        with self._lock:
+            if self._sock is None:
+                if self._stopped:
+                    raise ForkServerError("启动进程已停止")
+                if time.monotonic() - self._started_at < self._restart_interval:
+                    raise ForkServerError("启动进程重启过于频繁")
+                self._start()
+                self.restarts += 1
+                logger.warning(f"[事件执行器] 启动进程已重启（第 {self.restarts} 次），进程号 {self.pid}")
+            self._next_id += 1
+            return self._sock, self._pending, self._next_id
+
+    def spawn(self, argv: List[str], env: Dict[str, str], pass_fds: Sequence[int] = (),
+              limits: Optional[ResourceLimits] = None,
+              stdin: bool = False) -> Tuple[RemoteChild, Optional[IO[bytes]], IO[bytes], IO[bytes]]:
+        """
+        启动命令，标准输入（可选）、输出与错误为插件持有的管道
+        :return: (命令, 标准输入写入端, 标准输出读取端, 标准错误读取端)
+        :raises ForkServerError: 启动进程不可用
+        :raises OSError: 命令无法启动（如程序不存在）
+        """
+        sock, pending, request_id = self._connect()
+        child = RemoteChild(self, sock, request_id)
+        pipes = [os.pipe() if stdin else None, os.pipe(), os.pipe()]
+        # 传给命令的一端：标准输入的读取端、输出与错误的写入端
+        remote = [pipe[0] if i == 0 else pipe[1] for i, pipe in enumerate(pipes) if pipe]
+        targets = ([0] if stdin else []) + [1, 2] + list(pass_fds)
+        pending[child.id] = child
+        try:
+            self.send(sock, {"op": "spawn", "id": child.id, "argv": argv, "env": env, "fds": targets,
+                             "limits": list(limits) if limits and limits.enabled else None},
+                      remote + list(pass_fds))
+            child.wait_spawned(self._spawn_timeout)
+        except BaseException:
+            pending.pop(child.id, None)
+            for pipe in pipes:
+                if pipe:
+                    os.close(pipe[0])
+                    os.close(pipe[1])
+            raise
+        for fd in remote:
+            os.close(fd)
+        self.spawned += 1
+        stdin_pipe = open(pipes[0][1], "wb", buffering=0) if stdin else None
+        return child, stdin_pipe, open(pipes[1][0], "rb", buffering=0), open(pipes[2][0], "rb", buffering=0)
+
+    def _reader(self, sock: socket.socket, pending: Dict[int, RemoteChild]):
+        while True:
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            child = pending.get(message.get("id"))
+            if child is None:
+                continue
+            if "pid" not in message:
+                pending.pop(child.id, None)
+            child.on_message(message)
+        with self._lock:
+            lost = self._sock is sock
+            if lost:
+                self._sock = None
+            stopped = self._stopped
+        children = list(pending.values())
+        pending.clear()
+        for child in children:
+            child.on_lost()
+        if lost and not stopped:
+            code = self._proc.poll() if self._proc else None
+            logger.error(f"[事件执行器] 启动进程意外退出（退出码 {code}），{len(children)} 个执行中的命令已终止")
+
+
+class OutputBuffer:
+    """
+    有界输出缓冲：只保留开头 head 字节与最后 tail 字节，并统计总字节数，
+    无论命令输出多少内存占用都是固定的；可选地按行转发（超长的行截断到 max_line 字节）
+    """
+
+    def __init__(self, head: int = 4096, tail: int = 4096, on_line: Optional[Callable[[str], None]] = None,
+                 max_line: int = 4096):
+        self._head_size = max(0, head)
+        self._tail_size = max(0, tail)
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._on_line = on_line
+        self._max_line = max(1, max_line)
+        # 未遇到换行符的不完整行
+        self._line = bytearray()
+        self.bytes = 0
+
+    def feed(self, data: bytes):
+        self.bytes += len(data)
+        rest = data
+        room = self._head_size - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            rest = data[room:]
+        if rest and self._tail_size:
+            self._tail += rest
+            # 超过两倍再裁剪，均摊复制开销
+            if len(self._tail) > 2 * self._tail_size:
+                del self._tail[:-self._tail_size]
+        if self._on_line:
+            self._split_lines(data)
+
+    def _split_lines(self, data: bytes):
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            self._emit(data[start:end])
+            start = end + 1
+        room = self._max_line - len(self._line)
+        if start < len(data) and room > 0:
+            self._line += data[start:start + room]
+
+    def _emit(self, piece: bytes):
+        line = bytes(self._line + piece[:max(0, self._max_line - len(self._line))])
+        self._line = bytearray()
+        self._on_line(line.decode("utf-8", errors="replace").rstrip("\r"))
+
+    def close(self):
+        """输出结束，转发最后一个不完整的行"""
+        if self._on_line and self._line:
+            self._emit(b"")
+
+    @property
+    def truncated(self) -> bool:
+        return self.bytes > len(self._head) + min(len(self._tail), self._tail_size)
+
+    def text(self) -> str:
+        """保留的输出，中间省略的部分标注字节数"""
+        head = bytes(self._head)
+        tail = bytes(self._tail[-self._tail_size:]) if self._tail_size else b""
+        omitted = self.bytes - len(head) - len(tail)
+        if omitted > 0:
+            return (head.decode("utf-8", errors="replace")
+                    + f"\n...（省略 {omitted} 字节）...\n"
+                    + tail.decode("utf-8", errors="replace"))
+        return (head + tail).decode("utf-8", errors="replace")
+
+
+class Launch(NamedTuple):
+    """
+    命令启动请求：执行命令的步骤以生成器产出启动请求，由调用方在线程中（run_process）
+    或事件循环中（aioengine.run_process）执行，再把 ProcessResult 送回生成器
+    """
+    command: Union[str, List[str]]
+    # run_process 的其余参数
+    options: Dict[str, Any]
+
+
+class ProcessResult(NamedTuple):
+    """命令执行结果，stdout / stderr 为有界缓冲中保留的输出"""
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def spawn_process(command: Union[str, List[str]], shell: bool = True, env: Optional[Dict[str, str]] = None,
+                  input: Optional[str] = None, pass_fds: Sequence[int] = (),
+                  limits: Optional[ResourceLimits] = None, spawner: Optional[ForkServer] = None,
+                  worker: Optional[Any] = None) -> Tuple[Union[ChildProcess, RemoteChild], Optional[IO[bytes]],
+                                                         IO[bytes], IO[bytes]]:
+    """
+    启动命令：依次尝试预热 shell、启动进程与插件进程内启动，参数见 run_process
+    :return: (命令, 标准输入写入端（input 为 None 时为 None）, 标准输出读取端, 标准错误读取端)
+    :raises OSError: 命令无法启动
+    """
+    child = None
+    if worker is not None:
+        try:
+            child, stdin_pipe, stdout_pipe, stderr_pipe = worker.submit(command, dict(os.environ) if env is None
+                                                                        else env, stdin=input is not None)
+        except OSError as e:
+            logger.debug(f"[事件执行器] {str(e)}，重新启动命令")
+            # 与预热的 shell 一样由 bash 执行
+            command, shell = worker.argv(command), False
+    if child is None and spawner is not None:
+        argv = ["/bin/sh", "-c", command] if shell else list(command)
+        try:
+            child, stdin_pipe, stdout_pipe, stderr_pipe = spawner.spawn(
+                argv, dict(os.environ) if env is None else env, pass_fds=pass_fds, limits=limits,
+                stdin=input is not None)
+        except ForkServerError as e:
+            logger.debug(f"[事件执行器] 启动进程不可用，在插件进程内启动命令：{str(e)}")
+    if child is None:
+        if limits is not None and limits.enabled:
+            command, shell = limits.wrap(["/bin/sh", "-c", command] if shell else list(command)), False
+        proc = subprocess.Popen(command, shell=shell, env=env, pass_fds=tuple(pass_fds), bufsize=0,
+                                stdin=subprocess.PIPE if input is not None else None,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                start_new_session=True)
+        child = ChildProcess(proc)
+        stdin_pipe, stdout_pipe, stderr_pipe = proc.stdin, proc.stdout, proc.stderr
+    return child, stdin_pipe, stdout_pipe, stderr_pipe
+
+
+def run_process(command: Union[str, List[str]], shell: bool = True, env: Optional[Dict[str, str]] = None,
+                input: Optional[str] = None, pass_fds: Sequence[int] = (), timeout: Optional[float] = None,
+                stdout: Optional[OutputBuffer] = None, stderr: Optional[OutputBuffer] = None,
+                on_spawn: Optional[Callable[[Any], None]] = None,
+                limits: Optional[ResourceLimits] = None, tracker: Optional[ProcessTracker] = None,
+                on_exit: Optional[Callable[[Any], None]] = None,
+                spawner: Optional[ForkServer] = None, worker: Optional[Any] = None) -> ProcessResult:
+    """
+    执行命令，标准输出与错误由调用线程边读边写入有界缓冲，不在内存中累积完整输出
+    命令在独立的进程组中运行，超时时杀死整个进程组并抛出 subprocess.TimeoutExpired（output / stderr 为已保留的输出）
+    :param on_spawn: 进程启动后的回调，用于统计启动耗时
+    :param limits: 资源限制
+    :param tracker: 登记正在执行的进程，停止服务时统一杀死
+    :param on_exit: 进程回收后的回调，参数为 wait4 统计的资源使用（resource.struct_rusage 或 Usage）
+    :param spawner: 命令启动进程，不可用时在插件进程内启动
+    :param worker: 预热 shell 池中的空闲进程（shellpool.ShellWorker），已退出时按 worker.argv 新启动 bash
+    """
+    stdout = stdout if stdout is not None else OutputBuffer()
+    stderr = stderr if stderr is not None else OutputBuffer()
+    child, stdin_pipe, stdout_pipe, stderr_pipe = spawn_process(command, shell=shell, env=env, input=input,
+                                                                pass_fds=pass_fds, limits=limits,
+                                                                spawner=spawner, worker=worker)
+    if tracker is not None:
+        tracker.add(child)
+    if on_spawn:
+        on_spawn(child)
+    io = _ProcessIO(child, stdin_pipe, input.encode("utf-8") if input is not None else None,
+                    [(stdout_pipe, stdout), (stderr_pipe, stderr)])
+    try:
+        rusage = io.wait(time.monotonic() + timeout if timeout is not None else None)
+    except BaseException:
+        child.kill()
+        child.close()
+        io.close()
+        raise
+    finally:
+        if tracker is not None:
+            tracker.discard(child)
+    if on_exit and rusage is not None:
+        on_exit(rusage)
+    io.drain(_DRAIN_TIMEOUT)
+    if child.timed_out:
+        raise subprocess.TimeoutExpired(command, timeout, output=stdout.text(), stderr=stderr.text())
+    return ProcessResult(child.returncode, stdout.text(), stderr.text())
+
+
+class _ProcessIO:
+    """
+    在调用线程中用一个 selector 同时读取输出、写入标准输入并等待进程退出（pidfd 或启动进程的通知管道），
+    超时按截止时间在同一循环中处理，每次执行不再创建读取线程与定时器
+    """
+
+    def __init__(self, child: Union[ChildProcess, RemoteChild], stdin_pipe: Optional[IO[bytes]],
+                 data: Optional[bytes], outputs: List[Tuple[IO[bytes], OutputBuffer]]):
+        self._child = child
+        self._selector = selectors.DefaultSelector()
+        self._readers = 0
+        self._writer: Optional[IO[bytes]] = None
+        self._data = memoryview(data or b"")
+        for pipe, buffer in outputs:
+            os.set_blocking(pipe.fileno(), False)
+            self._selector.register(pipe, selectors.EVENT_READ, buffer)
+            self._readers += 1
+        if stdin_pipe is not None:
+            if self._data:
+                os.set_blocking(stdin_pipe.fileno(), False)
+                self._selector.register(stdin_pipe, selectors.EVENT_WRITE)
+                self._writer = stdin_pipe
+            else:
+                stdin_pipe.close()
+        try:
+            self._exit_fd: Optional[int] = child.open_exit_fd()
+        except (AttributeError, OSError):
+            # 不支持 pidfd（Linux 5.3 以前），定时检查进程是否退出
+            self._exit_fd = None
+        else:
+            self._selector.register(self._exit_fd, selectors.EVENT_READ)
+
+    def wait(self, deadline: Optional[float]) -> Any:
+        """等待进程退出并回收，期间读写管道；到达截止时间时杀死进程组"""
+        expired = False
+        while True:
+            timeout = None if deadline is None or expired else max(0.0, deadline - time.monotonic())
+            if self._exit_fd is None:
+                timeout = _POLL_INTERVAL if timeout is None else min(timeout, _POLL_INTERVAL)
+            exited = False
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj == self._exit_fd:
+                    exited = True
+                elif key.fileobj is self._writer:
+                    self._write()
+                else:
+                    self._read(key)
+            if exited or (self._exit_fd is None and not self._child.running):
+                break
+            if not expired and deadline is not None and time.monotonic() >= deadline:
+                expired = True
+                self._child.expire()
+        self._close_exit_fd()
+        return self._child.reap()
+
+    def drain(self, timeout: float):
+        """读取剩余输出（后台子进程可能仍持有管道，最多等待 timeout 秒）后关闭管道"""
+        deadline = time.monotonic() + timeout
+        while self._readers:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in self._selector.select(remaining):
+                if key.fileobj is self._writer:
+                    self._write()
+                else:
+                    self._read(key)
+        self.close()
+
+    def close(self):
+        self._close_exit_fd()
+        self._close_writer()
+        for key in list(self._selector.get_map().values()):
+            self._close_reader(key)
+        self._selector.close()
+
+    def _read(self, key: selectors.SelectorKey):
+        try:
+            chunk = os.read(key.fd, _CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            chunk = b""
+        if chunk:
+            key.data.feed(chunk)
+        else:
+            self._close_reader(key)
+
+    def _write(self):
+        try:
+            written = os.write(self._writer.fileno(), self._data[:_CHUNK_SIZE])
+        except BlockingIOError:
+            return
+        except OSError:
+            # 命令不读取标准输入时忽略
+            self._close_writer()
+            return
+        self._data = self._data[written:]
+        if not self._data:
+            self._close_writer()
+
+    def _close_reader(self, key: selectors.SelectorKey):
+        self._selector.unregister(key.fileobj)
+        self._readers -= 1
+        key.data.close()
+        try:
+            key.fileobj.close()
+        except OSError:
+            pass
+
+    def _close_writer(self):
+        if self._writer is None:
+            return
+        self._selector.unregister(self._writer)
+        try:
+            self._writer.close()
+        except OSError:
+            pass
+        self._writer = None
+
+    def _close_exit_fd(self):
+        if self._exit_fd is None:
+            return
+        self._selector.unregister(self._exit_fd)
+        os.close(self._exit_fd)
+        self._exit_fd = None
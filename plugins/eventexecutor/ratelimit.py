@@ -0,0 +1,227 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+# 超限策略：queue 排队等待令牌；drop_newest 丢弃新事件；drop_oldest 积压已满时丢弃最早的事件；
+# sample 超限事件每 N 个保留 1 个排队，其余丢弃
+OVERFLOW_POLICIES = ("queue", "drop_newest", "drop_oldest", "sample")
+
+
+class TokenBucket:
+    """
+    令牌桶：按固定速率补充令牌，最多积累 burst 个
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        # 每秒补充的令牌数
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def ready(self) -> bool:
+        """是否有可用令牌（不消耗）"""
+        self._refill()
+        return self._tokens >= 1
+
+    def consume(self):
+        self._tokens -= 1
+
+    def wait_time(self) -> float:
+        """距离下一个令牌可用的秒数"""
+        self._refill()
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+
+
+class Limit:
+    """
+    一个限流范围（单个规则或全局）的配置
+    """
+
+    def __init__(self, per_minute: int, burst: int = 10, policy: str = "queue",
+                 backlog: int = 1000, sample: int = 10, clock: Callable[[], float] = time.monotonic):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的超限策略：{policy}")
+        self.per_minute = per_minute
+        self.burst = max(1, burst)
+        self.bucket = TokenBucket(per_minute / 60, burst, clock) if per_minute > 0 else None
+        self.policy = policy
+        self.backlog_size = max(1, backlog)
+        self.sample = max(1, sample)
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any], default: "Limit",
+                     clock: Callable[[], float] = time.monotonic) -> Optional["Limit"]:
+        """
+        从规则配置读取限流：rate_limit（次/分钟）、burst、overflow、backlog、sample
+        未配置 rate_limit 时返回 None
+        """
+        if not options.get("rate_limit"):
+            return None
+        return cls(per_minute=int(options["rate_limit"]),
+                   burst=int(options.get("burst") or default.burst),
+                   policy=options.get("overflow") or default.policy,
+                   backlog=int(options.get("backlog") or default.backlog_size),
+                   sample=int(options.get("sample") or default.sample),
+                   clock=clock)
+
+
+class _Scope:
+    """单个规则的运行状态：适用的令牌桶、超限策略、积压队列与计数"""
+
+    def __init__(self, limit: Optional[Limit], global_limit: Optional[Limit]):
+        self.buckets = [l.bucket for l in (limit, global_limit) if l is not None and l.bucket is not None]
+        # 规则未单独限流时使用全局的超限策略
+        policy_source = limit if limit is not None else global_limit
+        self.policy = policy_source.policy if policy_source else "queue"
+        self.backlog_size = policy_source.backlog_size if policy_source else 1000
+        self.sample = policy_source.sample if policy_source else 1
+        self.backlog: Deque[Any] = deque()
+        self.overflowed = 0
+        self.counters = {"passed": 0, "queued": 0, "dropped": 0, "sampled": 0}
+
+    def ready(self) -> bool:
+        return all(bucket.ready() for bucket in self.buckets)
+
+    def consume(self):
+        for bucket in self.buckets:
+            bucket.consume()
+
+    def wait_time(self) -> float:
+        return max((bucket.wait_time() for bucket in self.buckets), default=0)
+
+
+class RateLimiter:
+    """
+    令牌桶限流：每个规则可单独限流，全局限流作用于所有规则，两者同时满足时才执行
+    超限的事件按策略进入规则的积压队列，由限流线程在令牌可用时提交，或直接丢弃
+    """
+
+    def __init__(self, handler: Callable[[Any, List[str]], None], global_limit: Optional[Limit] = None):
+        # handler(item, 规则名称列表)
+        self._handler = handler
+        self._global = global_limit
+        self._scopes: Dict[str, _Scope] = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="eventexecutor-ratelimit", daemon=True)
+
+    def add_rule(self, name: str, limit: Optional[Limit] = None):
+        self._scopes[name] = _Scope(limit, self._global)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, item: Any, names: List[str]):
+        """
+        对事件匹配的每个规则取令牌，立即可执行的规则交给处理函数，其余按超限策略处理
+        """
+        passed = []
+        with self._cond:
+            for name in names:
+                scope = self._scopes.get(name)
+                if scope is None:
+                    scope = self._scopes[name] = _Scope(None, self._global)
+                if not scope.buckets:
+                    passed.append(name)
+                    continue
+                # 已有积压时排在积压之后，保持顺序
+                if not scope.backlog and scope.ready():
+                    scope.consume()
+                    scope.counters["passed"] += 1
+                    passed.append(name)
+                elif not self._stopping:
+                    self._overflow(scope, item)
+                else:
+                    scope.counters["dropped"] += 1
+        if passed:
+            self._handler(item, passed)
+
+    def _overflow(self, scope: _Scope, item: Any):
+        counters = scope.counters
+        if scope.policy == "drop_newest":
+            counters["dropped"] += 1
+            return
+        if scope.policy == "sample":
+            scope.overflowed += 1
+            if (scope.overflowed - 1) % scope.sample:
+                counters["dropped"] += 1
+                return
+            counters["sampled"] += 1
+        if len(scope.backlog) >= scope.backlog_size:
+            if scope.policy == "queue":
+                counters["dropped"] += 1
+                return
+            # drop_oldest / sample：保留较新的事件
+            scope.backlog.popleft()
+            counters["dropped"] += 1
+        scope.backlog.append(item)
+        counters["queued"] += 1
+        self._cond.notify()
+
+    def backlog(self) -> int:
+        with self._cond:
+            return sum(len(scope.backlog) for scope in self._scopes.values())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._cond:
+            return {name: {"policy": scope.policy, "backlog": len(scope.backlog), **scope.counters}
+                    for name, scope in self._scopes.items() if scope.buckets}
+
+    def stop(self, timeout: float = None) -> int:
+        """
+        停止限流线程，积压中的事件不再执行
+        :return: 丢弃的积压事件数
+        """
+        with self._cond:
+            self._stopping = True
+            remaining = 0
+            for scope in self._scopes.values():
+                remaining += len(scope.backlog)
+                scope.counters["dropped"] += len(scope.backlog)
+                scope.backlog.clear()
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        return remaining
+
+    def _next_ready(self) -> Tuple[Optional[Tuple[Any, str]], Optional[float]]:
+        """取出一个可执行的积压事件，没有时返回最短等待时间"""
+        wait = None
+        for name, scope in self._scopes.items():
+            if not scope.backlog:
+                continue
+            delay = scope.wait_time()
+            if delay <= 0:
+                scope.consume()
+                scope.counters["passed"] += 1
+                return (scope.backlog.popleft(), name), None
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    ready, wait = self._next_ready()
+                    if ready is not None:
+                        break
+                    self._cond.wait(wait)
+            item, name = ready
+            try:
+                self._handler(item, [name])
+            except Exception as e:
+                logger.error(f"[事件执行器] 限流事件执行异常：{str(e)}")
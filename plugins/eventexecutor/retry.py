@@ -0,0 +1,302 @@
+import math
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+
+from app.log import logger
+
+
+def parse_exit_codes(value: Union[str, Iterable[Any], None]) -> FrozenSet[int]:
+    """解析可重试的退出码：逗号分隔的字符串或列表，为空表示任意非 0 退出码"""
+    if value is None or value == "":
+        return frozenset()
+    if isinstance(value, (str, int)):
+        value = str(value).split(",")
+    return frozenset(int(str(code).strip()) for code in value if str(code).strip())
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+class RetryPolicy:
+    """
+    重试策略：最大执行次数、指数退避（带随机抖动）与可重试的失败类型
+    """
+
+    def __init__(self, attempts: int = 1, backoff: float = 5, max_backoff: float = 300,
+                 exit_codes: Iterable[int] = (), retry_timeout: bool = True,
+                 rand: Callable[[], float] = random.random):
+        # 包含第一次执行在内的最大执行次数
+        self.attempts = max(1, attempts)
+        self.backoff = max(0.0, backoff)
+        self.max_backoff = max(self.backoff, max_backoff)
+        # 为空表示任意非 0 退出码都重试
+        self.exit_codes = frozenset(exit_codes)
+        self.retry_timeout = retry_timeout
+        self._rand = rand
+
+    @classmethod
+    def from_options(cls, options: Dict[str, Any], default: "RetryPolicy") -> "RetryPolicy":
+        """
+        从规则配置读取重试策略：max_attempts、backoff、max_backoff、retry_exit_codes、retry_timeout
+        未配置的项使用全局设置
+        """
+        def get(key: str, current: Any, convert: Callable[[Any], Any]) -> Any:
+            value = options.get(key)
+            return current if value is None or value == "" else convert(value)
+
+        return cls(attempts=get("max_attempts", default.attempts, int),
+                   backoff=get("backoff", default.backoff, float),
+                   max_backoff=get("max_backoff", default.max_backoff, float),
+                   exit_codes=get("retry_exit_codes", default.exit_codes, parse_exit_codes),
+                   retry_timeout=get("retry_timeout", default.retry_timeout, _to_bool),
+                   rand=default._rand)
+
+    def delay(self, attempt: int) -> float:
+        """
+        第 attempt 次执行失败后到下一次重试的等待秒数
+        退避上限按次数翻倍，实际等待在上限的一半到上限之间随机取值，避免同时失败的事件同时重试
+        """
+        cap = min(self.max_backoff, self.backoff * 2 ** (max(1, attempt) - 1))
+        return cap / 2 + self._rand() * cap / 2
+
+    def retryable(self, status: str, exit_code: Optional[int]) -> bool:
+        """失败类型是否可重试：超时按配置，非 0 退出码按退出码列表，执行异常总是重试"""
+        if status == "ok":
+            return False
+        if status == "timeout":
+            return self.retry_timeout
+        if status == "failed" and exit_code is not None and self.exit_codes:
+            return exit_code in self.exit_codes
+        return True
+
+    def should_retry(self, status: str, exit_code: Optional[int], attempt: int) -> bool:
+        return attempt < self.attempts and self.retryable(status, exit_code)
+
+
+class TimerWheel:
+    """
+    哈希时间轮：延迟任务按到期刻度放入环形槽位，超过一圈的记录剩余圈数
+    单个线程按刻度推进，到期的任务交给处理函数；调度为 O(1)，没有任务时线程休眠
+    """
+
+    def __init__(self, handler: Callable[[Any], None], tick: float = 0.1, slots: int = 512):
+        self._handler = handler
+        self._tick = tick
+        # 槽位 -> [[剩余圈数, 任务]]
+        self._slots: List[List[List[Any]]] = [[] for _ in range(max(1, slots))]
+        self._cursor = 0
+        self._next_tick = 0.0
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name="eventexecutor-timer", daemon=True)
+        self.scheduled = 0
+        self.fired = 0
+
+    def start(self):
+        self._thread.start()
+
+    def schedule(self, delay: float, item: Any) -> bool:
+        """延迟 delay 秒后执行，已停止时返回 False"""
+        ticks = max(1, math.ceil(delay / self._tick))
+        with self._cond:
+            if self._stopping:
+                return False
+            if not self._size:
+                # 空闲后重新从当前时间开始计刻度
+                self._next_tick = time.monotonic() + self._tick
+            slot = (self._cursor + ticks) % len(self._slots)
+            self._slots[slot].append([(ticks - 1) // len(self._slots), item])
+            self._size += 1
+            self.scheduled += 1
+            self._cond.notify()
+        return True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"pending": self._size, "scheduled": self.scheduled, "fired": self.fired}
+
+    def stop(self, timeout: float = None) -> List[Any]:
+        """
+        停止时间轮
+        :return: 尚未到期的任务
+        """
+        with self._cond:
+            self._stopping = True
+            pending = [item for slot in self._slots for _, item in slot]
+            for slot in self._slots:
+                slot.clear()
+            self._size = 0
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        return pending
+
+    def _advance(self) -> List[Any]:
+        """推进一个刻度，返回到期的任务"""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot = self._slots[self._cursor]
+        if not slot:
+            return []
+        due, remaining = [], []
+        for entry in slot:
+            if entry[0] <= 0:
+                due.append(entry[1])
+            else:
+                entry[0] -= 1
+                remaining.append(entry)
+        self._slots[self._cursor] = remaining
+        self._size -= len(due)
+        self.fired += len(due)
+        return due
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    if not self._size:
+                        self._cond.wait()
+                        continue
+                    remaining = self._next_tick - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._next_tick += self._tick
+                due = self._advance()
+            for item in due:
+                try:
+                    self._handler(item)
+                except Exception as e:
+                    logger.error(f"[事件执行器] 重试任务执行异常：{str(e)}")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    payload TEXT,
+    attempts INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    exit_code INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_dead_letters_rule ON dead_letters(rule, id);
+"""
+
+
+class DeadLetterQueue:
+    """
+    死信队列（SQLite）：重试耗尽的事件持久化保存，重启后仍在，可批量取出重新执行或清空
+    """
+
+    def __init__(self, path: Union[str, Path], error_limit: int = 4096):
+        self.path = Path(path)
+        self._error_limit = error_limit
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add(self, event_type: str, rule: str, payload: Optional[str], attempts: int, status: str,
+            exit_code: Optional[int] = None, error: str = "") -> bool:
+        """加入一个事件，数据库未打开或写入失败时返回 False"""
+        with self._lock:
+            if self._conn is None:
+                return False
+            try:
+                self._conn.execute(
+                    "INSERT INTO dead_letters (time, event_type, rule, payload, attempts, status, exit_code, error) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), event_type, rule, payload, attempts, status, exit_code,
+                     (error or "")[-self._error_limit:]))
+            except sqlite3.Error as e:
+                logger.error(f"[事件执行器] 死信队列写入失败：{str(e)}")
+                return False
+        return True
+
+    @staticmethod
+    def _where(rules: Optional[Sequence[str]]) -> Tuple[str, List[Any]]:
+        if rules is None:
+            return "", []
+        return f" WHERE rule IN ({','.join('?' * len(rules))})", list(rules)
+
+    def count(self, rules: Optional[Sequence[str]] = None) -> int:
+        where, params = self._where(rules)
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._conn.execute(f"SELECT COUNT(*) FROM dead_letters{where}", params).fetchone()[0]
+
+    def list(self, page: int = 1, count: int = 50, rules: Optional[Sequence[str]] = None,
+             include_payload: bool = False) -> Dict[str, Any]:
+        """分页列出死信（按加入顺序）"""
+        page, count = max(1, page), min(max(1, count), 500)
+        where, params = self._where(rules)
+        columns = "id, time, event_type, rule, attempts, status, exit_code, error"
+        if include_payload:
+            columns += ", payload"
+        with self._lock:
+            if self._conn is None:
+                return {"total": 0, "page": page, "count": count, "items": []}
+            total = self._conn.execute(f"SELECT COUNT(*) FROM dead_letters{where}", params).fetchone()[0]
+            rows = self._conn.execute(f"SELECT {columns} FROM dead_letters{where} ORDER BY id LIMIT ? OFFSET ?",
+                                      params + [count, (page - 1) * count]).fetchall()
+        return {"total": total, "page": page, "count": count, "items": [dict(row) for row in rows]}
+
+    def fetch(self, limit: int = 1000, rules: Optional[Sequence[str]] = None) -> List[Tuple[int, str, str, str]]:
+        """
+        按加入顺序取出一批死信，死信仍保留在队列中，重新提交后由 ack 删除
+        :return: [(id, 事件类型, 事件数据 JSON, 规则名称)]
+        """
+        where, params = self._where(rules)
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(f"SELECT id, event_type, payload, rule FROM dead_letters{where} "
+                                      f"ORDER BY id LIMIT ?", params + [max(1, limit)]).fetchall()
+        return [(row[0], row[1], row[2], row[3]) for row in rows]
+
+    def ack(self, entry_id: int) -> bool:
+        """删除已重新提交的死信，数据库未打开或死信已不存在时返回 False"""
+        with self._lock:
+            if self._conn is None:
+                return False
+            try:
+                return self._conn.execute("DELETE FROM dead_letters WHERE id = ?", (entry_id,)).rowcount > 0
+            except sqlite3.Error as e:
+                logger.error(f"[事件执行器] 死信队列删除失败：{str(e)}")
+                return False
+
+    def discard(self, rules: Optional[Sequence[str]] = None) -> int:
+        """清空死信，返回删除的数量"""
+        where, params = self._where(rules)
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._conn.execute(f"DELETE FROM dead_letters{where}", params).rowcount
@@ -0,0 +1,197 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.log import logger
+
+from .conditions import ConditionError, compile_condition
+from .handler import HandlerError, PythonHandler
+from .httpsink import HttpError, HttpTarget
+from .matcher import EventSelector, split_patterns
+from .template import ArgvTemplate, TemplateError
+
+# 未配置规则名称时使用的默认规则名
+DEFAULT_RULE_NAME = "默认规则"
+
+
+@dataclass
+class Rule:
+    """
+    事件处理规则
+    events 为事件类型选择器（精确值、通配符、re: 正则、! 排除），为空表示匹配所有事件
+    """
+    name: str
+    command: str
+    events: Tuple[str, ...] = ()
+    # 排除的事件类型选择器
+    exclude: Tuple[str, ...] = ()
+    timeout: int = 60
+    enabled: bool = True
+    # 作用于原始事件数据的条件，None 表示不限制
+    condition: Optional[Callable[[Any], bool]] = field(default=None, repr=False)
+    # 不经过 shell 直接执行的参数模板，None 表示通过 shell 执行 command
+    argv: Optional[ArgvTemplate] = field(default=None, repr=False)
+    # 在插件进程内执行的 Python 处理函数，None 表示执行命令
+    handler: Optional[PythonHandler] = field(default=None, repr=False)
+    # 发送事件的 HTTP 请求，None 表示执行命令
+    http: Optional[HttpTarget] = field(default=None, repr=False)
+    # 原始配置，供后续扩展字段使用
+    options: Dict[str, Any] = field(default_factory=dict, repr=False)
+    selector: EventSelector = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.selector = EventSelector(self.events, self.exclude)
+
+
+class RuleIndex:
+    """
+    事件类型到规则列表的索引
+    编译时对所有已知事件类型（EventType）预先求出匹配的规则，通配符、正则与排除只在编译时计算，
+    匹配时只需一次字典查找；未知事件类型首次出现时计算一次并缓存
+    """
+
+    def __init__(self, rules: List[Rule], known_types: Iterable[str] = ()):
+        self.rules = [rule for rule in rules if rule.enabled and rule.command]
+        # 事件类型 -> (规则列表, 是否有规则带条件)
+        self._index: Dict[str, Tuple[List[Rule], bool]] = {}
+        for event_type in known_types:
+            self._index[event_type] = self._compute(event_type)
+
+    def _compute(self, event_type: str) -> Tuple[List[Rule], bool]:
+        rules = [rule for rule in self.rules if rule.selector.matches(event_type)]
+        return rules, any(rule.condition for rule in rules)
+
+    def _lookup(self, event_type: str) -> Tuple[List[Rule], bool]:
+        entry = self._index.get(event_type)
+        if entry is None:
+            entry = self._index[event_type] = self._compute(event_type)
+        return entry
+
+    def match(self, event_type: str) -> List[Rule]:
+        """返回匹配该事件类型的规则（按配置顺序）"""
+        return self._lookup(event_type)[0]
+
+    def match_event(self, event_type: str, event_data: Any) -> List[Rule]:
+        """
+        返回匹配事件类型且条件成立的规则
+        条件在原始事件数据上求值，不需要先转换为字典
+        """
+        rules, conditional = self._lookup(event_type)
+        if not conditional:
+            return rules
+        return [rule for rule in rules if rule.condition is None or _evaluate(rule, event_data)]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+def _evaluate(rule: Rule, event_data: Any) -> bool:
+    """求值规则条件，出错时视为不匹配"""
+    try:
+        return bool(rule.condition(event_data))
+    except Exception as e:
+        logger.debug(f"[事件执行器] 规则 {rule.name} 条件求值异常：{str(e)}")
+        return False
+
+
+def parse_rules(text: Optional[str], default_timeout: int = 60) -> List[Rule]:
+    """
+    解析规则配置（JSON 数组），无效的规则记录警告后跳过
+
+    [
+        {"name": "通知", "event": "transfer.complete", "command": "...", "timeout": 30, "enabled": true}
+    ]
+    event 可以是单个选择器、逗号分隔的选择器或选择器列表，留空表示全部事件：
+    精确值 transfer.complete、通配符 subscribe.*、正则 re:^download\\.、排除 !notice.message；
+    exclude 为额外的排除选择器列表
+    condition 为可选的条件表达式，见 conditions.compile_condition
+    argv 为参数列表（或按 shell 规则拆分的字符串），参数中的 {字段路径} 在执行时替换为事件字段值，
+    配置 argv 时不经过 shell 直接执行，见 template.ArgvTemplate
+    python 为代码片段（字符串或行列表），handler 为 模块:函数 形式的入口，配置后在插件进程内
+    以转换后的事件字典调用，不启动命令，见 handler.PythonHandler
+    http 为 URL 或请求模板（url、method、headers、body、gzip），配置后将事件以 HTTP 请求发送，见 httpsink.HttpTarget
+    """
+    if not text or not str(text).strip():
+        return []
+    try:
+        items = json.loads(text)
+    except ValueError as e:
+        logger.error(f"[事件执行器] 规则配置不是有效的 JSON：{str(e)}")
+        return []
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        logger.error("[事件执行器] 规则配置应为 JSON 数组")
+        return []
+
+    rules = []
+    names = set()
+    for i, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            logger.warning(f"[事件执行器] 第 {i} 条规则不是对象，已忽略")
+            continue
+        name = str(item.get("name") or f"规则{i}")
+        if name in names:
+            logger.warning(f"[事件执行器] 规则名称重复：{name}，已忽略")
+            continue
+        events = split_patterns(item.get("event", item.get("events")))
+        exclude = split_patterns(item.get("exclude"))
+        try:
+            timeout = int(item.get("timeout") or default_timeout)
+        except (ValueError, TypeError):
+            logger.warning(f"[事件执行器] 规则 {name} 超时时间无效，使用默认值 {default_timeout} 秒")
+            timeout = default_timeout
+        condition = None
+        if item.get("condition"):
+            try:
+                condition = compile_condition(item["condition"])
+            except ConditionError as e:
+                logger.error(f"[事件执行器] 规则 {name} 条件无效，已忽略该规则：{str(e)}")
+                continue
+        argv = None
+        if item.get("argv"):
+            try:
+                argv = ArgvTemplate(item["argv"])
+            except TemplateError as e:
+                logger.error(f"[事件执行器] 规则 {name} 参数模板无效，已忽略该规则：{str(e)}")
+                continue
+        handler = None
+        if item.get("python") or item.get("handler"):
+            try:
+                handler = PythonHandler(source=item.get("python"), entry=item.get("handler"))
+            except HandlerError as e:
+                logger.error(f"[事件执行器] 规则 {name} 处理函数无效，已忽略该规则：{str(e)}")
+                continue
+        target = None
+        if item.get("http") and handler is None:
+            try:
+                target = HttpTarget(item["http"])
+            except HttpError as e:
+                logger.error(f"[事件执行器] 规则 {name} HTTP 请求配置无效，已忽略该规则：{str(e)}")
+                continue
+        if handler is not None:
+            command = handler.description
+        elif target is not None:
+            command = target.description
+        else:
+            command = argv.command if argv else str(item.get("command") or "")
+        try:
+            rule = Rule(
+                name=name,
+                command=command,
+                events=tuple(events),
+                exclude=tuple(exclude),
+                timeout=timeout,
+                enabled=bool(item.get("enabled", True)),
+                condition=condition,
+                argv=argv,
+                handler=handler,
+                http=target,
+                options=item
+            )
+        except ValueError as e:
+            logger.error(f"[事件执行器] 规则 {name} 事件选择器无效，已忽略该规则：{str(e)}")
+            continue
+        names.add(name)
+        rules.append(rule)
+    return rules
@@ -0,0 +1,157 @@
+import json
+from enum import Enum
+from typing import Any, Callable, Dict, List
+
+# 循环引用、超出深度或数量预算时的占位值
+CYCLE_MARKER = "<cycle>"
+DEPTH_MARKER = "<max depth>"
+TRUNCATED_MARKER = "<truncated>"
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+_PRIMITIVE_TYPES = frozenset(_PRIMITIVES)
+
+
+def to_json(data: Any, pretty: bool = False) -> str:
+    """序列化为 JSON，默认输出紧凑格式"""
+    if pretty:
+        return json.dumps(data, ensure_ascii=False, indent=2)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class _State:
+    """单次转换的状态：当前路径上的容器 id 与剩余节点预算"""
+    __slots__ = ("path", "budget")
+
+    def __init__(self, budget: int):
+        self.path = set()
+        self.budget = budget
+
+
+class Serializer:
+    """
+    事件数据序列化
+    按类型缓存转换策略：每个类型第一次出现时确定转换方式，之后直接查表；
+    检测循环引用，并限制最大深度与最大节点数
+    """
+
+    def __init__(self, max_depth: int = 32, max_nodes: int = 100000):
+        self.max_depth = max(1, max_depth)
+        self.max_nodes = max(1, max_nodes)
+        self._converters: Dict[type, Callable[[Any, int, _State], Any]] = {}
+
+    def to_dict(self, obj: Any) -> Any:
+        """将对象转换为可 JSON 序列化的结构"""
+        return self._convert(obj, 0, _State(self.max_nodes))
+
+    def dumps(self, obj: Any, pretty: bool = False) -> str:
+        """转换并序列化为 JSON，默认输出紧凑格式"""
+        return to_json(self.to_dict(obj), pretty=pretty)
+
+    def _convert(self, obj: Any, depth: int, state: _State) -> Any:
+        cls = type(obj)
+        if cls in _PRIMITIVE_TYPES:
+            return obj
+        converter = self._converters.get(cls)
+        if converter is None:
+            converter = self._converters[cls] = self._resolve(cls, obj)
+        return converter(obj, depth, state)
+
+    def _resolve(self, cls: type, sample: Any) -> Callable[[Any, int, _State], Any]:
+        """根据类型及其第一个实例确定转换策略（每个类型只执行一次）"""
+        if issubclass(cls, dict):
+            return self._guarded(self._from_dict)
+        if issubclass(cls, list):
+            return self._guarded(self._from_list)
+        if issubclass(cls, tuple):
+            return self._guarded(self._from_tuple)
+        if issubclass(cls, (set, frozenset)):
+            return self._guarded(self._from_list)
+        if issubclass(cls, Enum):
+            return self._from_enum
+        if issubclass(cls, _PRIMITIVES):
+            return self._from_primitive
+        if callable(getattr(cls, "to_dict", None)):
+            return self._guarded(self._from_to_dict)
+        if not issubclass(cls, type) and hasattr(sample, "__dict__"):
+            return self._guarded(self._from_object)
+        return self._from_str
+
+    def _guarded(self, convert: Callable[[Any, int, _State], Any]) -> Callable[[Any, int, _State], Any]:
+        """为容器类转换加上循环引用、深度与节点预算检查"""
+
+        def guarded(obj: Any, depth: int, state: _State) -> Any:
+            if depth >= self.max_depth:
+                return DEPTH_MARKER
+            if state.budget <= 0:
+                return TRUNCATED_MARKER
+            key = id(obj)
+            if key in state.path:
+                return CYCLE_MARKER
+            state.path.add(key)
+            try:
+                return convert(obj, depth + 1, state)
+            finally:
+                state.path.discard(key)
+
+        return guarded
+
+    def _from_dict(self, obj: dict, depth: int, state: _State) -> dict:
+        convert = self._convert
+        if len(obj) <= state.budget:
+            state.budget -= len(obj)
+            return {k: convert(v, depth, state) for k, v in obj.items()}
+        # 预算不足时逐项扣减，用完后第一个未转换的键取占位值，其余的键不再遍历
+        result = {}
+        for k, v in obj.items():
+            if state.budget <= 0:
+                result[k] = TRUNCATED_MARKER
+                break
+            state.budget -= 1
+            result[k] = convert(v, depth, state)
+        return result
+
+    def _from_list(self, obj: Any, depth: int, state: _State) -> List[Any]:
+        convert = self._convert
+        if len(obj) <= state.budget:
+            state.budget -= len(obj)
+            return [convert(item, depth, state) for item in obj]
+        return self._truncated(obj, depth, state)
+
+    def _from_tuple(self, obj: tuple, depth: int, state: _State) -> tuple:
+        convert = self._convert
+        if len(obj) <= state.budget:
+            state.budget -= len(obj)
+            return tuple(convert(item, depth, state) for item in obj)
+        return tuple(self._truncated(obj, depth, state))
+
+    def _truncated(self, obj: Any, depth: int, state: _State) -> List[Any]:
+        """预算不足时逐项扣减，用完后以占位值结尾，其余元素不再遍历"""
+        convert = self._convert
+        result = []
+        for item in obj:
+            if state.budget <= 0:
+                result.append(TRUNCATED_MARKER)
+                break
+            state.budget -= 1
+            result.append(convert(item, depth, state))
+        return result
+
+    def _from_to_dict(self, obj: Any, depth: int, state: _State) -> Any:
+        result = obj.to_dict()
+        if type(result) is dict:
+            return self._from_dict(result, depth, state)
+        return self._convert(result, depth, state)
+
+    def _from_object(self, obj: Any, depth: int, state: _State) -> Any:
+        return self._from_dict(obj.__dict__, depth, state)
+
+    def _from_enum(self, obj: Enum, depth: int, state: _State) -> Any:
+        return self._convert(obj.value, depth, state)
+
+    @staticmethod
+    def _from_primitive(obj: Any, depth: int, state: _State) -> Any:
+        return obj
+
+    @staticmethod
+    def _from_str(obj: Any, depth: int, state: _State) -> str:
+        return str(obj)
@@ -0,0 +1,249 @@
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+from typing import IO, Any, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.log import logger
+
+from .process import ChildProcess, ForkServer, ForkServerError, RemoteChild
+
+# 在 bash 中执行命令：清除预热用的变量与位置参数，切换到 POSIX 模式后 eval 执行 $__mp_c，
+# $0 为 sh，不再启动新的 shell；bash 启动时已加载 BASH_ENV
+_RUN = r'''
+unset __mp_fd __mp_h __mp_i __mp_k __mp_v BASH_EXECUTION_STRING
+set -o posix --
+eval "unset __mp_c; $__mp_c"
+'''
+
+# 预热的 bash 在独立的控制管道上等待任务：第一行为命令长度与环境变量覆盖项
+# （"名称 字节数" 为设置，"-名称" 为删除），随后依次是各变量的值与命令，按字节数读取
+# （read -N 在 LC_ALL=C 下按字节计数且整块读取）。读取完成后关闭控制管道，在自身进程中执行命令：
+# 进程号、进程组、标准输入输出与退出码和直接启动 shell 时一致
+BOOTSTRAP = r'''
+__mp_fd=$1
+IFS=' ' read -r -u "$__mp_fd" -a __mp_h || exit 111
+__mp_i=1
+while (( __mp_i < ${#__mp_h[@]} )); do
+  __mp_k=${__mp_h[__mp_i]}
+  if [[ $__mp_k == -* ]]; then
+    unset "${__mp_k#-}"
+    __mp_i=$((__mp_i + 1))
+    continue
+  fi
+  __mp_v=
+  if (( __mp_h[__mp_i + 1] > 0 )); then
+    LC_ALL=C IFS= read -r -N "${__mp_h[__mp_i + 1]}" -u "$__mp_fd" __mp_v || exit 111
+  fi
+  export "$__mp_k=$__mp_v"
+  __mp_i=$((__mp_i + 2))
+done
+__mp_c=
+if (( __mp_h[0] > 0 )); then
+  LC_ALL=C IFS= read -r -N "${__mp_h[0]}" -u "$__mp_fd" __mp_c || exit 111
+fi
+exec {__mp_fd}<&-
+''' + _RUN
+
+# bash 只能导出名称合法的环境变量
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# 启动失败后再次尝试的间隔（秒）
+_RETRY_INTERVAL = 1.0
+# 仍有空闲进程时推迟补充的秒数，避免启动新进程与刚交出的命令争抢 CPU 与 GIL
+_REFILL_DELAY = 0.02
+
+
+def shell_argv(shell: str, command: str) -> List[str]:
+    """未命中时新启动 bash 执行命令的参数，与预热的 bash 执行方式相同"""
+    return [shell, "-c", "__mp_c=$1" + _RUN, "sh", command]
+
+
+def encode_job(command: str, env: Dict[str, str], base: Dict[str, str]) -> bytes:
+    """
+    编码任务：只传递与预热时的基础环境变量不同的部分（MP_EVENT_* 等）
+    """
+    header, values = [], []
+    for key, value in env.items():
+        if base.get(key) == value or not _NAME.match(key):
+            continue
+        raw = value.encode("utf-8", "surrogateescape")
+        header += [key, str(len(raw))]
+        values.append(raw)
+    header += [f"-{key}" for key in base if key not in env and _NAME.match(key)]
+    raw_command = command.encode("utf-8", "surrogateescape")
+    return " ".join([str(len(raw_command)), *header]).encode("ascii") + b"\n" + b"".join(values) + raw_command
+
+
+class ShellWorker:
+    """已预热、等待任务的 bash 进程，只执行一个命令"""
+
+    def __init__(self, shell: str, base: Dict[str, str], child: Union[ChildProcess, RemoteChild],
+                 control: IO[bytes], stdin: IO[bytes], stdout: IO[bytes], stderr: IO[bytes]):
+        self.shell = shell
+        self.child = child
+        self._base = base
+        self._control = control
+        self._pipes = (stdin, stdout, stderr)
+
+    @property
+    def running(self) -> bool:
+        return self.child.running
+
+    def argv(self, command: str) -> List[str]:
+        """进程已退出时新启动 bash 执行命令的参数"""
+        return shell_argv(self.shell, command)
+
+    def submit(self, command: str, env: Dict[str, str],
+               stdin: bool = False) -> Tuple[Union[ChildProcess, RemoteChild], Optional[IO[bytes]], IO[bytes], IO[bytes]]:
+        """
+        发送任务，返回值与 ForkServer.spawn 一致；不需要标准输入时立即关闭（命令读到 EOF）
+        :raises OSError: 进程已退出
+        """
+        stdin_pipe, stdout_pipe, stderr_pipe = self._pipes
+        try:
+            self._control.write(encode_job(command, env, self._base))
+            self._control.close()
+        except (OSError, ValueError) as e:
+            self.discard()
+            raise OSError(getattr(e, "errno", None) or 0, f"预热的 shell 已退出：{str(e)}")
+        if not stdin:
+            stdin_pipe.close()
+            stdin_pipe = None
+        return self.child, stdin_pipe, stdout_pipe, stderr_pipe
+
+    def discard(self):
+        """杀死并回收未使用的进程"""
+        self.child.kill()
+        for pipe in (self._control, *self._pipes):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        try:
+            self.child.wait()
+        except OSError:
+            pass
+        self.child.close()
+
+
+class ShellPool:
+    """
+    预热 shell 池：保持 size 个已启动的 bash 进程等待任务，执行命令时直接交给空闲进程，
+    由它在自身进程中执行，省去进程启动与 bash 初始化（含 BASH_ENV）的耗时；取出后由后台线程补充。
+    没有空闲进程、或需要继承文件描述符（memfd 传递的事件数据）时未命中，由调用方按 argv 新启动 bash 执行
+    """
+
+    def __init__(self, size: int, env: Dict[str, str], shell: str = "bash",
+                 spawner: Optional[ForkServer] = None):
+        self.size = size
+        self.shell = shutil.which(shell) or shell
+        self._env = dict(env)
+        self._spawner = spawner
+        self._idle: Deque[ShellWorker] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.hits = 0
+        self.misses = 0
+        self.spawned = 0
+        self.failures = 0
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._fill, name="eventexecutor-shellpool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """停止补充，杀死空闲的进程（已交出的进程由调用方等待）"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            idle = list(self._idle)
+            self._idle.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        for worker in idle:
+            worker.discard()
+
+    def idle(self) -> int:
+        with self._cond:
+            return len(self._idle)
+
+    def argv(self, command: str) -> List[str]:
+        """未命中时新启动 bash 执行命令的参数"""
+        return shell_argv(self.shell, command)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": self.size, "idle": self.idle(), "hits": self.hits, "misses": self.misses,
+                "spawned": self.spawned, "failures": self.failures}
+
+    def acquire(self, pass_fds: Sequence[int] = ()) -> Optional[ShellWorker]:
+        """取出一个空闲进程，未命中时返回 None"""
+        dead = []
+        worker = None
+        with self._cond:
+            while self._idle and not pass_fds:
+                candidate = self._idle.popleft()
+                self._cond.notify()
+                if candidate.running:
+                    worker = candidate
+                    break
+                dead.append(candidate)
+            if worker is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        for candidate in dead:
+            candidate.discard()
+        return worker
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                while not self._stopped and len(self._idle) >= self.size:
+                    self._cond.wait()
+                if self._idle and not self._stopped:
+                    self._cond.wait(_REFILL_DELAY)
+                if self._stopped:
+                    return
+            try:
+                worker = self._launch()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"[事件执行器] 预热 shell 启动失败：{str(e)}")
+                with self._cond:
+                    self._cond.wait(_RETRY_INTERVAL)
+                continue
+            with self._cond:
+                self.spawned += 1
+                if not self._stopped:
+                    self._idle.append(worker)
+                    continue
+            worker.discard()
+            return
+
+    def _launch(self) -> ShellWorker:
+        control_read, control_write = os.pipe()
+        try:
+            argv = [self.shell, "-c", BOOTSTRAP, "sh", str(control_read)]
+            if self._spawner is not None:
+                try:
+                    child, stdin, stdout, stderr = self._spawner.spawn(argv, self._env, pass_fds=(control_read,),
+                                                                       stdin=True)
+                    return ShellWorker(self.shell, self._env, child, open(control_write, "wb", buffering=0),
+                                       stdin, stdout, stderr)
+                except ForkServerError:
+                    pass
+            proc = subprocess.Popen(argv, env=self._env, pass_fds=(control_read,), bufsize=0,
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    start_new_session=True)
+            return ShellWorker(self.shell, self._env, ChildProcess(proc), open(control_write, "wb", buffering=0),
+                               proc.stdin, proc.stdout, proc.stderr)
+        except BaseException:
+            os.close(control_write)
+            raise
+        finally:
+            os.close(control_read)
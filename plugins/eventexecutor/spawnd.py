@@ -0,0 +1,244 @@
+"""
+命令启动进程（fork server）
+
+由插件以独立的 Python 解释器启动（python spawnd.py <socket fd>），不导入 MoviePilot 的任何模块，
+地址空间只有几 MB。插件通过 Unix socket（SOCK_SEQPACKET）发送启动请求，标准输入、输出、错误
+与事件数据文件的描述符随请求一起传递（SCM_RIGHTS），本进程用 posix_spawn 启动命令并回传
+进程号、退出状态与资源使用；输出由命令直接写入插件持有的管道，不经过本进程转发。
+
+本模块只使用标准库。设置了资源限制的命令以 python spawnd.py --exec <限制> -- argv... 启动（插件进程与
+本进程都是如此）：由这个新的单线程解释器设置资源限制后 exec 命令，多线程进程 fork 出的子进程中不执行 Python 代码。
+
+请求与响应均为一个 JSON 消息：
+    {"op": "spawn", "id": 1, "argv": [...], "env": {...}, "fds": [0, 1, 2, 17], "limits": [...]}
+    {"op": "kill", "id": 1, "signal": 9, "timeout": true}
+    {"id": 1, "pid": 1234} / {"id": 1, "error": "...", "errno": 2, "filename": "..."}
+    {"id": 1, "status": 0, "timed_out": false, "rusage": [用户态秒, 内核态秒, 最大常驻内存 KB]}
+"""
+import ctypes
+import fcntl
+import json
+import os
+import platform
+import resource
+import signal
+import socket
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence
+
+# 单个请求的最大字节数（环境变量较大时超出，由插件改为进程内启动）
+MAX_MESSAGE = 1 << 20
+# 单个请求最多传递的描述符数
+MAX_FDS = 16
+
+# ioprio_set 系统调用号（Python 标准库没有 ionice 接口）
+_IOPRIO_SET = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314, "armv8l": 314}
+# CPU 时间软限制到达后（SIGXCPU）再给予的秒数，之后由内核强制终止
+_CPU_GRACE = 1
+_libc = None
+# 本文件的路径（--exec 时由新的解释器执行）
+_PATH = os.path.abspath(__file__)
+
+
+def ioprio_syscall() -> Optional[int]:
+    """当前平台的 ioprio_set 系统调用号，不支持时返回 None"""
+    global _libc
+    number = _IOPRIO_SET.get(platform.machine())
+    if number is not None and _libc is None:
+        # 在父进程中加载，子进程中只做系统调用
+        _libc = ctypes.CDLL(None, use_errno=True)
+    return number
+
+
+def _set_limit(kind: int, value: int, grace: int = 0):
+    # 不超过现有的硬限制（非特权进程不能提高）
+    _, hard = resource.getrlimit(kind)
+    limit = value + grace if hard == resource.RLIM_INFINITY else min(hard, value + grace)
+    resource.setrlimit(kind, (min(value, limit), limit))
+
+
+def apply_limits(cpu_seconds: int = 0, memory_mb: int = 0, open_files: int = 0, nice: int = 0,
+                 ioprio: int = 0, ioprio_number: Optional[int] = None):
+    """
+    在子进程中（exec 之前）设置资源限制，0 表示不限制
+    :param ioprio_number: ioprio_set 系统调用号，须在 fork 前由 ioprio_syscall 取得
+    """
+    if cpu_seconds > 0:
+        _set_limit(resource.RLIMIT_CPU, cpu_seconds, _CPU_GRACE)
+    if memory_mb > 0:
+        _set_limit(resource.RLIMIT_AS, memory_mb * 1024 * 1024)
+    if open_files > 0:
+        _set_limit(resource.RLIMIT_NOFILE, open_files)
+    if nice:
+        os.nice(nice)
+    if ioprio and ioprio_number is not None:
+        # IOPRIO_WHO_PROCESS = 1，who = 0 表示当前进程
+        if _libc.syscall(ioprio_number, 1, 0, ioprio) != 0:
+            raise OSError(ctypes.get_errno(), "ioprio_set")
+
+
+class _Child:
+    """已启动的命令，回收前可以安全地向进程组发送信号"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.lock = threading.Lock()
+        self.exited = False
+        self.timed_out = False
+
+    def kill(self, sig: int, timed_out: bool = False):
+        with self.lock:
+            if self.exited:
+                return
+            self.timed_out = self.timed_out or timed_out
+            try:
+                os.killpg(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+
+class Server:
+    """启动进程主循环：逐个处理请求，每个命令由一个线程等待退出"""
+
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._send_lock = threading.Lock()
+        self._children: Dict[int, _Child] = {}
+        self._lock = threading.Lock()
+
+    def send(self, message: dict):
+        data = json.dumps(message).encode("utf-8")
+        with self._send_lock:
+            try:
+                self._sock.send(data)
+            except OSError:
+                pass
+
+    def serve(self):
+        while True:
+            try:
+                data, fds, _, _ = socket.recv_fds(self._sock, MAX_MESSAGE, MAX_FDS)
+            except InterruptedError:
+                continue
+            except OSError:
+                break
+            for fd in fds:
+                os.set_inheritable(fd, False)
+            if not data:
+                # 插件关闭了连接
+                for fd in fds:
+                    os.close(fd)
+                break
+            try:
+                request = json.loads(data)
+                op = request.get("op", "spawn")
+                if op == "spawn":
+                    self._spawn(request, fds)
+                elif op == "kill":
+                    with self._lock:
+                        child = self._children.get(request["id"])
+                    if child:
+                        child.kill(int(request.get("signal", signal.SIGKILL)), bool(request.get("timeout")))
+            finally:
+                for fd in fds:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+        self.shutdown()
+
+    def shutdown(self):
+        """连接关闭后终止仍在执行的命令"""
+        with self._lock:
+            children = list(self._children.values())
+        for child in children:
+            child.kill(signal.SIGKILL)
+
+    def _spawn(self, request: dict, fds: List[int]):
+        request_id = request["id"]
+        targets: Sequence[int] = request["fds"]
+        if len(targets) != len(fds):
+            self.send({"id": request_id, "error": "描述符数量不匹配", "errno": 0})
+            return
+        # 先复制到大于所有目标的编号，避免 dup2 时覆盖尚未复制的描述符
+        floor = max([3, *targets]) + 1
+        sources = [fcntl.fcntl(fd, fcntl.F_DUPFD_CLOEXEC, floor) for fd in fds]
+        try:
+            pid = self._start(request["argv"], request["env"], list(zip(sources, targets)),
+                              request.get("limits"))
+        except OSError as e:
+            self.send({"id": request_id, "error": e.strerror or str(e), "errno": e.errno or 0,
+                       "filename": e.filename})
+            return
+        finally:
+            for fd in sources:
+                os.close(fd)
+        child = _Child(pid)
+        with self._lock:
+            self._children[request_id] = child
+        self.send({"id": request_id, "pid": pid})
+        threading.Thread(target=self._wait, args=(request_id, child), daemon=True).start()
+
+    @staticmethod
+    def _start(argv: List[str], env: Dict[str, str], mapping: List[tuple], limits: Optional[list]) -> int:
+        if limits:
+            # 资源限制无法通过 posix_spawn 设置；本进程有等待线程，不 fork 后执行 Python 代码，
+            # 而是启动新的解释器设置限制后再 exec 命令
+            argv = exec_argv(limits, argv)
+        return os.posix_spawnp(argv[0], argv, env, setsid=True,
+                               file_actions=[(os.POSIX_SPAWN_DUP2, src, dst) for src, dst in mapping])
+
+    def _wait(self, request_id: int, child: _Child):
+        while True:
+            try:
+                # 只等待不回收，标记退出后再回收，避免向复用的进程号发送信号
+                os.waitid(os.P_PID, child.pid, os.WEXITED | os.WNOWAIT)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+        with child.lock:
+            child.exited = True
+        try:
+            _, status, usage = os.wait4(child.pid, 0)
+            message = {"id": request_id, "status": os.waitstatus_to_exitcode(status),
+                       "timed_out": child.timed_out,
+                       "rusage": [usage.ru_utime, usage.ru_stime, usage.ru_maxrss]}
+        except ChildProcessError:
+            message = {"id": request_id, "status": None, "timed_out": child.timed_out, "rusage": None}
+        with self._lock:
+            self._children.pop(request_id, None)
+        self.send(message)
+
+
+def exec_argv(limits: Sequence[int], argv: List[str]) -> List[str]:
+    """设置资源限制后再执行 argv 的命令行（python spawnd.py --exec）"""
+    return [sys.executable, "-I", "-S", _PATH, "--exec", json.dumps(list(limits)), "--", *argv]
+
+
+def exec_limited(limits: list, argv: List[str]):
+    """设置资源限制后执行命令（替换当前进程），命令无法执行时以 127 退出"""
+    try:
+        apply_limits(*limits, ioprio_number=ioprio_syscall() if limits[4] else None)
+        os.execvp(argv[0], argv)
+    except OSError as e:
+        sys.stderr.write(f"{argv[0]}: {e.strerror or str(e)}\n")
+    os._exit(127)
+
+
+def main():
+    if sys.argv[1] == "--exec":
+        # python spawnd.py --exec <限制的 JSON> -- argv...
+        exec_limited(json.loads(sys.argv[2]), sys.argv[4:])
+    fd = int(sys.argv[1])
+    os.set_inheritable(fd, False)
+    # 插件进程退出时本进程也随之退出，不需要响应终端信号
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sock = socket.socket(fileno=fd)
+    Server(sock).serve()
+
+
+if __name__ == "__main__":
+    main()
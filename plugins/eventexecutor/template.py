@@ -0,0 +1,140 @@
+import json
+import re
+import shlex
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union
+
+from .conditions import MISSING, ConditionError, compile_path, resolve_path
+
+# {字段路径} 为占位符，{{ 与 }} 为字面的花括号
+_TOKEN = re.compile(r"\{\{|\}\}|\{([^{}]*)\}|[{}]")
+
+
+class TemplateError(ValueError):
+    """参数模板无效"""
+    pass
+
+
+def _default_dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def format_value(value: Any, dumps: Callable[[Any], str] = _default_dumps) -> str:
+    """
+    将字段值转换为命令参数：字段不存在或为 None 时为空字符串，布尔值为 true / false，
+    字典、列表与对象输出为 JSON
+    """
+    if value is MISSING or value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return dumps(value)
+
+
+def _compile_arg(arg: str) -> Union[str, Tuple[Any, ...], List[Union[str, Tuple[Any, ...]]]]:
+    """
+    编译单个参数：不含占位符时为字符串，只有一个占位符时为字段路径，否则为字符串与字段路径的列表
+    """
+    parts: List[Union[str, Tuple[Any, ...]]] = []
+    literal, pos = [], 0
+    for match in _TOKEN.finditer(arg):
+        literal.append(arg[pos:match.start()])
+        pos = match.end()
+        token = match.group(0)
+        if token in ("{{", "}}"):
+            literal.append(token[0])
+        elif token in ("{", "}"):
+            raise TemplateError(f"参数 {arg!r} 中的花括号不成对，字面的花括号请写为 {{{{ 或 }}}}")
+        else:
+            try:
+                path = compile_path(match.group(1).strip())
+            except ConditionError as e:
+                raise TemplateError(f"参数 {arg!r} 中的占位符无效：{str(e)}")
+            if any(literal):
+                parts.append("".join(literal))
+            literal = []
+            parts.append(path)
+    literal.append(arg[pos:])
+    if any(literal):
+        parts.append("".join(literal))
+    if not parts:
+        return ""
+    if len(parts) == 1:
+        return parts[0]
+    return parts
+
+
+class ArgvTemplate:
+    """
+    命令参数模板：每个参数可包含 {字段路径} 占位符，如 {transferinfo.target_path}、{mediainfo.tmdb_id}
+    加载配置时编译为字段路径，执行时直接从原始事件数据取值，不经过 shell 与 JSON 解析
+    """
+
+    def __init__(self, argv: Union[str, Sequence[str]]):
+        if isinstance(argv, str):
+            try:
+                argv = shlex.split(argv)
+            except ValueError as e:
+                raise TemplateError(f"无法拆分命令参数：{str(e)}")
+        if not isinstance(argv, (list, tuple)) or not argv:
+            raise TemplateError("argv 应为非空的字符串列表")
+        self.argv = tuple(str(arg) for arg in argv)
+        self._args = [_compile_arg(arg) for arg in self.argv]
+        if not isinstance(self._args[0], str) or not self._args[0]:
+            raise TemplateError("argv 的第一项应为程序路径，不能包含占位符")
+        self.fields = tuple(".".join(str(part) for part in path) for arg in self._args
+                            for path in (arg if isinstance(arg, list) else [arg]) if isinstance(path, tuple))
+
+    @property
+    def command(self) -> str:
+        """用于日志与显示的命令行"""
+        return shlex.join(self.argv)
+
+    def render(self, event_data: Any, dumps: Optional[Callable[[Any], str]] = None) -> List[str]:
+        """
+        按事件数据生成命令参数
+        :param dumps: 字典、列表与对象字段的 JSON 序列化函数
+        """
+        dumps = dumps or _default_dumps
+        argv = []
+        for arg in self._args:
+            if isinstance(arg, str):
+                argv.append(arg)
+            elif isinstance(arg, tuple):
+                argv.append(format_value(resolve_path(event_data, arg), dumps))
+            else:
+                argv.append("".join(part if isinstance(part, str) else
+                                    format_value(resolve_path(event_data, part), dumps) for part in arg))
+        return argv
+
+
+class TextTemplate:
+    """
+    文本模板：{字段路径} 占位符在执行时替换为事件字段值，用于 HTTP 规则的 URL、请求头与请求体
+    """
+
+    def __init__(self, text: str):
+        self.text = str(text)
+        compiled = _compile_arg(self.text)
+        self._parts = compiled if isinstance(compiled, list) else [compiled]
+        self.fields = tuple(".".join(str(part) for part in path) for path in self._parts
+                            if isinstance(path, tuple))
+
+    def render(self, data: Any, dumps: Optional[Callable[[Any], str]] = None,
+               quote: Optional[Callable[[str], str]] = None) -> str:
+        """
+        按事件数据生成文本
+        :param quote: 字段值的转义函数（如 URL 编码），字面部分不转义
+        """
+        dumps = dumps or _default_dumps
+        pieces = []
+        for part in self._parts:
+            if isinstance(part, str):
+                pieces.append(part)
+            else:
+                value = format_value(resolve_path(data, part), dumps)
+                pieces.append(quote(value) if quote else value)
+        return "".join(pieces)
@@ -16,8 +16,12 @@
     python3 -m unittest test_unit.py
 """
 
+import asyncio
 import sys
 import os
+import queue
+import threading
+import time
 import unittest
 from unittest.mock import Mock, patch, MagicMock, call
 import json
@@ -55,6 +59,7 @@ class MockEventType(str, Enum):
     SystemWarning = "system.warning"
     # 用户事件
     UserMessage = "user.message"
+    NoticeMessage = "notice.message"
     # 站点事件
     SiteDeleted = "site.deleted"
     SiteUpdated = "site.updated"
@@ -123,20 +128,31 @@ moviepilot_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..
 sys.path.insert(0, moviepilot_path)
 
 
+def load_plugin_module():
+    """以包的形式加载插件（插件内使用相对导入）"""
+    import importlib.util
+    plugin_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location(
+        "eventexecutor",
+        os.path.join(plugin_dir, "__init__.py"),
+        submodule_search_locations=[plugin_dir]
+    )
+    # 清理已加载的子模块，保证每次都是全新加载
+    for name in [n for n in sys.modules if n == "eventexecutor" or n.startswith("eventexecutor.")]:
+        del sys.modules[name]
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["eventexecutor"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
 class TestEventExecutorPlugin(unittest.TestCase):
     """事件执行器插件测试类"""
 
     def setUp(self):
         """测试前准备"""
         # 动态导入插件类
-        import importlib.util
-        spec = importlib.util.spec_from_file_location(
-            "eventexecutor",
-            os.path.join(os.path.dirname(__file__), "__init__.py")
-        )
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        self.EventExecutor = module.EventExecutor
+        self.EventExecutor = load_plugin_module().EventExecutor
 
         # 创建插件实例
         self.plugin = self.EventExecutor()
@@ -151,11 +167,22 @@ class TestEventExecutorPlugin(unittest.TestCase):
     def test_plugin_metadata(self):
         """测试插件元数据"""
         self.assertEqual(self.plugin.plugin_name, "事件执行器")
-        self.assertEqual(self.plugin.plugin_version, "1.1.1")
+        self.assertEqual(self.plugin.plugin_version, "2.0.0")
         self.assertEqual(self.plugin.plugin_author, "lureiny")
         self.assertTrue(self.plugin.plugin_v2)
         self.assertEqual(self.plugin.auth_level, 1)
 
+    def test_instances_do_not_share_state(self):
+        """测试列表与字典类的状态不在插件实例之间共享"""
+        other = self.EventExecutor()
+        self.plugin._lane_cache["transfer.complete"] = 0
+        self.plugin._coprocesses["rule"] = Mock()
+        self.plugin._priority_events.append("site.updated")
+        self.assertEqual((other._lane_cache, other._coprocesses), ({}, {}))
+        self.assertNotIn("site.updated", other._priority_events)
+        self.assertNotIn("site.updated", load_plugin_module().PRIORITY_EVENTS)
+        self.plugin._coprocesses.clear()
+
     def test_plugin_init_default(self):
         """测试插件默认初始化"""
         self.plugin.init_plugin(None)
@@ -199,29 +226,34 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
     # ==================== 事件过滤测试 ====================
 
+    def _should_handle_event(self, event_type):
+        """默认规则是否匹配该事件类型（经由编译后的规则索引）"""
+        self.plugin._bash_command = "echo test"
+        return bool(self.plugin._compile_rules().match(event_type))
+
     def test_should_handle_event_all(self):
         """测试监听所有事件"""
         self.plugin._event_type = ""  # 空字符串表示全部事件
 
-        self.assertTrue(self.plugin._should_handle_event("transfer.complete"))
-        self.assertTrue(self.plugin._should_handle_event("download.added"))
-        self.assertTrue(self.plugin._should_handle_event("subscribe.complete"))
-        self.assertTrue(self.plugin._should_handle_event("plugin.action"))
+        self.assertTrue(self._should_handle_event("transfer.complete"))
+        self.assertTrue(self._should_handle_event("download.added"))
+        self.assertTrue(self._should_handle_event("subscribe.complete"))
+        self.assertTrue(self._should_handle_event("plugin.action"))
 
     def test_should_handle_event_specific(self):
         """测试监听特定事件"""
         self.plugin._event_type = "transfer.complete"
 
-        self.assertTrue(self.plugin._should_handle_event("transfer.complete"))
-        self.assertFalse(self.plugin._should_handle_event("download.added"))
-        self.assertFalse(self.plugin._should_handle_event("subscribe.complete"))
+        self.assertTrue(self._should_handle_event("transfer.complete"))
+        self.assertFalse(self._should_handle_event("download.added"))
+        self.assertFalse(self._should_handle_event("subscribe.complete"))
 
     def test_should_handle_event_none(self):
         """测试未配置事件类型"""
         self.plugin._event_type = None
 
-        # None 会被转换为 False，应该监听所有事件
-        self.assertTrue(self.plugin._should_handle_event("transfer.complete"))
+        # None 表示未配置，应该监听所有事件
+        self.assertTrue(self._should_handle_event("transfer.complete"))
 
     # ==================== 数据序列化测试 ====================
 
@@ -320,7 +352,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
     # ==================== 命令执行测试 ====================
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_execute_bash_command_success(self, mock_run):
         """测试 Bash 命令执行成功"""
         # 配置插件
@@ -328,7 +360,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
         self.plugin._bash_command = "echo test"
         self.plugin._timeout = 60
 
-        # Mock subprocess.run 返回成功
+        # Mock run_process 返回成功
         mock_result = Mock()
         mock_result.returncode = 0
         mock_result.stdout = "test output"
@@ -341,7 +373,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
         # 执行命令
         self.plugin._execute_bash_command(event)
 
-        # 验证 subprocess.run 被调用
+        # 验证 run_process 被调用
         mock_run.assert_called_once()
         call_args = mock_run.call_args
 
@@ -350,7 +382,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
         # 验证参数
         self.assertTrue(call_args[1]['shell'])
-        self.assertTrue(call_args[1]['capture_output'])
+        self.assertEqual(type(call_args[1]['stdout']).__name__, 'OutputBuffer')
         self.assertEqual(call_args[1]['timeout'], 60)
 
         # 验证环境变量
@@ -360,13 +392,13 @@ class TestEventExecutorPlugin(unittest.TestCase):
         self.assertIn('MP_EVENT_TIME', env)
         self.assertEqual(env['MP_EVENT_TYPE'], 'plugin.action')
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_execute_bash_command_failure(self, mock_run):
         """测试 Bash 命令执行失败"""
         self.plugin._enabled = True
         self.plugin._bash_command = "exit 1"
 
-        # Mock subprocess.run 返回失败
+        # Mock run_process 返回失败
         mock_result = Mock()
         mock_result.returncode = 1
         mock_result.stdout = ""
@@ -380,14 +412,14 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
         mock_run.assert_called_once()
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_execute_bash_command_timeout(self, mock_run):
         """测试 Bash 命令超时"""
         self.plugin._enabled = True
         self.plugin._bash_command = "sleep 1000"
         self.plugin._timeout = 1
 
-        # Mock subprocess.run 抛出超时异常
+        # Mock run_process 抛出超时异常
         mock_run.side_effect = subprocess.TimeoutExpired("sleep 1000", 1)
 
         event = MockEvent(MockEventType.PluginAction, {"action": "test"})
@@ -397,13 +429,13 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
         mock_run.assert_called_once()
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_execute_bash_command_exception(self, mock_run):
         """测试 Bash 命令执行异常"""
         self.plugin._enabled = True
         self.plugin._bash_command = "invalid command"
 
-        # Mock subprocess.run 抛出异常
+        # Mock run_process 抛出异常
         mock_run.side_effect = Exception("Test exception")
 
         event = MockEvent(MockEventType.PluginAction, {"action": "test"})
@@ -413,7 +445,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
 
         mock_run.assert_called_once()
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_execute_bash_command_custom_timeout(self, mock_run):
         """测试自定义超时时间"""
         self.plugin._enabled = True
@@ -440,7 +472,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
         event = MockEvent(MockEventType.PluginAction, {"action": "test"})
 
         # 应该直接返回，不执行任何操作
-        with patch('subprocess.run') as mock_run:
+        with patch('eventexecutor.process.run_process') as mock_run:
             self.plugin._execute_bash_command(event)
             mock_run.assert_not_called()
 
@@ -465,7 +497,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
             self.plugin.on_event(None)
             mock_exec.assert_not_called()
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_on_event_filtered(self, mock_run):
         """测试事件过滤"""
         self.plugin._enabled = True
@@ -528,7 +560,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
             }
         }
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_all_event_types(self, mock_run):
         """测试所有事件类型的处理"""
         self.plugin._enabled = True
@@ -560,7 +592,7 @@ class TestEventExecutorPlugin(unittest.TestCase):
                 self.assertEqual(parsed_data['type'], event_type.value)
                 self.assertIn('data', parsed_data)
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_transfer_complete_event_data(self, mock_run):
         """测试整理完成事件的数据结构"""
         self.plugin._enabled = True
@@ -644,17 +676,10 @@ class TestEventExecutorIntegration(unittest.TestCase):
 
     def setUp(self):
         """测试前准备"""
-        import importlib.util
-        spec = importlib.util.spec_from_file_location(
-            "eventexecutor",
-            os.path.join(os.path.dirname(__file__), "__init__.py")
-        )
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        self.EventExecutor = module.EventExecutor
+        self.EventExecutor = load_plugin_module().EventExecutor
         self.plugin = self.EventExecutor()
 
-    @patch('subprocess.run')
+    @patch('eventexecutor.process.run_process')
     def test_full_workflow(self, mock_run):
         """测试完整工作流程"""
         # 1. 初始化配置
@@ -683,8 +708,9 @@ class TestEventExecutorIntegration(unittest.TestCase):
         }
         event = MockEvent(MockEventType.TransferComplete, event_data)
 
-        # 5. 处理事件
+        # 5. 处理事件（入队后由工作线程执行，停止服务时等待队列清空）
         self.plugin.on_event(event)
+        self.plugin.stop_service()
 
         # 6. 验证命令被执行
         mock_run.assert_called_once()
@@ -700,6 +726,2817 @@ class TestEventExecutorIntegration(unittest.TestCase):
         self.assertEqual(parsed_data['type'], 'transfer.complete')
 
 
+class TestWorkerPool(unittest.TestCase):
+    """工作线程池测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.EventExecutor = self.module.EventExecutor
+        self.plugin = self.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_pool_drains_on_stop(self):
+        """测试停止时执行完队列中的全部任务"""
+        done = []
+        pool = self.module.pool.WorkerPool(handler=done.append, workers=2, queue_size=100)
+        pool.start()
+        for i in range(50):
+            self.assertTrue(pool.submit("k", i))
+        remaining = pool.stop(timeout=5)
+        self.assertEqual(remaining, 0)
+        self.assertEqual(sorted(done), list(range(50)))
+        # 停止后不再接受任务
+        self.assertFalse(pool.submit("k", 99))
+
+    def test_pool_queue_full(self):
+        """测试队列已满时丢弃任务"""
+        import threading
+        gate = threading.Event()
+        pool = self.module.pool.WorkerPool(handler=lambda job: gate.wait(5), workers=1, queue_size=1)
+        pool.start()
+        results = [pool.submit("k", i) for i in range(10)]
+        self.assertFalse(all(results))
+        self.assertGreater(pool.dropped, 0)
+        gate.set()
+        pool.stop(timeout=5)
+
+    def test_pool_key_limit(self):
+        """测试单类型并发限制"""
+        import threading
+        import time
+        lock = threading.Lock()
+        active = {"a": 0, "b": 0}
+        peak = {"a": 0, "b": 0}
+
+        def handler(job):
+            with lock:
+                active[job] += 1
+                peak[job] = max(peak[job], active[job])
+            time.sleep(0.01)
+            with lock:
+                active[job] -= 1
+
+        pool = self.module.pool.WorkerPool(handler=handler, workers=4, queue_size=100, key_limit=1)
+        pool.start()
+        for _ in range(10):
+            pool.submit("a", "a")
+            pool.submit("b", "b")
+        pool.stop(timeout=5)
+        self.assertEqual(peak["a"], 1)
+        self.assertEqual(peak["b"], 1)
+
+    @patch('eventexecutor.process.run_process')
+    def test_on_event_enqueues(self, mock_run):
+        """测试启用线程池时 on_event 只入队，不在事件线程中执行"""
+        import threading
+        callers = []
+        mock_run.side_effect = lambda *a, **kw: callers.append(threading.current_thread()) or Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": "2"})
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        self.plugin.stop_service()
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertIsNot(callers[0], threading.current_thread())
+
+    def test_invalid_pool_config(self):
+        """测试线程池配置无效时使用默认值"""
+        self.plugin.init_plugin({"enabled": False, "max_workers": "abc", "queue_size": "0"})
+        self.assertEqual(self.plugin._max_workers, 4)
+        self.assertEqual(self.plugin._queue_size, 1)
+
+
+class TestCoprocess(unittest.TestCase):
+    """常驻进程模式测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_coprocess_ndjson(self):
+        """测试事件以 NDJSON 写入同一个常驻进程"""
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, "events.log")
+            self.plugin.init_plugin({
+                "enabled": True,
+                "bash_command": f"cat >> {output}",
+                "exec_mode": "coprocess",
+                "max_workers": 1
+            })
+            coprocess = self.plugin._coprocesses[self.module.rules.DEFAULT_RULE_NAME]
+            pid = coprocess.pid
+            for i in range(5):
+                self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"index": i}))
+            self.assertEqual(coprocess.pid, pid)
+            self.plugin.stop_service()
+
+            with open(output) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([line["data"]["index"] for line in lines], list(range(5)))
+            self.assertEqual(lines[0]["type"], "transfer.complete")
+            self.assertIn("time", lines[0])
+
+    def test_coprocess_ack(self):
+        """测试等待确认"""
+        coprocess = self.module.coprocess.Coprocess(
+            command='while read line; do echo "ok"; done', ack=True, ack_timeout=5)
+        try:
+            self.assertTrue(coprocess.send('{"type": "test"}'))
+            self.assertTrue(coprocess.send('{"type": "test"}'))
+        finally:
+            coprocess.stop()
+        self.assertFalse(coprocess.send('{"type": "test"}'))
+
+    def test_coprocess_restart(self):
+        """测试进程退出后按退避时间重启，退避期间的事件直接返回失败而不是等待"""
+        coprocess = self.module.coprocess.Coprocess(
+            command='read line; echo "ok"', ack=True, ack_timeout=5, min_backoff=0.5)
+        try:
+            self.assertTrue(coprocess.send("{}"))
+            first_pid = coprocess.pid
+            coprocess._process.wait(timeout=5)
+            start = time.monotonic()
+            self.assertFalse(coprocess.send("{}"))
+            self.assertLess(time.monotonic() - start, 0.3)
+            self.assertEqual(coprocess.restarts, 1)
+            time.sleep(0.5)
+            self.assertTrue(coprocess.send("{}"))
+            self.assertNotEqual(coprocess.pid, first_pid)
+        finally:
+            coprocess.stop()
+
+    def test_coprocess_process_group(self):
+        """测试常驻进程在独立的进程组中运行，停止时其启动的子进程一并结束"""
+        coprocess = self.module.coprocess.Coprocess(
+            command='sleep 30 & echo "$!"; while read line; do echo ok; done', ack=True, ack_timeout=5)
+        try:
+            coprocess.start()
+            self.assertTrue(coprocess.alive())
+            self.assertEqual(os.getpgid(coprocess.pid), coprocess.pid)
+            child = int(coprocess._acks.get(timeout=5))
+        finally:
+            coprocess.stop()
+        deadline = time.time() + 2
+        while TestProcessControl._alive(child) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(TestProcessControl._alive(child))
+
+    def test_coprocess_ack_timeout(self):
+        """测试确认超时后重启进程"""
+        coprocess = self.module.coprocess.Coprocess(
+            command="cat > /dev/null", ack=True, ack_timeout=0.2, min_backoff=0.01)
+        try:
+            self.assertFalse(coprocess.send("{}"))
+            self.assertEqual(coprocess.restarts, 1)
+        finally:
+            coprocess.stop()
+
+
+class TestBatcher(unittest.TestCase):
+    """微批处理测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_batcher_flush_on_size(self):
+        """测试达到批大小时立即刷新"""
+        batches = []
+        batcher = self.module.batcher.Batcher(handler=batches.append, window=60, max_size=3)
+        batcher.start()
+        for i in range(7):
+            batcher.add(i)
+        batcher.stop(timeout=5)
+        self.assertEqual(batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertFalse(batcher.add(8))
+
+    def test_batcher_flush_on_window(self):
+        """测试窗口期结束后刷新"""
+        import threading
+        flushed = threading.Event()
+        batches = []
+        batcher = self.module.batcher.Batcher(
+            handler=lambda batch: batches.append(batch) or flushed.set(), window=0.05, max_size=100)
+        batcher.start()
+        batcher.add("a")
+        batcher.add("b")
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual(batches, [["a", "b"]])
+        batcher.stop(timeout=5)
+
+    @patch('eventexecutor.process.run_process')
+    def test_batch_execution_env(self, mock_run):
+        """测试批处理命令的环境变量"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({
+            "enabled": True,
+            "bash_command": "echo test",
+            "batch_window": 60000,
+            "batch_size": 10
+        })
+        for i in range(3):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"index": i}))
+        # 停止服务时刷新未满的批次
+        self.plugin.stop_service()
+
+        mock_run.assert_called_once()
+        env = mock_run.call_args[1]['env']
+        self.assertEqual(env['MP_EVENT_COUNT'], "3")
+        batch = json.loads(env['MP_EVENT_BATCH'])
+        self.assertEqual([item["data"]["index"] for item in batch], [0, 1, 2])
+        self.assertEqual(batch[0]["type"], "transfer.complete")
+
+
+    @patch('eventexecutor.process.run_process')
+    def test_batch_serialization_failure(self, mock_run):
+        """测试批次序列化失败时规则匹配的事件记为执行异常，其余规则继续执行并记录执行日志"""
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "batch_window": 60000, "rules": json.dumps([
+            {"name": "a", "event": "transfer.complete", "command": "echo a"},
+            {"name": "b", "event": "transfer.complete", "python": "result = 1"},
+        ])})
+        journal = self.plugin._journal = Mock()
+        to_json = self.module.to_json
+
+        def failing(value, pretty=None):
+            if pretty is not None:
+                raise ValueError("bad value")
+            return to_json(value)
+        for i in range(2):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"index": i}))
+        with patch('eventexecutor.to_json', side_effect=failing):
+            self.plugin.stop_service()
+        mock_run.assert_not_called()
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("executions_total", rule="a", status="error"), 1)
+        self.assertEqual(metrics.counter("executions_total", rule="b", status="ok"), 2)
+        self.assertEqual(journal.record.call_count, 2)
+        for call in journal.record.call_args_list:
+            self.assertEqual([(e.rule, e.status) for e in call[0][2]], [("a", "error"), ("b", "ok")])
+
+    @patch('eventexecutor.process.run_process')
+    def test_add_while_stopping(self, mock_run):
+        """测试批处理线程停止后到达的事件单独作为一批执行，不会丢失"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                 "batch_window": 60000})
+        self.plugin._batcher.stop()
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"index": 7}))
+        mock_run.assert_called_once()
+        env = mock_run.call_args[1]['env']
+        self.assertEqual(env['MP_EVENT_COUNT'], "1")
+        self.assertEqual(json.loads(env['MP_EVENT_BATCH'])[0]["data"]["index"], 7)
+
+
+class TestPayloadTransport(unittest.TestCase):
+    """事件数据传递方式测试"""
+
+    def setUp(self):
+        import tempfile
+        self.module = load_plugin_module()
+        self.plugin = self.module.EventExecutor()
+        self.plugin._enabled = True
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmpdir.name, "payload.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _large_event(self):
+        file_list = [f"/downloads/Show/Season 01/Show.S01E{i:03d}.1080p.mkv" for i in range(5000)]
+        return MockEvent(MockEventType.TransferComplete, {
+            "transferinfo": {"file_list": file_list, "file_list_new": file_list}
+        })
+
+    def test_resolve_transport(self):
+        """测试自动选择传递方式"""
+        resolve = self.module.payload.resolve_transport
+        self.assertEqual(resolve("auto", 100, threshold=1024), "env")
+        self.assertEqual(resolve("auto", 2048, threshold=1024), "file")
+        self.assertEqual(resolve("stdin", 2048), "stdin")
+        self.assertEqual(resolve("unknown", 100, threshold=1024), "env")
+
+    def test_default_threshold_keeps_env(self):
+        """测试默认阈值下 128KB 以内的数据仍通过环境变量传递"""
+        self.assertLess(self.module.payload.DEFAULT_THRESHOLD + len("MP_EVENT_DATA=") + 1, 128 * 1024)
+        file_list = [f"/downloads/Show.S01E{i:04d}.mkv" for i in range(3000)]
+        self.plugin._bash_command = f'test -z "$MP_EVENT_DATA_FILE" && printf %s "$MP_EVENT_DATA" > {self.output}'
+        self.plugin._execute_bash_command(MockEvent(MockEventType.TransferComplete, {"file_list": file_list}))
+        with open(self.output) as f:
+            raw = f.read()
+        self.assertGreater(len(raw), 64 * 1024)
+        self.assertEqual(len(json.loads(raw)["data"]["file_list"]), 3000)
+
+    def test_large_payload_uses_file(self):
+        """测试大数据自动改用文件传递，避免 E2BIG"""
+        self.plugin._bash_command = f'test -z "$MP_EVENT_DATA" && cat "$MP_EVENT_DATA_FILE" > {self.output}'
+        self.plugin._execute_bash_command(self._large_event())
+        with open(self.output) as f:
+            data = json.load(f)
+        self.assertEqual(len(data["data"]["transferinfo"]["file_list"]), 5000)
+
+    def test_file_cleanup(self):
+        """测试文件传递后清理"""
+        self.plugin._payload_transport = "file"
+        self.plugin._bash_command = f'echo "$MP_EVENT_DATA_FILE" > {self.output}'
+        with patch.object(self.module.payload.os, "memfd_create", side_effect=OSError, create=True):
+            self.plugin._execute_bash_command(MockEvent(MockEventType.PluginAction, {"action": "test"}))
+        with open(self.output) as f:
+            path = f.read().strip()
+        self.assertTrue(path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_stdin_transport(self):
+        """测试通过标准输入传递"""
+        self.plugin._payload_transport = "stdin"
+        self.plugin._bash_command = f"cat > {self.output}"
+        self.plugin._execute_bash_command(self._large_event())
+        with open(self.output) as f:
+            data = json.load(f)
+        self.assertEqual(data["type"], "transfer.complete")
+
+
+def legacy_to_dict(obj):
+    """原递归实现（仅用于基准对比）"""
+    if isinstance(obj, dict):
+        return {k: legacy_to_dict(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [legacy_to_dict(item) for item in obj]
+    elif isinstance(obj, tuple):
+        return tuple(legacy_to_dict(list(obj)))
+    elif isinstance(obj, set):
+        return list(legacy_to_dict(list(obj)))
+    elif hasattr(obj, 'to_dict'):
+        return legacy_to_dict(obj.to_dict())
+    elif hasattr(obj, '__dict__'):
+        return legacy_to_dict(obj.__dict__)
+    elif isinstance(obj, (int, float, str, bool, type(None))):
+        return obj
+    else:
+        return str(obj)
+
+
+class MockMediaInfo:
+    """与 test_plugin.py 中结构一致的 MediaInfo"""
+
+    def __init__(self):
+        self.tmdb_id = 12345
+        self.title = "测试电影"
+        self.original_title = "Test Movie"
+        self.year = "2024"
+        self.type = "电影"
+        self.overview = "这是一个测试电影的简介"
+        self.poster_path = "/test/poster.jpg"
+        self.backdrop_path = "/test/backdrop.jpg"
+        self.vote_average = 8.5
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class MockDirItem:
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+
+
+class MockTransferInfo:
+    """与 test_plugin.py 中结构一致的 TransferInfo"""
+
+    def __init__(self, file_count=1):
+        self.source_path = "/downloads/Test.Movie.2024.1080p.mkv"
+        self.source_filename = "Test.Movie.2024.1080p.mkv"
+        self.target_path = "/media/Movies/Test Movie (2024)/Test.Movie.2024.1080p.mkv"
+        self.target_diritem = MockDirItem("/media/Movies/Test Movie (2024)", "Test Movie (2024)")
+        self.file_count = file_count
+        self.total_size = 5368709120
+        self.file_list = [f"/downloads/Test.S01E{i:02d}.mkv" for i in range(file_count)]
+        self.file_list_new = [f"/media/TV/Test/Season 1/Test.S01E{i:02d}.mkv" for i in range(file_count)]
+
+
+class TestSerializer(unittest.TestCase):
+    """事件数据序列化测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.Serializer = self.module.serializer.Serializer
+
+    def test_matches_legacy(self):
+        """测试转换结果与原实现一致"""
+        data = {"mediainfo": MockMediaInfo(), "transferinfo": MockTransferInfo(3),
+                "tags": ("a", "b"), "downloader": "qbittorrent"}
+        self.assertEqual(self.Serializer().to_dict(data), legacy_to_dict(data))
+
+    def test_converter_cache(self):
+        """测试每个类型只确定一次转换策略"""
+        serializer = self.Serializer()
+        with patch.object(serializer, "_resolve", wraps=serializer._resolve) as resolve:
+            for _ in range(10):
+                serializer.to_dict([MockTransferInfo(2), MockTransferInfo(2)])
+        resolved = [c.args[0] for c in resolve.call_args_list]
+        self.assertEqual(len(resolved), len(set(resolved)))
+        self.assertIn(MockTransferInfo, resolved)
+
+    def test_cycle_detection(self):
+        """测试循环引用"""
+        node = MockDirItem("/media", "media")
+        node.parent = node
+        result = self.Serializer().to_dict({"node": node})
+        self.assertEqual(result["node"]["parent"], self.module.serializer.CYCLE_MARKER)
+        # 同一对象被多处引用（非循环）时正常输出
+        shared = {"a": 1}
+        self.assertEqual(self.Serializer().to_dict([shared, shared]), [{"a": 1}, {"a": 1}])
+
+    def test_depth_and_node_budget(self):
+        """测试深度与节点数限制"""
+        nested = current = {}
+        for _ in range(10):
+            current["child"] = {}
+            current = current["child"]
+        result = self.Serializer(max_depth=3).to_dict(nested)
+        self.assertEqual(result["child"]["child"]["child"], self.module.serializer.DEPTH_MARKER)
+
+        result = self.Serializer(max_nodes=5).to_dict([[i] for i in range(20)])
+        self.assertIn(self.module.serializer.TRUNCATED_MARKER, result)
+
+        # 单个超大的扁平容器只转换预算内的元素
+        TRUNCATED_MARKER = self.module.serializer.TRUNCATED_MARKER
+        serializer = self.Serializer(max_nodes=5)
+        self.assertEqual(serializer.to_dict(list(range(1000000))), [0, 1, 2, 3, 4, TRUNCATED_MARKER])
+        self.assertEqual(serializer.to_dict(tuple(range(10))), (0, 1, 2, 3, 4, TRUNCATED_MARKER))
+        self.assertEqual(serializer.to_dict({f"k{i}": i for i in range(10)}),
+                         {"k0": 0, "k1": 1, "k2": 2, "k3": 3, "k4": 4, "k5": TRUNCATED_MARKER})
+        visited = []
+
+        class Items(list):
+            def __iter__(self):
+                for item in list.__iter__(self):
+                    visited.append(item)
+                    yield item
+
+        serializer.to_dict(Items(range(1000000)))
+        self.assertEqual(len(visited), 6)
+
+    def test_enum_and_unknown(self):
+        """测试枚举与无法转换的类型"""
+        from datetime import datetime
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        result = self.Serializer().to_dict({"type": MockEventType.TransferComplete, "time": now})
+        self.assertEqual(result, {"type": "transfer.complete", "time": str(now)})
+
+    @patch('eventexecutor.process.run_process')
+    def test_compact_json_by_default(self, mock_run):
+        """测试默认输出紧凑 JSON"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        plugin = self.module.EventExecutor()
+        plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": 0})
+        plugin.on_event(MockEvent(MockEventType.TransferComplete, {"mediainfo": MockMediaInfo()}))
+        data = mock_run.call_args[1]['env']['MP_EVENT_DATA']
+        self.assertNotIn("\n", data)
+        self.assertEqual(json.loads(data)["data"]["mediainfo"]["tmdb_id"], 12345)
+
+    def test_benchmark(self):
+        """基准测试：与原递归实现对比 MediaInfo / TransferInfo 事件的转换耗时"""
+        import timeit
+        # 名称 -> (事件数据, 允许的耗时倍数)；单文件事件只快一两成，留出计时抖动的余量
+        payloads = {
+            "transfer.complete (1 文件)": ({
+                "mediainfo": MockMediaInfo(), "transferinfo": MockTransferInfo(1), "downloader": "qbittorrent"
+            }, 1.5),
+            "transfer.complete (200 文件)": ({
+                "mediainfo": MockMediaInfo(), "transferinfo": MockTransferInfo(200), "downloader": "qbittorrent"
+            }, 1.0),
+        }
+        serializer = self.Serializer()
+        for name, (payload, ratio) in payloads.items():
+            self.assertEqual(serializer.to_dict(payload), legacy_to_dict(payload))
+            legacy = min(timeit.repeat(lambda: legacy_to_dict(payload), number=200, repeat=3))
+            current = min(timeit.repeat(lambda: serializer.to_dict(payload), number=200, repeat=3))
+            self.assertLess(current, legacy * ratio, name)
+
+
+class TestRules(unittest.TestCase):
+    """多规则路由测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def _init(self, rules, **config):
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps(rules), **config})
+
+    def test_parse_rules(self):
+        """测试规则解析"""
+        rules = self.module.rules.parse_rules(json.dumps([
+            {"name": "a", "event": "transfer.complete", "command": "echo a", "timeout": "30"},
+            {"event": ["download.added", "subscribe.added"], "command": "echo b", "enabled": False},
+            {"name": "a", "command": "echo dup"},
+            "invalid",
+        ]), default_timeout=60)
+        self.assertEqual([rule.name for rule in rules], ["a", "规则2"])
+        self.assertEqual(rules[0].events, ("transfer.complete",))
+        self.assertEqual(rules[0].timeout, 30)
+        self.assertEqual(rules[1].events, ("download.added", "subscribe.added"))
+        self.assertFalse(rules[1].enabled)
+        self.assertEqual(self.module.rules.parse_rules("not json"), [])
+
+    def test_rule_index(self):
+        """测试事件类型索引"""
+        Rule = self.module.rules.Rule
+        index = self.module.rules.RuleIndex([
+            Rule(name="all", command="echo all"),
+            Rule(name="transfer", command="echo t", events=("transfer.complete",)),
+            Rule(name="disabled", command="echo d", events=("transfer.complete",), enabled=False),
+            Rule(name="download", command="echo d", events=("download.added",)),
+        ])
+        self.assertEqual([r.name for r in index.match("transfer.complete")], ["all", "transfer"])
+        self.assertEqual([r.name for r in index.match("download.added")], ["all", "download"])
+        self.assertEqual([r.name for r in index.match("site.deleted")], ["all"])
+        self.assertEqual(len(index), 3)
+
+    @patch('eventexecutor.process.run_process')
+    def test_fan_out_serializes_once(self, mock_run):
+        """测试事件只序列化一次并分发给匹配的规则"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        rules = [{"name": f"r{i}", "event": "transfer.complete", "command": f"echo {i}", "timeout": i + 1}
+                 for i in range(20)]
+        rules.append({"name": "other", "event": "download.added", "command": "echo other"})
+        self._init(rules)
+        with patch.object(self.plugin._serializer, "to_dict", wraps=self.plugin._serializer.to_dict) as to_dict:
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"mediainfo": {"title": "测试"}}))
+        to_dict.assert_called_once()
+        self.assertEqual(mock_run.call_count, 20)
+        self.assertEqual([c[0][0] for c in mock_run.call_args_list], [f"echo {i}" for i in range(20)])
+        self.assertEqual([c[1]['timeout'] for c in mock_run.call_args_list], list(range(1, 21)))
+
+    @patch('eventexecutor.process.run_process')
+    def test_serialization_failure(self, mock_run):
+        """测试事件数据序列化失败时规则记为执行异常（指标、熔断、执行日志），其余规则继续执行"""
+        self._init([{"name": "a", "event": "transfer.complete", "command": "echo a"},
+                    {"name": "b", "event": "transfer.complete", "python": "result = 1"},
+                    {"name": "c", "event": "transfer.complete", "command": "echo c"}])
+        self.plugin._journal = Mock()
+        to_json = self.module.to_json
+
+        def failing(value, pretty=None):
+            if pretty is not None:
+                raise ValueError("bad value")
+            return to_json(value)
+        with patch('eventexecutor.to_json', side_effect=failing):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        mock_run.assert_not_called()
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("executions_total", rule="a", status="error"), 1)
+        self.assertEqual(metrics.counter("executions_total", rule="b", status="ok"), 1)
+        self.assertEqual(metrics.counter("executions_total", rule="c", status="error"), 1)
+        executions = self.plugin._journal.record.call_args[0][2]
+        self.assertEqual([(e.rule, e.status) for e in executions], [("a", "error"), ("b", "ok"), ("c", "error")])
+        self.assertIn("bad value", executions[0].stderr)
+
+    @patch('eventexecutor.process.run_process')
+    def test_default_command_with_rules(self, mock_run):
+        """测试默认命令与规则同时生效"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self._init([{"name": "download", "event": "download.added", "command": "echo rule"}],
+                   bash_command="echo default", event_type="transfer.complete")
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        self.plugin.on_event(MockEvent(MockEventType.DownloadAdded, {}))
+        self.plugin.on_event(MockEvent(MockEventType.SiteDeleted, {}))
+        self.assertEqual([c[0][0] for c in mock_run.call_args_list], ["echo default", "echo rule"])
+
+
+class TestConditions(unittest.TestCase):
+    """规则条件测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.compile = self.module.conditions.compile_condition
+        self.plugin = self.module.EventExecutor()
+        self.event_data = {
+            "mediainfo": MockMediaInfo(),
+            "transferinfo": MockTransferInfo(2),
+            "downloader": "qbittorrent"
+        }
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_field_operators(self):
+        """测试字段运算符（直接作用于原始对象）"""
+        data = self.event_data
+        self.assertTrue(self.compile({"mediainfo.type": "电影"})(data))
+        self.assertTrue(self.compile({"mediainfo.year": 2024})(data))
+        self.assertFalse(self.compile({"mediainfo.type": "电视剧"})(data))
+        self.assertTrue(self.compile({"mediainfo.tmdb_id": {"in": [1, 12345]}})(data))
+        self.assertTrue(self.compile({"mediainfo.vote_average": {"ge": 8, "lt": 9}})(data))
+        self.assertTrue(self.compile({"transferinfo.target_path": {"startswith": "/media/Movies"}})(data))
+        self.assertTrue(self.compile({"transferinfo.target_diritem.name": {"regex": r"\(20\d\d\)$"}})(data))
+        self.assertTrue(self.compile({"transferinfo.file_list.1": {"endswith": "E01.mkv"}})(data))
+        self.assertTrue(self.compile({"transferinfo.file_list": {"contains": "/downloads/Test.S01E00.mkv"}})(data))
+        self.assertTrue(self.compile({"mediainfo.missing": {"exists": False}})(data))
+        self.assertFalse(self.compile({"mediainfo.missing": "x"})(data))
+
+    def test_enum_value(self):
+        """测试枚举字段按值比较"""
+        data = {"type": MockEventType.TransferComplete}
+        self.assertTrue(self.compile({"type": "transfer.complete"})(data))
+
+    def test_combinators(self):
+        """测试组合条件"""
+        data = self.event_data
+        self.assertTrue(self.compile({"any": [{"mediainfo.type": "电视剧"}, {"downloader": "qbittorrent"}]})(data))
+        self.assertFalse(self.compile({"all": [{"mediainfo.type": "电视剧"}, {"downloader": "qbittorrent"}]})(data))
+        self.assertTrue(self.compile({"not": {"mediainfo.type": "电视剧"}})(data))
+        self.assertFalse(self.compile({"mediainfo.type": "电影", "downloader": "transmission"})(data))
+
+    def test_invalid_condition(self):
+        """测试无效条件"""
+        ConditionError = self.module.conditions.ConditionError
+        for spec in ({"a": {"unknown": 1}}, {"a": {"regex": "("}}, {"a": {"in": 1}},
+                     {"a": {"gt": "abc"}}, {"any": []}, "a == 1"):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ConditionError):
+                    self.compile(spec)
+        rules = self.module.rules.parse_rules(json.dumps([
+            {"name": "bad", "command": "echo", "condition": {"a": {"regex": "("}}}
+        ]))
+        self.assertEqual(rules, [])
+
+    @patch('eventexecutor.process.run_process')
+    def test_rejected_event_not_serialized(self, mock_run):
+        """测试条件不成立时不转换事件数据、不启动进程"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "anime", "event": "transfer.complete", "command": "echo anime",
+             "condition": {"transferinfo.target_path": {"startswith": "/media/anime"}}},
+            {"name": "movie", "event": "transfer.complete", "command": "echo movie",
+             "condition": {"mediainfo.type": "电影"}},
+        ])})
+        with patch.object(self.plugin._serializer, "to_dict", wraps=self.plugin._serializer.to_dict) as to_dict:
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, self.event_data))
+            self.assertEqual([c[0][0] for c in mock_run.call_args_list], ["echo movie"])
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"mediainfo": {"type": "电视剧"}}))
+            self.assertEqual(to_dict.call_count, 1)
+        self.assertEqual(mock_run.call_count, 1)
+
+
+class TestSelectors(unittest.TestCase):
+    """事件类型选择器测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.EventSelector = self.module.matcher.EventSelector
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_glob_and_regex(self):
+        """测试通配符完整匹配、正则按搜索匹配"""
+        selector = self.EventSelector("subscribe.*, re:^download\\.(added|deleted)$")
+        self.assertTrue(selector.matches("subscribe.added"))
+        self.assertTrue(selector.matches("download.added"))
+        self.assertFalse(selector.matches("download.file.completed"))
+        self.assertFalse(selector.matches("user.subscribe.added"))
+        self.assertTrue(self.EventSelector("re:complete").matches("transfer.complete"))
+        self.assertTrue(self.EventSelector(["download.*.completed"]).matches("download.hash.completed"))
+
+    def test_exclusions(self):
+        """测试排除选择器：! 前缀与单独的排除列表"""
+        selector = self.EventSelector("*, !notice.message", exclude=["user.*"])
+        self.assertFalse(selector.matches("notice.message"))
+        self.assertFalse(selector.matches("user.message"))
+        self.assertTrue(selector.matches("transfer.complete"))
+        # 只有排除时匹配其余全部事件
+        selector = self.EventSelector(None, exclude="notice.message,user.message")
+        self.assertFalse(selector.match_all)
+        self.assertTrue(selector.matches("plugin.action"))
+        self.assertFalse(selector.matches("user.message"))
+        self.assertTrue(self.EventSelector("").match_all)
+
+    def test_invalid_selector(self):
+        """测试无效正则的规则被忽略"""
+        with self.assertRaises(ValueError):
+            self.EventSelector("re:(")
+        rules = self.module.rules.parse_rules(json.dumps([
+            {"name": "bad", "event": "re:(", "command": "echo bad"},
+            {"name": "ok", "event": "site.*", "command": "echo ok"},
+        ]))
+        self.assertEqual([rule.name for rule in rules], ["ok"])
+
+    def test_index_precomputed_and_cached(self):
+        """测试已知事件类型预先编译，未知事件类型首次匹配后缓存"""
+        rules = self.module.rules.parse_rules(json.dumps([
+            {"name": "all-but-messages", "event": "*", "exclude": ["notice.message", "user.message"],
+             "command": "echo a"},
+            {"name": "sites", "event": "re:^site\\.", "command": "echo b"},
+        ]))
+        known = [e.value for e in MockEventType]
+        index = self.module.rules.RuleIndex(rules, known_types=known)
+        self.assertEqual(set(index._index), set(known))
+        self.assertEqual([r.name for r in index.match("site.updated")], ["all-but-messages", "sites"])
+        self.assertEqual(index.match("user.message"), [])
+        with patch.object(rules[0].selector, "matches", wraps=rules[0].selector.matches) as matches:
+            self.assertEqual(len(index.match("site.refreshed")), 2)
+            self.assertEqual(len(index.match("site.refreshed")), 2)
+            self.assertEqual(index.match("transfer.complete")[0].name, "all-but-messages")
+            self.assertEqual(matches.call_count, 1)
+
+    def test_default_rule_patterns(self):
+        """测试默认规则的通配符与排除配置"""
+        self.plugin._enabled = True
+        self.plugin._bash_command = "echo test"
+        self.plugin._event_type = "download.*"
+        self.plugin._exclude_events = ["download.removed"]
+        index = self.plugin._compile_rules()
+        self.assertEqual(len(index.match(MockEventType.DownloadAdded.value)), 1)
+        self.assertEqual(index.match(MockEventType.DownloadRemoved.value), [])
+        self.assertEqual(index.match(MockEventType.TransferComplete.value), [])
+        self.assertEqual(len(self.plugin._match_rules(MockEvent(MockEventType.DownloadHashCompleted))), 1)
+
+
+class TestEnvironment(unittest.TestCase):
+    """基础环境变量测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.build = self.module.environment.build_base_env
+        self.plugin = self.module.EventExecutor()
+        self.environ = {"PATH": "/usr/bin", "HOME": "/root", "LC_CTYPE": "C.UTF-8",
+                        "PYTHONPATH": "/app", "SECRET_TOKEN": "x", "MP_API_KEY": "y"}
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_allowlist(self):
+        """测试允许列表（含通配符）与始终保留的变量"""
+        self.assertEqual(self.build(None, self.environ), self.environ)
+        self.assertEqual(self.build(["PYTHONPATH", "LC_*"], self.environ),
+                         {"PATH": "/usr/bin", "HOME": "/root", "LC_CTYPE": "C.UTF-8", "PYTHONPATH": "/app"})
+        self.assertIsInstance(self.build(None), dict)
+
+    @patch('eventexecutor.process.run_process')
+    def test_overlay_per_event(self, mock_run):
+        """测试每个事件在基础环境上叠加变量，且不修改基础环境"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        with patch.dict(os.environ, {"SECRET_TOKEN": "x", "PYTHONPATH": "/app"}):
+            self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                     "env_allowlist": "PYTHONPATH, LC_*"})
+        base = dict(self.plugin._base_env)
+        self.assertNotIn("SECRET_TOKEN", base)
+        self.assertEqual(base["PYTHONPATH"], "/app")
+        for event_type in (MockEventType.TransferComplete, MockEventType.DownloadAdded):
+            self.plugin.on_event(MockEvent(event_type, {"a": 1}))
+            env = mock_run.call_args[1]['env']
+            self.assertEqual(env['MP_EVENT_TYPE'], event_type.value)
+            self.assertIn('MP_EVENT_DATA', env)
+            self.assertNotIn('SECRET_TOKEN', env)
+        self.assertEqual(self.plugin._base_env, base)
+        # 重新加载配置时重建
+        self.plugin.init_plugin({"enabled": False, "env_allowlist": ""})
+        self.assertGreater(len(self.plugin._base_env), len(base))
+
+    def test_benchmark(self):
+        """基准测试：每个事件复制 os.environ 与叠加基础环境的耗时"""
+        import timeit
+        base = self.build()
+        legacy = min(timeit.repeat(lambda: os.environ.copy(), number=2000, repeat=3))
+        current = min(timeit.repeat(lambda: {**base, "MP_EVENT_TYPE": "t", "MP_EVENT_TIME": "t"},
+                                    number=2000, repeat=3))
+        self.assertLess(current, legacy)
+
+
+class TestDedup(unittest.TestCase):
+    """去重与防抖测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.dedup = self.module.dedup
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_ttl_cache(self):
+        """测试指纹缓存的命中、过期与容量淘汰"""
+        now = [0.0]
+        cache = self.dedup.TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+        self.assertFalse(cache.seen("a"))
+        self.assertTrue(cache.seen("a"))
+        self.assertFalse(cache.seen("b"))
+        # a 最近使用，c 加入时淘汰 b
+        cache.seen("a")
+        self.assertFalse(cache.seen("c"))
+        self.assertTrue(cache.seen("a"))
+        self.assertFalse(cache.seen("b"))
+        now[0] = 11
+        self.assertFalse(cache.seen("c"))
+        self.assertEqual(cache.stats(), {"size": 2, "hits": 3, "misses": 5, "evictions": 3})
+
+    def test_fingerprint(self):
+        """测试关键字段指纹与整个事件数据的指纹"""
+        fingerprint = self.dedup.Fingerprint(["mediainfo.tmdb_id", "missing"])
+        self.assertEqual(fingerprint("transfer.complete", {"mediainfo": MockMediaInfo()}),
+                         ("transfer.complete", "12345", None))
+        whole = self.dedup.Fingerprint(dumps=json.dumps)
+        self.assertEqual(whole("a", {"x": 1}), whole("a", {"x": 1}))
+        self.assertNotEqual(whole("a", {"x": 1}), whole("a", {"x": 2}))
+        self.assertNotEqual(whole("a", {"x": 1}), whole("b", {"x": 1}))
+
+    def test_debouncer(self):
+        """测试防抖只执行静默期后的最后一个事件"""
+        fired = []
+        debouncer = self.dedup.Debouncer(fired.append, quiet=0.1, max_keys=10)
+        debouncer.start()
+        for i in range(3):
+            debouncer.add("a", f"a{i}")
+        debouncer.add("b", "b0")
+        time.sleep(0.3)
+        self.assertEqual(fired, ["a2", "b0"])
+        debouncer.add("a", "a3")
+        debouncer.stop()
+        self.assertEqual(fired, ["a2", "b0", "a3"])
+        self.assertEqual(debouncer.stats(), {"pending": 0, "hits": 2, "misses": 3, "fired": 3})
+        self.assertFalse(debouncer.add("a", "late"))
+
+    def test_debouncer_overflow(self):
+        """测试等待数超过上限时立即执行最早的事件"""
+        fired = []
+        debouncer = self.dedup.Debouncer(fired.append, quiet=60, max_keys=2)
+        debouncer.start()
+        for key in "abc":
+            debouncer.add(key, key)
+        self.assertEqual(fired, ["a"])
+        debouncer.stop()
+        self.assertEqual(fired, ["a", "b", "c"])
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_dedup(self, mock_run):
+        """测试插件按关键字段去重，并通过统计接口暴露命中数"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                 "dedup_mode": "dedup", "dedup_keys": "hash", "dedup_events": "download.*"})
+        for data in ({"hash": "h1"}, {"hash": "h1", "retry": 1}, {"hash": "h2"}):
+            self.plugin.on_event(MockEvent(MockEventType.DownloadAdded, data))
+        # 不参与去重的事件不受影响
+        for _ in range(2):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"hash": "h1"}))
+        self.assertEqual(mock_run.call_count, 4)
+        stats = self.plugin.get_stats()["dedup"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertEqual(self.plugin.get_api()[0]["path"], "/stats")
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_debounce(self, mock_run):
+        """测试插件防抖：连续事件只执行最后一个，停止时立即执行"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 2, "bash_command": "echo test",
+                                 "dedup_mode": "debounce", "dedup_window": 60,
+                                 "dedup_keys": "site"})
+        for i in range(5):
+            self.plugin.on_event(MockEvent(MockEventType.SiteUpdated, {"site": "a", "n": i}))
+        self.assertEqual(self.plugin.get_stats()["debounce"]["pending"], 1)
+        self.assertEqual(mock_run.call_count, 0)
+        self.plugin.stop_service()
+        self.assertEqual(mock_run.call_count, 1)
+        data = json.loads(mock_run.call_args[1]['env']['MP_EVENT_DATA'])
+        self.assertEqual(data["data"]["n"], 4)
+
+    def test_invalid_config(self):
+        """测试无效的关键字段不启用去重"""
+        self.plugin.init_plugin({"enabled": True, "dedup_mode": "dedup", "dedup_keys": "a..b",
+                                 "bash_command": "echo test"})
+        self.assertIsNone(self.plugin._fingerprint)
+
+
+class TestRateLimit(unittest.TestCase):
+    """令牌桶限流测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.ratelimit = self.module.ratelimit
+        self.plugin = self.module.EventExecutor()
+        self.now = [0.0]
+        self.clock = lambda: self.now[0]
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def _limiter(self, policy, sample=10, backlog=1000):
+        passed = []
+        limit = self.ratelimit.Limit(per_minute=60, burst=2, policy=policy, backlog=backlog,
+                                     sample=sample, clock=self.clock)
+        limiter = self.ratelimit.RateLimiter(lambda item, names: passed.append(item))
+        limiter.add_rule("r", limit)
+        return limiter, passed
+
+    def test_token_bucket(self):
+        """测试令牌补充与等待时间"""
+        bucket = self.ratelimit.TokenBucket(rate=2, burst=2, clock=self.clock)
+        for _ in range(2):
+            self.assertTrue(bucket.ready())
+            bucket.consume()
+        self.assertFalse(bucket.ready())
+        self.assertAlmostEqual(bucket.wait_time(), 0.5)
+        self.now[0] = 10
+        self.assertTrue(bucket.ready())
+        self.assertEqual(bucket.wait_time(), 0)
+
+    def test_policies(self):
+        """测试各超限策略的计数"""
+        expected = {
+            "queue": ([0, 1], {"passed": 2, "queued": 6, "dropped": 0, "sampled": 0}),
+            "drop_newest": ([0, 1], {"passed": 2, "queued": 0, "dropped": 6, "sampled": 0}),
+            "drop_oldest": ([0, 1], {"passed": 2, "queued": 6, "dropped": 3, "sampled": 0}),
+            "sample": ([0, 1], {"passed": 2, "queued": 3, "dropped": 3, "sampled": 3}),
+        }
+        for policy, (passed_items, counters) in expected.items():
+            with self.subTest(policy=policy):
+                limiter, passed = self._limiter(policy, sample=2, backlog=3 if policy != "queue" else 1000)
+                for i in range(8):
+                    limiter.submit(i, ["r"])
+                self.assertEqual(passed, passed_items)
+                stats = limiter.stats()["r"]
+                self.assertEqual({k: stats[k] for k in counters}, counters)
+                self.assertEqual(stats["policy"], policy)
+                self.assertEqual(limiter.stop(), stats["backlog"])
+
+    def test_backlog_drained_in_order(self):
+        """测试积压事件在令牌可用时按顺序执行，且新事件排在积压之后"""
+        passed = []
+        limit = self.ratelimit.Limit(per_minute=600, burst=1, policy="drop_oldest", backlog=2)
+        limiter = self.ratelimit.RateLimiter(lambda item, names: passed.append(item))
+        limiter.add_rule("r", limit)
+        limiter.start()
+        for i in range(4):
+            limiter.submit(i, ["r"])
+        time.sleep(0.35)
+        self.assertEqual(passed, [0, 2, 3])
+        self.assertEqual(limiter.stop(), 0)
+
+    def test_global_and_unlimited_rules(self):
+        """测试全局限流作用于所有规则，同一事件只放行取到令牌的规则"""
+        calls = []
+        global_limit = self.ratelimit.Limit(per_minute=60, burst=3, policy="drop_newest", clock=self.clock)
+        limiter = self.ratelimit.RateLimiter(lambda item, names: calls.append((item, names)), global_limit)
+        limiter.add_rule("a", self.ratelimit.Limit(per_minute=60, burst=1, policy="drop_newest",
+                                                   clock=self.clock))
+        limiter.add_rule("b")
+        limiter.submit(1, ["a", "b"])
+        limiter.submit(2, ["a", "b"])
+        limiter.submit(3, ["a", "b"])
+        self.assertEqual(calls, [(1, ["a", "b"]), (2, ["b"])])
+        self.assertEqual(limiter.stats()["a"]["dropped"], 2)
+        self.assertEqual(limiter.stats()["b"]["dropped"], 1)
+
+    def test_invalid_policy(self):
+        """测试无效的超限策略"""
+        with self.assertRaises(ValueError):
+            self.ratelimit.Limit(per_minute=1, policy="unknown")
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_rule_limits(self, mock_run):
+        """测试插件按规则限流：噪声事件被丢弃，关键事件不受影响"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "transfer", "event": "transfer.complete", "command": "echo transfer"},
+            {"name": "noisy", "event": "user.message", "command": "echo noisy",
+             "rate_limit": 1, "burst": 2, "overflow": "drop_newest"},
+        ])})
+        for _ in range(10):
+            self.plugin.on_event(MockEvent(MockEventType.UserMessage, {}))
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        self.assertEqual(commands.count("echo transfer"), 10)
+        self.assertEqual(commands.count("echo noisy"), 2)
+        stats = self.plugin.get_stats()["rate_limit"]
+        self.assertEqual(list(stats), ["noisy"])
+        self.assertEqual(stats["noisy"]["dropped"], 8)
+
+
+class TestPriorityLanes(unittest.TestCase):
+    """优先级车道测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.LaneQueue = self.module.lanes.LaneQueue
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_strict_priority(self):
+        """测试高车道先出队，同车道先进先出"""
+        lanes = self.LaneQueue(lanes=3, maxsize=10)
+        for item, lane in (("low1", 2), ("n1", 1), ("high1", 0), ("low2", 2), ("high2", 0)):
+            lanes.put_nowait(item, lane)
+        self.assertEqual([lanes.get() for _ in range(5)], ["high1", "high2", "n1", "low1", "low2"])
+        stats = lanes.stats()
+        self.assertEqual(list(stats), ["high", "normal", "low"])
+        self.assertEqual(stats["low"]["started"], 2)
+        self.assertEqual(stats["high"]["depth"], 0)
+
+    def test_starvation_protection(self):
+        """测试低车道任务等待超时后先于高车道执行"""
+        lanes = self.LaneQueue(lanes=3, maxsize=10, max_wait=0.05)
+        lanes.put_nowait("low", 2)
+        time.sleep(0.06)
+        lanes.put_nowait("high", 0)
+        self.assertEqual(lanes.get(), "low")
+        self.assertGreaterEqual(lanes.stats()["low"]["wait_max_ms"], 50)
+
+    def test_full_queue_evicts_lower_lane(self):
+        """测试队列已满时高车道任务挤掉最新的低车道任务"""
+        lanes = self.LaneQueue(lanes=3, maxsize=2)
+        lanes.put_nowait("low1", 2)
+        lanes.put_nowait("low2", 2)
+        self.assertEqual(lanes.put_nowait("high", 0), "low2")
+        with self.assertRaises(queue.Full):
+            lanes.put_nowait("low3", 2)
+        self.assertEqual(lanes.stats()["low"]["dropped"], 2)
+        lanes.close()
+        self.assertEqual([lanes.get(), lanes.get()], ["high", "low1"])
+        self.assertIs(lanes.get(), self.module.lanes.CLOSED)
+
+    def test_burst_latency(self):
+        """测试大量低价值事件排队时，⭐ 事件仍在毫秒级开始执行"""
+        started = {}
+        gate = threading.Event()
+
+        def handler(job):
+            started[job] = time.monotonic()
+            gate.wait(5)
+
+        pool = self.module.pool.WorkerPool(handler=handler, workers=2, queue_size=5000, lanes=3, max_wait=60)
+        pool.start()
+        for i in range(3000):
+            self.assertTrue(pool.submit("notice.message", f"notice{i}", lane=2))
+        # 等待两个工作线程都已取到任务
+        deadline = time.monotonic() + 5
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        submitted = time.monotonic()
+        self.assertTrue(pool.submit("transfer.complete", "transfer", lane=0))
+        gate.set()
+        pool.stop(timeout=10)
+        latency = started["transfer"] - submitted
+        self.assertLess(latency, 0.1)
+        # 只有两个已在执行的低价值事件先于 ⭐ 事件开始
+        self.assertEqual(list(started).index("transfer"), 2)
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_lanes(self, mock_run):
+        """测试插件按事件类型分配车道，并暴露车道统计"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": 1,
+                                 "low_priority_events": ["notice.message"]})
+        lane_of = lambda t: self.plugin._lane_of(MockEvent(t))
+        self.assertEqual(lane_of(MockEventType.TransferComplete), 0)
+        self.assertEqual(lane_of(MockEventType.SiteUpdated), 1)
+        self.assertEqual(lane_of(MockEventType.NoticeMessage), 2)
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        self.plugin.stop_service()
+        self.assertEqual(mock_run.call_count, 1)
+
+
+class TestShardedPool(unittest.TestCase):
+    """分片执行测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.ShardedPool = self.module.pool.ShardedPool
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_order_per_key(self):
+        """测试同一 key 按提交顺序执行，不同 key 并行执行"""
+        lock = threading.Lock()
+        results = {}
+        active, peak = [0], [0]
+
+        def handler(job):
+            key, seq = job
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            with lock:
+                active[0] -= 1
+                results.setdefault(key, []).append(seq)
+
+        pool = self.ShardedPool(handler=handler, shards=4, queue_size=1000)
+        pool.start()
+        keys = [f"tmdb-{i}" for i in range(8)]
+        for seq in range(10):
+            for key in keys:
+                self.assertTrue(pool.submit(key, (key, seq)))
+        self.assertEqual(pool.stop(timeout=10), 0)
+        for key in keys:
+            self.assertEqual(results[key], list(range(10)))
+        self.assertGreater(peak[0], 1)
+        self.assertEqual(pool.shard_of("tmdb-1"), pool.shard_of("tmdb-1"))
+
+    def test_throughput_scales(self):
+        """测试吞吐随分片数增加"""
+        def elapsed(shards):
+            pool = self.ShardedPool(handler=lambda job: time.sleep(0.01), shards=shards, queue_size=1000)
+            pool.start()
+            start = time.monotonic()
+            for i in range(40):
+                pool.submit(f"key-{i}", i)
+            pool.stop(timeout=10)
+            return time.monotonic() - start
+
+        serial, sharded = elapsed(1), elapsed(8)
+        self.assertLess(sharded, serial / 2)
+
+    def test_full_shard(self):
+        """测试分片队列已满时丢弃"""
+        gate = threading.Event()
+        pool = self.ShardedPool(handler=lambda job: gate.wait(5), shards=2, queue_size=2)
+        pool.start()
+        results = [pool.submit("same", i) for i in range(5)]
+        self.assertFalse(all(results))
+        self.assertEqual(pool.dropped, results.count(False))
+        gate.set()
+        pool.stop(timeout=5)
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_shard_key(self, mock_run):
+        """测试插件按分片字段执行，同一作品的事件保持顺序"""
+        order = []
+        lock = threading.Lock()
+
+        def run(command, **kwargs):
+            data = json.loads(kwargs["env"]["MP_EVENT_DATA"])
+            time.sleep(0.002)
+            with lock:
+                order.append((data["data"]["mediainfo"]["tmdb_id"], data["type"]))
+            return Mock(returncode=0, stdout="")
+
+        mock_run.side_effect = run
+        self.plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": 4,
+                                 "shards": 3, "shard_key": "mediainfo.tmdb_id, transferinfo.target_path"})
+        self.assertIsInstance(self.plugin._pool, self.ShardedPool)
+        for tmdb_id in range(6):
+            for event_type in (MockEventType.DownloadAdded, MockEventType.TransferComplete):
+                self.plugin.on_event(MockEvent(event_type, {"mediainfo": {"tmdb_id": tmdb_id}}))
+        self.assertEqual(self.plugin._shard_key_of(MockEvent(MockEventType.TransferComplete, {
+            "transferinfo": {"target_path": "/media/a"}})), "/media/a")
+        self.assertIsNone(self.plugin._shard_key_of(MockEvent(MockEventType.TransferComplete, {})))
+        self.assertEqual(len(self.plugin.get_stats()["shards"]), 3)
+        self.plugin.stop_service()
+        for tmdb_id in range(6):
+            types = [event_type for key, event_type in order if key == tmdb_id]
+            self.assertEqual(types, ["download.added", "transfer.complete"])
+
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_shard_batches(self, mock_run):
+        """测试批次按分片拆分：同一作品的事件在同一分片中执行，不同分片并行"""
+        batches = []
+        lock = threading.Lock()
+
+        def run(command, **kwargs):
+            ids = [item["data"]["mediainfo"]["tmdb_id"] for item in json.loads(kwargs["env"]["MP_EVENT_BATCH"])]
+            with lock:
+                batches.append((threading.current_thread().name, ids))
+            return Mock(returncode=0, stdout="")
+
+        mock_run.side_effect = run
+        self.plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": 4, "shards": 3,
+                                 "shard_key": "mediainfo.tmdb_id", "batch_window": 60000})
+        for tmdb_id in list(range(6)) * 2:
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"mediainfo": {"tmdb_id": tmdb_id}}))
+        self.plugin.stop_service()
+        pool = self.ShardedPool(handler=None, shards=3)
+        shards = {pool.shard_of(str(tmdb_id)) for tmdb_id in range(6)}
+        self.assertEqual(len(batches), len(shards))
+        self.assertEqual(len({thread for thread, _ in batches}), len(shards))
+        for _, ids in batches:
+            self.assertEqual(len({pool.shard_of(str(tmdb_id)) for tmdb_id in ids}), 1)
+        self.assertEqual(sorted(tmdb_id for _, ids in batches for tmdb_id in ids), sorted(list(range(6)) * 2))
+
+    @patch('eventexecutor.process.run_process')
+    def test_batch_key_event_type(self, mock_run):
+        """测试单一事件类型的批次以事件类型作为工作线程池的 key"""
+        mock_run.return_value = Mock(returncode=0, stdout="")
+        self.plugin.init_plugin({"enabled": True, "bash_command": "echo test", "max_workers": 2,
+                                 "batch_window": 60000})
+        with patch.object(self.plugin._pool, "submit", wraps=self.plugin._pool.submit) as submit:
+            self.plugin._submit_batch([self.module.EventJob(MockEvent(MockEventType.TransferComplete, {}), [])])
+            self.plugin._submit_batch([self.module.EventJob(MockEvent(MockEventType.TransferComplete, {}), []),
+                                       self.module.EventJob(MockEvent(MockEventType.DownloadAdded, {}), [])])
+        self.assertEqual([call[0][0] for call in submit.call_args_list], ["transfer.complete", "batch"])
+
+
+class TestMetrics(unittest.TestCase):
+    """执行指标测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.metrics = self.module.metrics
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_histogram(self):
+        """测试直方图分桶、分位数与合并"""
+        histogram = self.metrics.Histogram((1, 2, 5, 10))
+        for value in (0.5, 1.5, 1.5, 3, 4, 20):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], [[1, 1], [2, 3], [5, 5], [10, 5], ["+Inf", 6]])
+        self.assertEqual(snapshot["max"], 20)
+        self.assertTrue(1 <= histogram.quantile(0.5) <= 2)
+        self.assertTrue(10 <= histogram.quantile(0.99) <= 20)
+        self.assertEqual(self.metrics.Histogram((1,)).quantile(0.5), 0)
+
+        metrics = self.metrics.Metrics()
+        metrics.observe("run_seconds", 0.002, rule="a")
+        metrics.observe("run_seconds", 0.2, rule="b")
+        self.assertEqual(metrics.histogram("run_seconds").count, 2)
+        self.assertEqual(metrics.histogram("run_seconds", rule="b").max, 0.2)
+
+    def test_prometheus_format(self):
+        """测试 Prometheus 文本格式"""
+        metrics = self.metrics.Metrics()
+        metrics.inc("executions_total", rule='say "hi"', status="ok")
+        metrics.observe("payload_bytes", 300, event_type="transfer.complete")
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE moviepilot_eventexecutor_executions_total counter", text)
+        self.assertIn('moviepilot_eventexecutor_executions_total{rule="say \\"hi\\"",status="ok"} 1', text)
+        self.assertIn('moviepilot_eventexecutor_payload_bytes_bucket{event_type="transfer.complete",le="256"} 0', text)
+        self.assertIn('moviepilot_eventexecutor_payload_bytes_bucket{event_type="transfer.complete",le="1024"} 1', text)
+        self.assertIn('moviepilot_eventexecutor_payload_bytes_count{event_type="transfer.complete"} 1', text)
+        self.assertTrue(text.endswith("\n"))
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_instrumentation(self, mock_run):
+        """测试插件记录事件、执行结果、超时与各阶段耗时"""
+        mock_run.side_effect = [
+            Mock(returncode=0, stdout=""),
+            Mock(returncode=2, stdout="", stderr="boom"),
+            subprocess.TimeoutExpired("cmd", 1),
+        ]
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                 "event_type": "transfer.complete"})
+        for _ in range(3):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"path": "/media/a"}))
+        self.plugin.on_event(MockEvent(MockEventType.SiteUpdated, {}))
+
+        summary = self.plugin.get_metrics()
+        rule = summary["rules"]["默认规则"]
+        self.assertEqual((rule["executions"], rule["failed"], rule["timeouts"]), (3, 1, 1))
+        transfer = summary["event_types"]["transfer.complete"]
+        self.assertEqual(transfer["events"], 3)
+        self.assertEqual(transfer["serialize"]["count"], 3)
+        self.assertEqual(transfer["payload_bytes"], 3 * len('{"type":"transfer.complete","data":{"path":"/media/a"}}'))
+        self.assertEqual(summary["event_types"]["site.updated"]["ignored"], 1)
+        for stage in ("queue_wait_seconds", "serialize_seconds", "prepare_seconds", "run_seconds"):
+            self.assertEqual(summary["stages"][stage]["count"], 3, stage)
+
+        text = self.plugin.get_prometheus_metrics()
+        self.assertIn('exit_codes_total{code="2",rule="默认规则"} 1', text)
+        self.assertIn('timeouts_total{rule="默认规则"} 1', text)
+        paths = [api["path"] for api in self.plugin.get_api()]
+        self.assertEqual(paths[:3], ["/stats", "/metrics", "/metrics/prometheus"])
+
+        page = self.plugin.get_page()
+        self.assertEqual(len(page), 4)
+        page_text = json.dumps(page, ensure_ascii=False)
+        self.assertIn("默认规则", page_text)
+        self.assertIn("transfer.complete", page_text)
+
+
+class TestJournal(unittest.TestCase):
+    """执行日志测试"""
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self.module = load_plugin_module()
+        self.journal_module = self.module.journal
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        self.plugin = self.module.EventExecutor()
+        self.journals = []
+
+    def tearDown(self):
+        self.plugin.stop_service()
+        for journal in self.journals:
+            journal.close()
+        self.tmpdir.cleanup()
+
+    def _open(self, **kwargs):
+        journal = self.journal_module.Journal(self.path / "journal.db", flush_interval=0, **kwargs)
+        journal.open()
+        self.journals.append(journal)
+        return journal
+
+    def test_record_and_query(self):
+        """测试记录、分页查询、过滤与输出截断"""
+        Execution = self.journal_module.Execution
+        journal = self._open(output_limit=10)
+        now = time.time()
+        for i in range(5):
+            journal.record("transfer.complete", json.dumps({"i": i}),
+                           [Execution("a", "ok", 0, 0.1, stdout="x" * 50),
+                            Execution("b", "failed" if i % 2 else "ok", 1 if i % 2 else 0, 0.2)],
+                           queue_wait=0.01, timestamp=now - 10 + i)
+        journal.record("site.updated", "{}", [Execution("a", "timeout", None, 1.0)], timestamp=now)
+        journal.flush()
+
+        result = journal.query(page=1, count=4)
+        self.assertEqual(result["total"], 11)
+        self.assertEqual(len(result["items"]), 4)
+        self.assertEqual(result["items"][0]["event_type"], "site.updated")
+        self.assertNotIn("payload", result["items"][0])
+        self.assertEqual(len(journal.query(page=3, count=4)["items"]), 3)
+
+        self.assertEqual(journal.query(status="failed")["total"], 2)
+        self.assertEqual(journal.query(status=["failed", "timeout"])["total"], 3)
+        self.assertEqual(journal.query(rule="b", event_type="transfer.complete")["total"], 5)
+        self.assertEqual(journal.query(start=now - 7.5, end=now)["total"], 4)
+
+        item = journal.query(rule="a", event_type="transfer.complete", count=1, include_payload=True)["items"][0]
+        self.assertEqual(json.loads(item["payload"]), {"i": 4})
+        self.assertTrue(item["stdout"].startswith("x" * 10 + "\n"))
+        self.assertIn("已截断 40", item["stdout"])
+
+        # 失败事件只返回一次，按时间正序
+        entries = journal.events_for_replay(status=list(self.journal_module.FAILED_STATUSES))
+        self.assertEqual([(event_type, json.loads(payload)) for _, event_type, payload in entries],
+                         [("transfer.complete", {"i": 1}), ("transfer.complete", {"i": 3}), ("site.updated", {})])
+
+    def test_retention(self):
+        """测试按保留天数与最大事件数清理"""
+        Execution = self.journal_module.Execution
+        journal = self._open(retention_days=1, max_events=3)
+        # 跳过写入线程的首次自动清理
+        journal._last_purge = time.monotonic()
+        now = time.time()
+        journal.record("transfer.complete", "{}", [Execution("a", "ok")], timestamp=now - 2 * 86400)
+        for i in range(4):
+            journal.record("transfer.complete", "{}", [Execution("a", "ok")], timestamp=now - 10 + i)
+        journal.flush()
+        self.assertEqual(journal.purge(), 2)
+        self.assertEqual(journal.query()["total"], 3)
+        # 执行记录随事件一起删除
+        self.assertEqual(journal.query(start=now - 9)["total"], 3)
+
+        journal.close()
+        reopened = self._open()
+        self.assertEqual(reopened.query()["total"], 3)
+
+    def test_replay_rate(self):
+        """测试重放按速率提交并可停止"""
+        handled = []
+        replay = self.journal_module.Replay([(i, "t", "{}") for i in range(5)],
+                                            handler=lambda *args: handled.append(args) or True, rate=50)
+        start = time.monotonic()
+        replay.start()
+        replay.wait(5)
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 50)
+        self.assertEqual(replay.stats(), {"running": False, "total": 5, "submitted": 5, "skipped": 0})
+
+        slow = self.journal_module.Replay([(i, "t", "{}") for i in range(100)], handler=lambda *args: True, rate=5)
+        slow.start()
+        time.sleep(0.1)
+        slow.stop(timeout=1)
+        self.assertFalse(slow.running)
+        self.assertLess(slow.submitted, 100)
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_journal_and_replay(self, mock_run):
+        """测试插件记录执行结果、查询 API 与重放失败事件"""
+        mock_run.side_effect = [
+            Mock(returncode=0, stdout="done", stderr=""),
+            Mock(returncode=3, stdout="", stderr="boom"),
+            Mock(returncode=0, stdout="retried", stderr=""),
+        ]
+        with patch.object(self.module.EventExecutor, "get_data_path", create=True, return_value=self.path):
+            self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                     "event_type": "transfer.complete", "journal_enabled": True})
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"path": "/media/a"}))
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"path": "/media/b"}))
+        self.plugin._journal.flush()
+
+        result = self.plugin.get_journal(status="failed", payload=True)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["total"], 1)
+        item = result["items"][0]
+        self.assertEqual((item["rule"], item["exit_code"], item["stderr"]), ("默认规则", 3, "boom"))
+        self.assertEqual(json.loads(item["payload"]), {"path": "/media/b"})
+        self.assertIsNotNone(item["queue_wait"])
+        self.assertFalse(self.plugin.get_journal(start="not a time")["success"])
+
+        # 未指定条件时重放全部失败的事件
+        replay = self.plugin.replay_journal(rate=100)
+        self.assertTrue(replay["success"])
+        self.assertEqual(replay["replay"]["total"], 1)
+        self.plugin._replay.wait(5)
+        self.plugin._journal.flush()
+
+        self.assertEqual(mock_run.call_count, 3)
+        env = mock_run.call_args.kwargs["env"]
+        self.assertEqual(json.loads(env["MP_EVENT_DATA"])["data"], {"path": "/media/b"})
+        latest = self.plugin.get_journal(count=1)["items"][0]
+        self.assertEqual((latest["status"], latest["replay_of"]), ("ok", item["event_id"]))
+        self.assertEqual(self.plugin.get_stats()["replay"]["submitted"], 1)
+
+    def test_journal_disabled(self):
+        """测试未启用执行日志时 API 返回失败"""
+        self.assertFalse(self.plugin.get_journal()["success"])
+        self.assertFalse(self.plugin.replay_journal()["success"])
+
+
+class TestRetry(unittest.TestCase):
+    """重试与死信队列测试"""
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        self.module = load_plugin_module()
+        self.retry = self.module.retry
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name)
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+        self.tmpdir.cleanup()
+
+    def _wait(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def _init(self, **config):
+        with patch.object(self.module.EventExecutor, "get_data_path", create=True, return_value=self.path):
+            self.plugin.init_plugin({"enabled": True, "max_workers": 0, "bash_command": "echo test",
+                                     "event_type": "transfer.complete", "dead_letter_enabled": True, **config})
+
+    def test_policy(self):
+        """测试指数退避、抖动范围与可重试的失败类型"""
+        RetryPolicy = self.retry.RetryPolicy
+        low = RetryPolicy(attempts=5, backoff=2, max_backoff=10, rand=lambda: 0)
+        high = RetryPolicy(attempts=5, backoff=2, max_backoff=10, rand=lambda: 1)
+        self.assertEqual([low.delay(i) for i in range(1, 5)], [1, 2, 4, 5])
+        self.assertEqual([high.delay(i) for i in range(1, 5)], [2, 4, 8, 10])
+
+        self.assertTrue(low.should_retry("failed", 1, 4))
+        self.assertFalse(low.should_retry("failed", 1, 5))
+        self.assertFalse(low.should_retry("ok", 0, 1))
+        self.assertTrue(low.should_retry("error", None, 1))
+
+        rule = RetryPolicy.from_options({"max_attempts": 3, "retry_exit_codes": "75, 111",
+                                         "retry_timeout": "false"}, low)
+        self.assertEqual((rule.attempts, rule.backoff, rule.max_backoff), (3, 2, 10))
+        self.assertTrue(rule.retryable("failed", 75))
+        self.assertFalse(rule.retryable("failed", 1))
+        self.assertFalse(rule.retryable("timeout", None))
+        self.assertEqual(RetryPolicy.from_options({}, low).attempts, 5)
+        with self.assertRaises(ValueError):
+            self.retry.parse_exit_codes("1,x")
+
+    def test_timer_wheel(self):
+        """测试时间轮按延迟顺序触发（含超过一圈的延迟），停止时返回未到期任务"""
+        fired = []
+        wheel = self.retry.TimerWheel(handler=lambda item: fired.append((item, time.monotonic())),
+                                      tick=0.01, slots=8)
+        wheel.start()
+        start = time.monotonic()
+        for name, delay in (("c", 0.25), ("a", 0.02), ("b", 0.12)):
+            wheel.schedule(delay, name)
+        wheel.schedule(60, "later")
+        self._wait(lambda: len(fired) == 3)
+        self.assertEqual([item for item, _ in fired], ["a", "b", "c"])
+        self.assertGreaterEqual(fired[2][1] - start, 0.24)
+        self.assertEqual(wheel.stats(), {"pending": 1, "scheduled": 4, "fired": 3})
+        self.assertEqual(wheel.stop(timeout=1), ["later"])
+        self.assertFalse(wheel.schedule(0.01, "after stop"))
+
+    def test_dead_letter_queue(self):
+        """测试死信队列持久化、分页、按规则取出与清空"""
+        DeadLetterQueue = self.retry.DeadLetterQueue
+        dlq = DeadLetterQueue(self.path / "dead_letter.db")
+        dlq.open()
+        for i in range(3):
+            dlq.add("transfer.complete", "a" if i < 2 else "b", json.dumps({"i": i}), 3, "failed", 1, "boom")
+        dlq.close()
+
+        dlq = DeadLetterQueue(self.path / "dead_letter.db")
+        dlq.open()
+        self.addCleanup(dlq.close)
+        self.assertEqual(dlq.count(), 3)
+        page = dlq.list(page=1, count=2, include_payload=True)
+        self.assertEqual((page["total"], len(page["items"])), (3, 2))
+        self.assertEqual(page["items"][0]["error"], "boom")
+        entries = dlq.fetch(limit=10, rules=["b"])
+        self.assertEqual([entry[3] for entry in entries], ["b"])
+        self.assertEqual(dlq.count(), 3)
+        self.assertTrue(dlq.ack(entries[0][0]))
+        self.assertFalse(dlq.ack(entries[0][0]))
+        self.assertEqual(dlq.count(), 2)
+        self.assertEqual(dlq.discard(), 2)
+        self.assertEqual(dlq.count(), 0)
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_retry_and_drain(self, mock_run):
+        """测试失败重试、重试耗尽后加入死信队列，以及批量重新执行死信"""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="boom")
+        self._init(retry_attempts=3, retry_backoff=0)
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"path": "/media/a"}))
+        self._wait(lambda: self.plugin._dead_letters.count() == 1)
+        self.assertEqual(mock_run.call_count, 3)
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("retries_total", rule="默认规则"), 2)
+        self.assertEqual(metrics.counter("dead_letters_total", rule="默认规则"), 1)
+        item = self.plugin.get_dead_letters(payload=True)["items"][0]
+        self.assertEqual((item["attempts"], item["exit_code"], json.loads(item["payload"])),
+                         (3, 1, {"path": "/media/a"}))
+
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        result = self.plugin.drain_dead_letters(rate=100)
+        self.assertTrue(result["success"])
+        self.assertEqual((result["remaining"], result["replay"]["total"]), (0, 1))
+        self.plugin._replay.wait(5)
+        self.assertEqual(mock_run.call_count, 4)
+        self.assertEqual(json.loads(mock_run.call_args.kwargs["env"]["MP_EVENT_DATA"])["data"],
+                         {"path": "/media/a"})
+        self.assertEqual(self.plugin._dead_letters.count(), 0)
+
+    @patch('eventexecutor.process.run_process')
+    def test_drain_keeps_unsubmitted(self, mock_run):
+        """测试重新执行死信时中途停止或执行队列已满，未提交的死信仍保留在队列中"""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        self._init()
+        for i in range(3):
+            self.plugin._dead_letters.add("transfer.complete", "默认规则", json.dumps({"i": i}), 3, "failed", 1)
+
+        # 执行队列已满：提交失败的死信不删除
+        with patch.object(self.plugin, "_enqueue", return_value=False):
+            self.assertEqual(self.plugin.drain_dead_letters(rate=100)["remaining"], 0)
+            self.plugin._replay.wait(5)
+        self.assertEqual(self.plugin._replay.stats()["skipped"], 3)
+        self.assertEqual(self.plugin._dead_letters.count(), 3)
+
+        # 提交第一个后停止服务
+        self.plugin.drain_dead_letters(rate=0.1)
+        self._wait(lambda: self.plugin._replay.submitted == 1)
+        self.plugin.stop_service()
+        self.assertEqual(mock_run.call_count, 1)
+        dlq = self.retry.DeadLetterQueue(self.path / "dead_letter.db")
+        dlq.open()
+        self.addCleanup(dlq.close)
+        self.assertEqual([json.loads(entry[2]) for entry in dlq.fetch()], [{"i": 1}, {"i": 2}])
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_non_retryable_and_stop(self, mock_run):
+        """测试不可重试的退出码直接加入死信队列，停止服务时等待重试的事件也加入死信队列"""
+        mock_run.return_value = Mock(returncode=1, stdout="", stderr="")
+        self._init(rules=json.dumps([
+            {"name": "slow", "event": "site.updated", "command": "echo slow", "max_attempts": 5, "retry_exit_codes": [1],
+             "backoff": 60},
+        ]), retry_attempts=3, retry_exit_codes="75")
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        self.assertEqual(mock_run.call_count, 1)
+        self.assertEqual(self.plugin._dead_letters.count(), 1)
+
+        self.plugin.on_event(MockEvent(MockEventType.SiteUpdated, {"id": 1}))
+        self.assertEqual(self.plugin.get_stats()["retry"]["pending"], 1)
+        self.plugin.stop_service()
+
+        dlq = self.retry.DeadLetterQueue(self.path / "dead_letter.db")
+        dlq.open()
+        self.addCleanup(dlq.close)
+        items = dlq.list()["items"]
+        self.assertEqual([(entry["rule"], entry["status"], entry["attempts"]) for entry in items],
+                         [("默认规则", "failed", 1), ("slow", "stopped", 1)])
+        self.assertFalse(self.plugin.drain_dead_letters()["success"])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """熔断器测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.breaker = self.module.breaker
+        self.plugin = self.module.EventExecutor()
+        self.now = 0.0
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def _clock(self):
+        return self.now
+
+    def test_failure_ratio(self):
+        """测试失败比例达到阈值时打开，半开试探成功后关闭、失败后重新打开"""
+        changes = []
+        breaker = self.breaker.CircuitBreaker(failure_ratio=0.5, min_calls=4, window=4, timeouts=0,
+                                              open_seconds=10, clock=self._clock,
+                                              on_change=lambda *change: changes.append(change))
+        for status in ("ok", "failed", "ok"):
+            self.assertTrue(breaker.allow())
+            breaker.record(status)
+        self.assertEqual(breaker.state, "closed")
+        breaker.record("failed")
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.stats()["open_remaining"], 10)
+
+        self.now = 10
+        self.assertTrue(breaker.allow())
+        # 半开状态下只放行一次试探
+        self.assertFalse(breaker.allow())
+        breaker.record("timeout")
+        self.assertEqual(breaker.state, "open")
+
+        self.now = 25
+        self.assertTrue(breaker.allow())
+        breaker.record("ok")
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(changes, [("closed", "open"), ("open", "half_open"), ("half_open", "open"),
+                                   ("open", "half_open"), ("half_open", "closed")])
+        stats = breaker.stats()
+        self.assertEqual((stats["opened"], stats["short_circuited"], stats["calls"]), (2, 2, 0))
+
+    def test_consecutive_timeouts(self):
+        """测试连续超时达到次数时打开，中间成功则重新计数"""
+        breaker = self.breaker.CircuitBreaker(failure_ratio=1, min_calls=100, timeouts=3, clock=self._clock)
+        for status in ("timeout", "timeout", "ok", "timeout", "timeout"):
+            breaker.record(status)
+        self.assertEqual(breaker.state, "closed")
+        breaker.record("timeout")
+        self.assertEqual(breaker.state, "open")
+
+    def test_from_options(self):
+        """测试规则熔断配置：全局启用、规则单独启用与关闭"""
+        CircuitBreaker = self.breaker.CircuitBreaker
+        default = CircuitBreaker(failure_ratio=0.5, min_calls=10, open_seconds=60)
+        self.assertIsNone(CircuitBreaker.from_options({}, None))
+        self.assertIsNone(CircuitBreaker.from_options({"breaker": False}, default))
+        self.assertEqual(CircuitBreaker.from_options({}, default).open_seconds, 60)
+        rule = CircuitBreaker.from_options({"breaker_open_seconds": 5, "breaker_ratio": 0.2}, None)
+        self.assertEqual((rule.open_seconds, rule.failure_ratio, rule.min_calls), (5, 0.2, 10))
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_short_circuit(self, mock_run):
+        """测试规则熔断后不再启动命令，事件进入死信队列，状态计入指标"""
+        import tempfile
+        from pathlib import Path
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        def run(command, **kwargs):
+            if command == "echo ok":
+                return Mock(returncode=0, stdout="", stderr="")
+            raise subprocess.TimeoutExpired(command, 1)
+
+        mock_run.side_effect = run
+        with patch.object(self.module.EventExecutor, "get_data_path", create=True, return_value=Path(tmpdir.name)):
+            self.plugin.init_plugin({"enabled": True, "max_workers": 0, "dead_letter_enabled": True, "rules": json.dumps([
+                {"name": "broken", "event": "transfer.complete", "command": "curl http://down",
+                 "breaker_timeouts": 2, "breaker_open_seconds": 60},
+                {"name": "healthy", "event": "transfer.complete", "command": "echo ok", "breaker": False},
+            ])})
+        for _ in range(5):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        self.assertEqual(commands.count("curl http://down"), 2)
+        self.assertEqual(commands.count("echo ok"), 5)
+        self.assertEqual(list(self.plugin.get_stats()["breakers"]), ["broken"])
+        self.assertEqual(self.plugin.get_stats()["breakers"]["broken"]["short_circuited"], 3)
+        self.assertEqual(self.plugin._dead_letters.count(), 5)
+
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.gauge("breaker_state", rule="broken"), 1)
+        self.assertEqual(metrics.counter("breaker_transitions_total", rule="broken", state="open"), 1)
+        summary = self.plugin.get_metrics()["rules"]["broken"]
+        self.assertEqual((summary["executions"], summary["short_circuited"], summary["breaker"]), (2, 3, "open"))
+        self.assertIn('breaker_state{rule="broken"} 1', self.plugin.get_prometheus_metrics())
+
+
+class TestOutput(unittest.TestCase):
+    """命令输出测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.process = self.module.process
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_buffer_head_tail(self):
+        """测试只保留开头与结尾，中间部分只计字节数"""
+        buffer = self.process.OutputBuffer(head=4, tail=4)
+        for chunk in (b"0123", b"45", b"6789abcdef"):
+            buffer.feed(chunk)
+        self.assertEqual(buffer.bytes, 16)
+        self.assertTrue(buffer.truncated)
+        self.assertEqual(buffer.text(), "0123\n...（省略 8 字节）...\ncdef")
+
+        short = self.process.OutputBuffer(head=4, tail=4)
+        short.feed(b"hello")
+        self.assertFalse(short.truncated)
+        self.assertEqual(short.text(), "hello")
+
+    def test_buffer_lines(self):
+        """测试按行转发，跨块拼接，超长的行截断"""
+        lines = []
+        buffer = self.process.OutputBuffer(on_line=lines.append, max_line=8)
+        for chunk in (b"first\nsec", b"ond\r\n", b"x" * 20 + b"\nlast"):
+            buffer.feed(chunk)
+        buffer.close()
+        self.assertEqual(lines, ["first", "second", "x" * 8, "last"])
+
+    def test_large_output_bounded(self):
+        """测试命令输出大量数据时只保留有界的开头与结尾，字节数准确"""
+        stdout = self.process.OutputBuffer(head=1024, tail=1024)
+        spawned = []
+        result = self.process.run_process(
+            "head -c 8000000 /dev/zero | tr '\\0' a; printf END; echo err >&2",
+            stdout=stdout, on_spawn=spawned.append)
+        self.assertEqual(result.returncode, 0)
+        self.assertEqual(stdout.bytes, 8000003)
+        self.assertLess(len(result.stdout), 2100)
+        self.assertTrue(result.stdout.startswith("a" * 1024))
+        self.assertTrue(result.stdout.endswith("END"))
+        self.assertIn("省略 7997955 字节", result.stdout)
+        self.assertEqual(result.stderr, "err\n")
+        self.assertEqual(len(spawned), 1)
+
+    def test_input_and_timeout(self):
+        """测试标准输入传递，超时时杀死进程并保留已输出的内容"""
+        result = self.process.run_process("cat", input="payload")
+        self.assertEqual(result.stdout, "payload")
+        with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+            self.process.run_process("echo started; sleep 5", timeout=0.5)
+        self.assertEqual(ctx.exception.output, "started\n")
+
+    def test_single_thread(self):
+        """测试输出、标准输入与超时都在调用线程中处理，不创建线程；后台进程持有管道时最多再等待 1 秒"""
+        started = []
+        stdout = self.process.OutputBuffer()
+        with patch.object(self.process.threading.Thread, "start", autospec=True,
+                          side_effect=lambda thread: started.append(thread)):
+            result = self.process.run_process("cat; echo err >&2", input="x" * 300000, stdout=stdout)
+            with self.assertRaises(subprocess.TimeoutExpired):
+                self.process.run_process("sleep 5", timeout=0.2)
+        self.assertEqual((stdout.bytes, result.stderr), (300000, "err\n"))
+        self.assertEqual(started, [])
+
+        start = time.monotonic()
+        result = self.process.run_process("echo before; sleep 5 & echo after")
+        self.assertEqual(result.stdout, "before\nafter\n")
+        self.assertLess(time.monotonic() - start, 3)
+
+    def test_without_pidfd(self):
+        """测试不支持 pidfd 时定时检查进程是否退出"""
+        with patch.object(self.process.os, "pidfd_open", side_effect=OSError(38, "ENOSYS")):
+            result = self.process.run_process("cat; exit 2", input="payload")
+            self.assertEqual((result.returncode, result.stdout), (2, "payload"))
+            with self.assertRaises(subprocess.TimeoutExpired):
+                self.process.run_process("sleep 5", timeout=0.2)
+
+    def test_plugin_stream_and_metrics(self):
+        """测试逐行记录输出模式与输出字节数指标"""
+        logger = sys.modules['app.log'].logger
+        logger.reset_mock()
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "output_log": "stream",
+                                 "output_head": 16, "output_tail": 16, "rules": json.dumps([
+            {"name": "noisy", "event": "transfer.complete",
+             "command": "seq 1 1000; echo oops >&2; exit 3"},
+        ])})
+        self.assertEqual(self.plugin._output_log, "stream")
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+
+        messages = [c[0][0] for c in logger.info.call_args_list]
+        self.assertIn("[事件执行器] 规则 noisy 输出：1000", messages)
+        self.assertIn("[事件执行器] 规则 noisy 错误输出：oops", messages)
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("output_bytes_total", rule="noisy", stream="stdout"),
+                         len("".join(f"{i}\n" for i in range(1, 1001))))
+        self.assertEqual(metrics.counter("output_bytes_total", rule="noisy", stream="stderr"), 5)
+        self.assertEqual(metrics.counter("executions_total", rule="noisy", status="failed"), 1)
+        self.assertEqual(metrics.snapshot()["histograms"]["spawn_seconds"][0]["labels"], {"rule": "noisy"})
+
+        # 无效的记录方式回退为失败时记录
+        self.plugin.init_plugin({"enabled": True, "output_log": "verbose"})
+        self.assertEqual(self.plugin._output_log, "failure")
+
+
+class TestProcessControl(unittest.TestCase):
+    """进程组与资源限制测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.process = self.module.process
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+        except FileNotFoundError:
+            return False
+
+    def test_timeout_kills_group(self):
+        """测试超时杀死整个进程组，包括 shell 启动的子进程"""
+        with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+            self.process.run_process("sleep 30 & echo $!; wait", timeout=0.5)
+        pid = int(ctx.exception.output.strip())
+        deadline = time.time() + 2
+        while self._alive(pid) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(self._alive(pid))
+
+    def test_tracker_kill_all(self):
+        """测试停止时杀死仍在执行的命令"""
+        tracker = self.process.ProcessTracker()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            self.process.run_process("sleep 30", tracker=tracker)))
+        thread.start()
+        deadline = time.time() + 2
+        while not len(tracker) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(tracker.kill_all(), 1)
+        thread.join(timeout=2)
+        self.assertEqual(results[0].returncode, -9)
+        self.assertEqual(len(tracker), 0)
+        self.assertEqual(tracker.kill_all(), 0)
+
+    def test_limits(self):
+        """测试资源限制作用于命令，wait4 返回资源使用"""
+        usage = []
+        limits = self.process.ResourceLimits(open_files=32, nice=5)
+        result = self.process.run_process("ulimit -n; nice", limits=limits, on_exit=usage.append)
+        self.assertEqual(result.stdout.split(), ["32", "5"])
+        self.assertGreater(usage[0].ru_maxrss, 0)
+
+        start = time.time()
+        result = self.process.run_process("while :; do :; done", timeout=10,
+                                          limits=self.process.ResourceLimits(cpu_seconds=1))
+        self.assertLess(result.returncode, 0)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(self.process.ResourceLimits().wrap(["true"]), ["true"])
+
+    def test_limits_without_preexec(self):
+        """测试资源限制由独立的解释器设置后 exec 命令：argv、标准输入与继承的描述符不受影响"""
+        limits = self.process.ResourceLimits(open_files=64)
+        argv = limits.wrap(["cat", "-"])
+        self.assertEqual(argv[-3:], ["--", "cat", "-"])
+        fd = os.memfd_create("test")
+        self.addCleanup(os.close, fd)
+        os.write(fd, b"memfd")
+        with patch.object(self.process.subprocess, "Popen", wraps=subprocess.Popen) as popen:
+            result = self.process.run_process(["sh", "-c", f'ulimit -n; cat; cat /proc/self/fd/{fd}'],
+                                              shell=False, input="stdin ", pass_fds=(fd,), limits=limits)
+        self.assertNotIn("preexec_fn", popen.call_args.kwargs)
+        self.assertEqual(result.stdout, "64\nstdin memfd")
+        result = self.process.run_process(["/nonexistent/hook"], shell=False, limits=limits)
+        self.assertEqual(result.returncode, 127)
+        self.assertIn("/nonexistent/hook", result.stderr)
+
+    def test_parse_options(self):
+        """测试 ionice 解析与规则资源限制配置"""
+        parse_ionice = self.process.parse_ionice
+        self.assertEqual(parse_ionice(""), 0)
+        self.assertEqual(parse_ionice("idle"), 3 << 13)
+        self.assertEqual(parse_ionice("best-effort"), 2 << 13 | 7)
+        self.assertEqual(parse_ionice("best-effort:4"), 2 << 13 | 4)
+        for value in ("realtime", "best-effort:9"):
+            with self.assertRaises(ValueError):
+                parse_ionice(value)
+        ResourceLimits = self.process.ResourceLimits
+        default = ResourceLimits(cpu_seconds=60, memory_mb=512)
+        limits = ResourceLimits.from_options({"memory_limit": 128, "nice": 10, "ionice": "idle"}, default)
+        self.assertEqual(limits, ResourceLimits(60, 128, 0, 10, 3 << 13))
+        self.assertEqual(limits.describe(), "CPU 60秒、内存 128MB、nice 10、ionice idle:0")
+
+    def test_plugin_limits_and_stop(self):
+        """测试插件按规则设置资源限制、记录资源使用，停止时终止执行中的命令"""
+        self.plugin.init_plugin({"enabled": True, "max_workers": 1, "timeout": 1, "nice": 2, "rules": json.dumps([
+            {"name": "nice", "event": "transfer.complete", "command": "nice", "nice": 7},
+            {"name": "slow", "event": "plugin.action", "command": "sleep 30", "timeout": 60},
+        ])})
+        self.assertEqual(self.plugin._limits["nice"].nice, 7)
+        self.assertEqual(self.plugin._limits["slow"].nice, 2)
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {}))
+        self.plugin.on_event(MockEvent(MockEventType.PluginAction, {}))
+        metrics = self.plugin._get_metrics()
+        deadline = time.time() + 2
+        while not metrics.histogram("cpu_seconds", rule="nice").count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(metrics.counter("executions_total", rule="nice", status="ok"), 1)
+        self.assertEqual(metrics.histogram("max_rss_bytes", rule="nice").count, 1)
+
+        start = time.time()
+        self.plugin.stop_service()
+        self.assertLess(time.time() - start, 5)
+        # 被终止的命令由工作线程记录结果
+        deadline = time.time() + 2
+        while not metrics.counter("exit_codes_total", rule="slow", code=-9) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(metrics.counter("exit_codes_total", rule="slow", code=-9), 1)
+
+
+class TestArgvTemplate(unittest.TestCase):
+    """argv 执行模式测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.template = self.module.template
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def _event_data(self):
+        return {"mediainfo": MockMediaInfo(), "transferinfo": MockTransferInfo(file_count=2),
+                "meta": None, "enabled": True, "tags": ["a", "b"]}
+
+    def test_render(self):
+        """测试按字段路径生成参数：对象属性、列表下标、拼接、缺失字段与 JSON"""
+        template = self.template.ArgvTemplate([
+            "/usr/bin/notify", "{transferinfo.target_path}", "--tmdb={mediainfo.tmdb_id}",
+            "{transferinfo.file_list.1}", "{ meta.title }", "{missing}", "{enabled}", "{tags}",
+            "{{literal}}", "{mediainfo.year}-{mediainfo.vote_average}"])
+        self.assertEqual(template.fields, ("transferinfo.target_path", "mediainfo.tmdb_id",
+                                           "transferinfo.file_list.1", "meta.title", "missing", "enabled",
+                                           "tags", "mediainfo.year", "mediainfo.vote_average"))
+        self.assertEqual(template.render(self._event_data()), [
+            "/usr/bin/notify", "/media/Movies/Test Movie (2024)/Test.Movie.2024.1080p.mkv", "--tmdb=12345",
+            "/downloads/Test.S01E01.mkv", "", "", "true", '["a","b"]', "{literal}", "2024-8.5"])
+        self.assertEqual(template.command, "/usr/bin/notify '{transferinfo.target_path}' "
+                                           "'--tmdb={mediainfo.tmdb_id}' '{transferinfo.file_list.1}' "
+                                           "'{ meta.title }' '{missing}' '{enabled}' '{tags}' '{{literal}}' "
+                                           "'{mediainfo.year}-{mediainfo.vote_average}'")
+
+        split = self.template.ArgvTemplate("curl -sf 'http://nas/hook?id={mediainfo.tmdb_id}'")
+        self.assertEqual(split.render(self._event_data()), ["curl", "-sf", "http://nas/hook?id=12345"])
+
+    def test_invalid(self):
+        """测试无效的模板"""
+        for argv in ([], "", ["{cmd}", "x"], ["echo", "{a"], ["echo", "a}"], ["echo", "{}"], ["echo", "{a..b}"],
+                     "echo 'unclosed"):
+            with self.assertRaises(self.template.TemplateError, msg=repr(argv)):
+                self.template.ArgvTemplate(argv)
+
+    def test_parse_rules(self):
+        """测试规则配置 argv，无效的模板跳过该规则"""
+        rules = self.module.rules.parse_rules(json.dumps([
+            {"name": "exec", "event": "transfer.complete", "argv": ["/bin/echo", "{mediainfo.title}"]},
+            {"name": "bad", "event": "transfer.complete", "argv": ["/bin/echo", "{mediainfo.title"]},
+            {"name": "shell", "event": "transfer.complete", "command": "echo hi"},
+        ]))
+        self.assertEqual([rule.name for rule in rules], ["exec", "shell"])
+        self.assertEqual(rules[0].command, "/bin/echo '{mediainfo.title}'")
+        self.assertEqual(rules[0].argv.fields, ("mediainfo.title",))
+        self.assertIsNone(rules[1].argv)
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_exec_without_shell(self, mock_run):
+        """测试 argv 规则不经过 shell 执行，仍传递 MP_EVENT_* 环境变量"""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "exec", "event": "transfer.complete",
+             "argv": ["/scripts/hook", "{transferinfo.target_diritem.name}", "{mediainfo.tmdb_id}"]},
+            {"name": "shell", "event": "transfer.complete", "command": "echo hi"},
+        ])})
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, self._event_data()))
+
+        self.assertEqual(mock_run.call_count, 2)
+        args, kwargs = mock_run.call_args_list[0]
+        self.assertEqual(args[0], ["/scripts/hook", "Test Movie (2024)", "12345"])
+        self.assertFalse(kwargs["shell"])
+        self.assertEqual(kwargs["env"]["MP_EVENT_TYPE"], "transfer.complete")
+        self.assertEqual(json.loads(kwargs["env"]["MP_EVENT_DATA"])["data"]["mediainfo"]["tmdb_id"], 12345)
+        self.assertEqual(mock_run.call_args_list[1][0][0], "echo hi")
+        self.assertTrue(mock_run.call_args_list[1][1]["shell"])
+
+    @patch('eventexecutor.process.run_process')
+    def test_plugin_batch(self, mock_run):
+        """测试批处理模式下带占位符的 argv 规则逐个事件执行"""
+        mock_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "batch_window": 60000, "rules": json.dumps([
+            {"name": "exec", "event": "transfer.complete", "argv": ["/scripts/hook", "{index}"]},
+            {"name": "static", "event": "transfer.complete", "argv": ["/scripts/sync", "--all"]},
+        ])})
+        for i in range(3):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"index": i}))
+        self.plugin.stop_service()
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        self.assertEqual(commands, [["/scripts/hook", "0"], ["/scripts/hook", "1"], ["/scripts/hook", "2"],
+                                    ["/scripts/sync", "--all"]])
+        self.assertEqual(mock_run.call_args_list[3][1]["env"]["MP_EVENT_COUNT"], "3")
+
+    def test_exec_real_command(self):
+        """测试生成的参数原样传递给程序，不经过 shell 解释"""
+        template = self.template.ArgvTemplate(["printf", "%s|", "{a}", "{b}"])
+        result = self.module.process.run_process(template.render({"a": "$HOME; rm -rf /", "b": "it's"}),
+                                                 shell=False)
+        self.assertEqual(result.stdout, "$HOME; rm -rf /|it's|")
+
+
+class TestForkServer(unittest.TestCase):
+    """命令启动进程测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.process = self.module.process
+        self.plugin = self.module.EventExecutor()
+        self.server = self.process.ForkServer(restart_interval=0)
+        self.server.start()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+        self.server.stop()
+
+    def test_run(self):
+        """测试通过启动进程执行命令：输出、退出码、标准输入、内存文件与资源使用"""
+        usage = []
+        result = self.process.run_process("cat; echo err >&2; exit 3", input="payload",
+                                          spawner=self.server, on_exit=usage.append)
+        self.assertEqual((result.returncode, result.stdout, result.stderr), (3, "payload", "err\n"))
+        self.assertIsInstance(usage[0], self.process.Usage)
+
+        fd = os.memfd_create("test")
+        self.addCleanup(os.close, fd)
+        os.write(fd, b"memfd data")
+        result = self.process.run_process(["cat", f"/proc/self/fd/{fd}"], shell=False, pass_fds=(fd,),
+                                          spawner=self.server)
+        self.assertEqual(result.stdout, "memfd data")
+
+        result = self.process.run_process("ulimit -n", spawner=self.server,
+                                          limits=self.process.ResourceLimits(open_files=40))
+        self.assertEqual(result.stdout, "40\n")
+        with self.assertRaises(FileNotFoundError):
+            self.process.run_process(["/nonexistent/hook"], shell=False, spawner=self.server)
+        self.assertEqual(self.server.stats()["spawned"], 3)
+
+    def test_limits_without_fork(self):
+        """测试启动进程设置资源限制时不 fork 自身，由新的解释器设置限制后执行命令"""
+        spawnd = self.module.spawnd
+        read_fd, write_fd = os.pipe()
+        with patch.object(spawnd.os, "fork", side_effect=AssertionError("fork")):
+            pid = spawnd.Server._start(["sh", "-c", "ulimit -n"], dict(os.environ), [(write_fd, 1)],
+                                       list(self.process.ResourceLimits(open_files=40)))
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            self.assertEqual(f.read(), "40\n")
+        self.assertEqual(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]), 0)
+
+    def test_timeout(self):
+        """测试超时由启动进程杀死整个进程组"""
+        with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+            self.process.run_process("sleep 30 & echo $!; wait", timeout=0.5, spawner=self.server)
+        pid = int(ctx.exception.output.strip())
+        deadline = time.time() + 2
+        while TestProcessControl._alive(pid) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(TestProcessControl._alive(pid))
+
+    def test_restart(self):
+        """测试启动进程意外退出时终止执行中的命令，之后自动重启"""
+        errors = []
+
+        def run():
+            try:
+                self.process.run_process("sleep 30", spawner=self.server)
+            except OSError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        deadline = time.time() + 2
+        while not self.server.stats()["spawned"] and time.time() < deadline:
+            time.sleep(0.01)
+        old_pid = self.server.pid
+        os.kill(old_pid, 9)
+        thread.join(timeout=5)
+        self.assertIsInstance(errors[0], self.process.ForkServerError)
+
+        result = self.process.run_process("echo ok", spawner=self.server)
+        self.assertEqual(result.stdout, "ok\n")
+        self.assertEqual(self.server.stats()["restarts"], 1)
+        self.assertNotEqual(self.server.pid, old_pid)
+
+    def test_fallback(self):
+        """测试启动进程停止后在插件进程内启动命令"""
+        self.server.stop()
+        result = self.process.run_process("echo local", spawner=self.server)
+        self.assertEqual(result.stdout, "local\n")
+        self.assertFalse(self.server.running)
+
+    def test_plugin(self):
+        """测试插件启用启动进程，停止服务时启动进程退出"""
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "fork_server": True, "rules": json.dumps([
+            {"name": "echo", "event": "transfer.complete", "argv": ["echo", "{title}"]},
+        ])})
+        spawner = self.plugin._spawner
+        self.assertTrue(spawner.running)
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": "x"}))
+        self.assertEqual(self.plugin.get_stats()["fork_server"]["spawned"], 1)
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("executions_total", rule="echo", status="ok"), 1)
+        self.assertEqual(metrics.histogram("cpu_seconds", rule="echo").count, 1)
+
+        self.plugin.stop_service()
+        self.assertIsNone(self.plugin._spawner)
+        self.assertFalse(spawner.running)
+        self.assertIsNotNone(spawner._proc.poll())
+
+
+class TestShellPool(unittest.TestCase):
+    """预热 shell 池测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.process = self.module.process
+        self.shellpool = self.module.shellpool
+        self.plugin = self.module.EventExecutor()
+        self.base = {"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "KEEP": "base", "DROP": "base"}
+        self.pool = self.shellpool.ShellPool(1, env=self.base)
+        self.pool.start()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+        self.pool.stop()
+
+    def _wait_idle(self, pool, count=1):
+        deadline = time.time() + 5
+        while pool.idle() < count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(pool.idle(), count)
+
+    def test_env_overlay(self):
+        """测试任务的环境变量覆盖：新增、修改、删除，值中的换行、引号与中文原样传递"""
+        self._wait_idle(self.pool)
+        worker = self.pool.acquire()
+        data = json.dumps({"title": "电影 \"It's\"\n第二行"}, ensure_ascii=False, indent=2)
+        env = {"PATH": self.base["PATH"], "KEEP": "base", "MP_EVENT_TYPE": "transfer.complete",
+               "MP_EVENT_DATA": data, "EMPTY": ""}
+        result = self.process.run_process(
+            'printf "%s|%s|%s|%s|%s" "$MP_EVENT_TYPE" "$KEEP" "${DROP-unset}" "${EMPTY-unset}" "$MP_EVENT_DATA"',
+            env=env, worker=worker)
+        self.assertEqual(result.stdout, f"transfer.complete|base|unset||{data}")
+        self.assertEqual(worker.child.pid, worker.child.proc.pid)
+        self.assertEqual(self.pool.stats()["hits"], 1)
+
+    def test_runs_in_warmed_shell(self):
+        """测试命令在预热的 bash 中以 POSIX 模式执行，看不到预热用的变量与参数，未命中时新启动的 bash 相同"""
+        command = ('printf "%s|%s|%s|%s|%s" "$0" "$#" "$(set | grep -c "^__mp_")" '
+                   '"$(set -o | grep -c "posix.*on")" "$$"')
+        self._wait_idle(self.pool)
+        worker = self.pool.acquire()
+        pooled = self.process.run_process(command, env=dict(self.base), worker=worker)
+        self.assertEqual(pooled.stdout, f"sh|0|0|1|{worker.child.pid}")
+        cold = self.process.run_process(self.pool.argv(command), shell=False, env=dict(self.base))
+        self.assertEqual(cold.stdout.rsplit("|", 1)[0], "sh|0|0|1")
+
+    def test_latency(self):
+        """测试命中时省去 bash 启动与 BASH_ENV 加载：加载需 0.2 秒时命中的命令明显快于新启动的 bash"""
+        import tempfile
+        bash_env = tempfile.NamedTemporaryFile("w", suffix=".sh", delete=False)
+        bash_env.write("sleep 0.2\nmp_profile() { echo loaded; }\n")
+        bash_env.close()
+        self.addCleanup(os.unlink, bash_env.name)
+        env = {**self.base, "BASH_ENV": bash_env.name}
+        pool = self.shellpool.ShellPool(1, env=env)
+        pool.start()
+        self.addCleanup(pool.stop)
+
+        start = time.monotonic()
+        cold = self.process.run_process(pool.argv("mp_profile"), shell=False, env=env)
+        cold_latency = time.monotonic() - start
+        self._wait_idle(pool)
+        worker = pool.acquire()
+        start = time.monotonic()
+        pooled = self.process.run_process("mp_profile", env=env, worker=worker)
+        pooled_latency = time.monotonic() - start
+        self.assertEqual((cold.stdout, pooled.stdout), ("loaded\n", "loaded\n"))
+        self.assertGreaterEqual(cold_latency, 0.2)
+        self.assertLess(pooled_latency, 0.1)
+
+    def test_stdin_and_exit_code(self):
+        """测试标准输入在任务之后传递给命令，退出码与输出和直接执行一致"""
+        self._wait_idle(self.pool)
+        result = self.process.run_process("cat; echo err >&2; exit 3", env=dict(self.base), input="payload",
+                                          worker=self.pool.acquire())
+        self.assertEqual((result.returncode, result.stdout, result.stderr), (3, "payload", "err\n"))
+        self._wait_idle(self.pool)
+        result = self.process.run_process("read line; echo \"[$line]\"", env=dict(self.base),
+                                          worker=self.pool.acquire())
+        self.assertEqual(result.stdout, "[]\n")
+
+    def test_miss_and_replenish(self):
+        """测试没有空闲进程或需要继承描述符时未命中，取出后在后台补充"""
+        idle = self.shellpool.ShellPool(1, env=self.base)
+        self.assertIsNone(idle.acquire())
+        self.assertEqual(idle.stats()["misses"], 1)
+
+        self._wait_idle(self.pool)
+        self.assertIsNone(self.pool.acquire(pass_fds=(5,)))
+        self.pool.acquire().discard()
+        self._wait_idle(self.pool)
+        stats = self.pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["spawned"]), (1, 1, 2))
+
+        # 空闲进程意外退出后不再交出
+        worker = self.pool._idle[0]
+        os.killpg(worker.child.pid, 9)
+        deadline = time.time() + 2
+        while worker.running and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(self.pool.acquire())
+        self._wait_idle(self.pool)
+
+    def test_timeout(self):
+        """测试超时杀死预热进程的整个进程组"""
+        self._wait_idle(self.pool)
+        with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+            self.process.run_process("sleep 30 & echo $!; wait", env=dict(self.base), timeout=0.5,
+                                     worker=self.pool.acquire())
+        pid = int(ctx.exception.output.strip())
+        deadline = time.time() + 2
+        while TestProcessControl._alive(pid) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(TestProcessControl._alive(pid))
+
+    def test_plugin(self):
+        """测试插件使用预热 shell：事件环境变量不变，统计命中数，停止服务时结束空闲进程"""
+        import tempfile
+        output = tempfile.NamedTemporaryFile(delete=False)
+        output.close()
+        self.addCleanup(os.unlink, output.name)
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "shell_pool": 1, "rules": json.dumps([
+            {"name": "hook", "event": "transfer.complete",
+             "command": f'echo "$MP_EVENT_TYPE $MP_EVENT_DATA" >> {output.name}'},
+            {"name": "cold", "event": "transfer.complete", "command": "true", "prewarm": False},
+        ])})
+        pool = self.plugin._shell_pool
+        self._wait_idle(pool)
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": "x"}))
+        self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": "y"}))
+        with open(output.name) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("transfer.complete {"))
+        self.assertIn('"title":"y"', lines[1].replace(" ", ""))
+        metrics = self.plugin._get_metrics()
+        hits = metrics.counter("shell_pool_total", rule="hook", result="hit")
+        self.assertEqual(hits + metrics.counter("shell_pool_total", rule="hook", result="miss"), 2)
+        self.assertEqual(self.plugin.get_stats()["shell_pool"]["hits"], hits)
+        self.assertEqual(metrics.counter("shell_pool_total", rule="cold", result="miss"), 0)
+        self.assertEqual(metrics.counter("executions_total", rule="cold", status="ok"), 2)
+
+        self._wait_idle(pool)
+        worker = pool._idle[0]
+        self.plugin.stop_service()
+        self.assertIsNone(self.plugin._shell_pool)
+        self.assertFalse(worker.running)
+        self.assertIsNotNone(worker.child.returncode)
+
+
+class TestAsyncEngine(unittest.TestCase):
+    """asyncio 执行引擎测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.aioengine = self.module.aioengine
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def _run(self, command, **kwargs):
+        return asyncio.run(self.aioengine.run_process(command, **kwargs))
+
+    def test_run_process(self):
+        """测试在事件循环中执行命令：输出、退出码、标准输入、内存文件与资源使用"""
+        usage, spawned = [], []
+        stdout = self.module.process.OutputBuffer()
+        result = self._run("cat; echo err >&2; exit 3", input="payload" * 20000, stdout=stdout,
+                           on_spawn=spawned.append, on_exit=usage.append)
+        self.assertEqual((result.returncode, stdout.bytes, result.stderr), (3, 140000, "err\n"))
+        self.assertTrue(result.stdout.startswith("payload"))
+        self.assertEqual(len(spawned), 1)
+        self.assertGreaterEqual(usage[0].ru_maxrss, 0)
+
+        fd = os.memfd_create("test")
+        self.addCleanup(os.close, fd)
+        os.write(fd, b"memfd data")
+        result = self._run(["cat", f"/proc/self/fd/{fd}"], shell=False, pass_fds=(fd,))
+        self.assertEqual(result.stdout, "memfd data")
+        with self.assertRaises(FileNotFoundError):
+            self._run(["/nonexistent/hook"], shell=False)
+
+    def test_timeout(self):
+        """测试超时由事件循环的定时器杀死整个进程组"""
+        with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+            self._run("sleep 30 & echo $!; wait", timeout=0.5)
+        pid = int(ctx.exception.output.strip())
+        deadline = time.time() + 2
+        while TestProcessControl._alive(pid) and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertFalse(TestProcessControl._alive(pid))
+
+    def test_concurrency(self):
+        """测试大量命令同时执行只占用一个线程，并发数与单类型并发数受限"""
+        import tempfile
+        gate = os.path.join(tempfile.mkdtemp(), "gate")
+        # 断言失败时也放行命令，避免遗留循环执行的进程
+        self.addCleanup(lambda: open(gate, "w").close())
+
+        async def handler(job):
+            # 命令一直执行到测试创建 gate 文件，执行中的任务数不受启动耗时影响
+            await self.aioengine.run_process(f'while [ ! -e "{gate}" ]; do sleep 0.02; done')
+
+        def wait_active(engine, count):
+            deadline = time.monotonic() + 10
+            while engine.stats()["active"] < count and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return engine.stats()
+
+        engine = self.aioengine.AsyncEngine(handler, concurrency=100, queue_size=1000)
+        threads = threading.active_count()
+        engine.start()
+        for i in range(100):
+            self.assertTrue(engine.submit("t", i))
+        self.assertEqual(wait_active(engine, 100)["active"], 100)
+        # 事件循环线程与启动线程
+        self.assertLessEqual(threading.active_count(), threads + 1 + engine.spawn_workers)
+        open(gate, "w").close()
+        start = time.monotonic()
+        self.assertEqual(engine.stop(timeout=10), 0)
+        # 所有命令同时等待，放行后很快全部完成
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(engine.completed, 100)
+        self.assertFalse(engine.submit("t", 0))
+        os.unlink(gate)
+
+        limited = self.aioengine.AsyncEngine(handler, concurrency=10, queue_size=4, key_limit=1)
+        limited.start()
+        for i in range(3):
+            self.assertTrue(limited.submit("a", i))
+        self.assertTrue(limited.submit("b", 0))
+        stats = wait_active(limited, 2)
+        self.assertEqual((stats["active"], stats["pending"]), (2, 2))
+        for i in range(3):
+            limited.submit("a", i)
+        self.assertEqual(limited.stats()["dropped"], 1)
+        open(gate, "w").close()
+        self.assertEqual(limited.stop(timeout=10), 0)
+        self.assertEqual(limited.completed, 6)
+
+    def test_fork_server(self):
+        """测试由启动进程启动的命令：事件循环通过通知管道等待退出，超时杀死进程组"""
+        spawner = self.module.process.ForkServer()
+        spawner.start()
+        self.addCleanup(spawner.stop)
+        usage = []
+        result = self._run("cat; exit 4", input="payload", spawner=spawner, on_exit=usage.append)
+        self.assertEqual((result.returncode, result.stdout), (4, "payload"))
+        self.assertIsInstance(usage[0], self.module.process.Usage)
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self._run("sleep 30", spawner=spawner, timeout=0.3)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(spawner.stats()["spawned"], 2)
+
+    def test_stop_cancels(self):
+        """测试停止时等待超时后取消任务并杀死其命令"""
+        pids = []
+
+        async def handler(job):
+            await self.aioengine.run_process("sleep 30", on_spawn=lambda child: pids.append(child.pid))
+
+        engine = self.aioengine.AsyncEngine(handler)
+        engine.start()
+        engine.submit("t", None)
+        deadline = time.time() + 2
+        while not pids and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(engine.stop(timeout=0.2), 1)
+        self.assertFalse(TestProcessControl._alive(pids[0]))
+
+    def test_plugin(self):
+        """测试插件使用 asyncio 执行引擎：规则、重试与统计与工作线程一致"""
+        import tempfile
+        output = tempfile.NamedTemporaryFile(delete=False)
+        output.close()
+        self.addCleanup(os.unlink, output.name)
+        self.plugin.init_plugin({"enabled": True, "engine": "asyncio", "fork_server": True, "rules": json.dumps([
+            {"name": "write", "event": "transfer.complete",
+             "command": f'echo "$MP_EVENT_TYPE $MP_EVENT_DATA" >> {output.name}'},
+            {"name": "argv", "event": "transfer.complete", "argv": ["sh", "-c", "exit 2", "{title}"]},
+        ])})
+        self.assertIsInstance(self.plugin._pool, self.module.AsyncEngine)
+        self.assertIsNotNone(self.plugin._spawner)
+        for title in ("x", "y", "z"):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": title}))
+        deadline = time.time() + 5
+        while self.plugin.get_stats()["engine"]["completed"] < 3 and time.time() < deadline:
+            time.sleep(0.02)
+        with open(output.name) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(all(line.startswith("transfer.complete {") for line in lines))
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("executions_total", rule="write", status="ok"), 3)
+        self.assertEqual(metrics.counter("exit_codes_total", rule="argv", code=2), 3)
+        self.assertEqual(metrics.histogram("cpu_seconds", rule="write").count, 3)
+        self.assertEqual(self.plugin.get_stats()["fork_server"]["spawned"], 6)
+
+        self.plugin.stop_service()
+        self.assertIsNone(self.plugin._pool)
+
+        # 常驻进程模式仍使用工作线程
+        self.plugin.init_plugin({"enabled": True, "engine": "asyncio", "exec_mode": "coprocess",
+                                 "bash_command": "cat > /dev/null"})
+        self.assertIsInstance(self.plugin._pool, self.module.WorkerPool)
+
+
+class TestPythonHandler(unittest.TestCase):
+    """Python 处理函数测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.handler = self.module.handler
+        self.plugin = self.module.EventExecutor()
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_parse(self):
+        """测试解析 python / handler 规则：代码按源码缓存，无效配置忽略规则"""
+        source = "result = event['data']['title'].upper()"
+        before = self.handler.cache_stats()
+        rules = self.module.parse_rules(json.dumps([
+            {"name": "snippet", "python": source},
+            {"name": "lines", "python": ["x = 1", "result = x + 1"]},
+            {"name": "entry", "handler": "json:dumps"},
+            {"name": "syntax", "python": "result = ("},
+            {"name": "missing", "handler": "json:nonexistent"},
+            {"name": "module", "handler": "nonexistent_module_xyz:run"},
+            {"name": "both", "python": "pass", "handler": "json:dumps"},
+        ]))
+        self.assertEqual([rule.name for rule in rules], ["snippet", "lines", "entry"])
+        self.assertTrue(rules[0].command.startswith("python:"))
+        self.assertEqual(rules[2].command, "handler:json:dumps")
+        self.assertEqual(rules[0].handler({"type": "t", "data": {"title": "abc"}}), "ABC")
+        self.assertEqual(rules[1].handler({}), 2)
+        self.assertEqual(rules[2].handler({"type": "t"}), '{"type": "t"}')
+        # 重新加载配置时不再编译
+        again = self.module.parse_rules(json.dumps([{"name": "snippet", "python": source}]))
+        self.assertIs(again[0].handler.code, rules[0].handler.code)
+        self.assertGreater(self.handler.cache_stats()["hits"], before["hits"])
+
+    def test_runner(self):
+        """测试执行线程池：异常带回调用方并计数，超时中断仍在执行的处理函数"""
+        runner = self.handler.HandlerRunner(workers=1)
+        self.addCleanup(runner.stop)
+        error = self.handler.PythonHandler(source="raise KeyError('title')")
+        with self.assertRaises(KeyError):
+            runner.submit(error, {}).result()
+        busy = self.handler.PythonHandler(source="while True:\n    pass")
+        start = time.monotonic()
+        with self.assertRaises(self.handler.HandlerTimeout):
+            runner.submit(busy, {}, timeout=0.2).result()
+        self.assertLess(time.monotonic() - start, 1)
+        # 被中断的处理函数让出线程，后续调用正常执行
+        ok = self.handler.PythonHandler(source="result = event['n'] * 2")
+        self.assertEqual(runner.submit(ok, {"n": 21}, timeout=2).result(), 42)
+        stats = runner.stats()
+        self.assertEqual((stats["errors"], stats["timeouts"], stats["overrun"], stats["running"]), (1, 1, 0, 0))
+        self.assertEqual(stats["completed"], 3)
+
+        async def wait_async():
+            return await runner.submit(ok, {"n": 1}, timeout=2).result_async()
+        self.assertEqual(asyncio.run(wait_async()), 2)
+
+    def test_plugin(self):
+        """测试插件执行处理函数：返回值作为输出，异常与超时记录为失败，批处理中逐个事件调用"""
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "ok", "event": "transfer.complete",
+             "python": "result = {'type': event['type'], 'title': event['data']['title']}"},
+            {"name": "error", "event": "transfer.complete", "python": "1 / 0"},
+            {"name": "slow", "event": "transfer.complete", "timeout": 1, "python": "while True:\n    pass"},
+        ])})
+        self.assertIsNotNone(self.plugin._handlers)
+        executions = []
+        with patch.object(self.plugin, "_handle_result",
+                          side_effect=lambda event, rule, execution, *args: executions.append(execution)):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": "x"}))
+        self.assertEqual([(e.rule, e.status) for e in executions],
+                         [("ok", "ok"), ("error", "failed"), ("slow", "timeout")])
+        self.assertEqual(json.loads(executions[0].stdout), {"type": "transfer.complete", "title": "x"})
+        self.assertIn("ZeroDivisionError", executions[1].stderr)
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("handler_errors_total", rule="error", error="ZeroDivisionError"), 1)
+        self.assertEqual(metrics.counter("timeouts_total", rule="slow"), 1)
+        self.assertEqual(metrics.histogram("run_seconds", rule="ok").count, 1)
+        self.assertEqual(self.plugin.get_stats()["handlers"]["timeouts"], 1)
+
+        self.plugin.stop_service()
+        self.assertIsNone(self.plugin._handlers)
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "batch", "python": "result = event['data']['title']"},
+        ])})
+        jobs = [self.module.EventJob(MockEvent(MockEventType.TransferComplete, {"title": title}),
+                                     self.plugin._rule_index.rules) for title in ("a", "b")]
+        outputs = []
+        with patch.object(self.plugin, "_handle_result",
+                          side_effect=lambda event, rule, execution, *args: outputs.append(execution.stdout)):
+            self.plugin._execute_batch(jobs)
+        self.assertEqual(outputs, ["a", "b"])
+
+
+class _StandInServer:
+    """本地 HTTP 服务：记录收到的请求，按路径返回状态码或延迟响应"""
+
+    def __init__(self):
+        import http.server
+        stand_in = self
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+            def _handle(self):
+                import gzip
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                with stand_in._lock:
+                    stand_in.requests.append({"method": self.command, "path": self.path,
+                                              "headers": dict(self.headers), "body": body,
+                                              "client": self.client_address})
+                    stand_in.active += 1
+                    stand_in.peak = max(stand_in.peak, stand_in.active)
+                try:
+                    status = 200
+                    if self.path.startswith("/sleep/"):
+                        time.sleep(float(self.path.split("/")[2]))
+                    elif self.path.startswith("/status/"):
+                        status = int(self.path.split("/")[2])
+                    reply = f"reply {self.path}".encode()
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(reply)))
+                    self.end_headers()
+                    self.wfile.write(reply)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stand_in._lock:
+                        stand_in.active -= 1
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestHttpSink(unittest.TestCase):
+    """HTTP 规则测试"""
+
+    def setUp(self):
+        self.module = load_plugin_module()
+        self.httpsink = self.module.httpsink
+        self.plugin = self.module.EventExecutor()
+        self.server = _StandInServer()
+        self.addCleanup(self.server.close)
+
+    def tearDown(self):
+        self.plugin.stop_service()
+
+    def test_target(self):
+        """测试解析请求模板：URL 字段按 URL 编码，默认请求体为事件信息，可选 gzip"""
+        HttpTarget = self.httpsink.HttpTarget
+        target = HttpTarget({"url": "http://host/items/{media.title}?id={media.id}", "method": "put",
+                             "headers": {"X-Event": "{media.title}"}, "gzip": True})
+        self.assertEqual(target.description, "PUT http://host/items/{media.title}?id={media.id}")
+        self.assertEqual(target.fields, ("media.title", "media.id", "media.title"))
+        request = target.render({"media": {"title": "a b/c", "id": 7}}, payload='{"type":"t"}')
+        self.assertEqual(request.url, "http://host/items/a%20b%2Fc?id=7")
+        self.assertEqual(request.headers["X-Event"], "a b/c")
+        self.assertEqual(request.headers["Content-Encoding"], "gzip")
+        import gzip
+        self.assertEqual(gzip.decompress(request.body), b'{"type":"t"}')
+
+        request = HttpTarget("https://host/hook").render({}, payload="{}")
+        self.assertEqual((request.method, request.body), ("POST", b"{}"))
+        self.assertIsNone(HttpTarget({"url": "http://host/", "method": "GET"}).render({}, payload="{}").body)
+        body = HttpTarget({"url": "http://host/", "body": "title={title}",
+                           "headers": {"Content-Type": "text/plain"}}).render({"title": "x"})
+        self.assertEqual((body.body, body.headers["Content-Type"]), (b"title=x", "text/plain"))
+
+        for spec in ("ftp://host/", "/relative", {"url": "http://{host}/"}, {"url": "http://h/", "method": "TRACE"},
+                     {"url": "http://h/{a"}, {"method": "POST"}):
+            with self.assertRaises(self.httpsink.HttpError, msg=spec):
+                HttpTarget(spec)
+        rules = self.module.parse_rules(json.dumps([
+            {"name": "ok", "http": "http://host/hook"},
+            {"name": "bad", "http": {"url": "ftp://host/"}},
+        ]))
+        self.assertEqual([(rule.name, rule.command) for rule in rules], [("ok", "POST http://host/hook")])
+
+    def test_keep_alive(self):
+        """测试同一主机的请求复用 keep-alive 连接"""
+        sink = self.httpsink.HttpSink(concurrency=2)
+        self.addCleanup(sink.stop)
+        target = self.httpsink.HttpTarget(self.server.url + "/hook")
+        responses = [sink.submit(target.render({}, payload=f'{{"n":{i}}}'), timeout=5).result() for i in range(5)]
+        self.assertEqual([response.status for response in responses], [200] * 5)
+        self.assertEqual(responses[0].body, b"reply /hook")
+        self.assertEqual([response.reused for response in responses], [False] + [True] * 4)
+        self.assertEqual(len({request["client"] for request in self.server.requests}), 1)
+        self.assertEqual([request["body"] for request in self.server.requests][-1], b'{"n":4}')
+        stats = sink.stats()
+        self.assertEqual((stats["requests"], stats["opened"], stats["reused"], stats["idle"]), (5, 1, 4, 1))
+
+    def test_stale_connection(self):
+        """测试复用的连接被对端关闭：请求已发出时只重发幂等的请求，空闲时已关闭的连接不再复用"""
+        import re
+        import socket
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(8)
+        self.addCleanup(listener.close)
+        received = []
+
+        def serve(conn):
+            # 每个连接只回应第一个请求，之后读取请求后直接断开；/bye 回应后立即断开
+            with conn:
+                data, count = b"", 0
+                while True:
+                    while b"\r\n\r\n" not in data:
+                        chunk = conn.recv(65536)
+                        if not chunk:
+                            return
+                        data += chunk
+                    head, data = data.split(b"\r\n\r\n", 1)
+                    match = re.search(rb"Content-Length: (\d+)", head)
+                    length = int(match.group(1)) if match else 0
+                    while len(data) < length:
+                        data += conn.recv(65536)
+                    data = data[length:]
+                    received.append(head.split(b" ")[:2])
+                    count += 1
+                    if count > 1:
+                        return
+                    conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                    if b"/bye" in head.split(b"\r\n")[0]:
+                        return
+
+        def accept():
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except OSError:
+                    return
+                threading.Thread(target=serve, args=(conn,), daemon=True).start()
+        threading.Thread(target=accept, daemon=True).start()
+
+        sink = self.httpsink.HttpSink(concurrency=1)
+        self.addCleanup(sink.stop)
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+        def send(method, path, through=sink):
+            return through.submit(self.httpsink.HttpTarget({"url": url + path, "method": method}).render(
+                {}, payload="{}"), timeout=5).result()
+
+        self.assertEqual(send("POST", "/a").status, 200)
+        with self.assertRaises(ConnectionError):
+            send("POST", "/b")
+        self.assertEqual(len(received), 2)
+        self.assertEqual(send("GET", "/c").status, 200)
+        response = send("GET", "/d")
+        self.assertEqual((response.status, response.reused), (200, False))
+        self.assertEqual(received[-2:], [[b"GET", b"/d"], [b"GET", b"/d"]])
+
+        fresh = self.httpsink.HttpSink(concurrency=1)
+        self.addCleanup(fresh.stop)
+        self.assertEqual(send("POST", "/bye", fresh).status, 200)
+        time.sleep(0.1)
+        response = send("POST", "/e", fresh)
+        self.assertEqual((response.status, response.reused), (200, False))
+        self.assertEqual(received[-1], [b"POST", b"/e"])
+
+    def test_dropped_high_fd(self):
+        """测试描述符编号超过 1024 的空闲连接仍能判断对端是否已关闭"""
+        import fcntl
+        import resource
+        import socket
+        if resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 1100:
+            self.skipTest("打开文件数上限过低")
+        local, peer = socket.socketpair()
+        self.addCleanup(peer.close)
+        high = socket.socket(fileno=fcntl.fcntl(local.fileno(), fcntl.F_DUPFD_CLOEXEC, 1100))
+        local.close()
+        self.addCleanup(high.close)
+        connection = Mock(sock=high)
+        self.assertFalse(self.httpsink._dropped(connection))
+        peer.close()
+        self.assertTrue(self.httpsink._dropped(connection))
+
+    def test_concurrency_and_timeout(self):
+        """测试并发请求数受限，超时的请求断开连接"""
+        sink = self.httpsink.HttpSink(concurrency=3)
+        self.addCleanup(sink.stop)
+        request = self.httpsink.HttpTarget(self.server.url + "/sleep/0.3").render({}, payload="{}")
+        start = time.monotonic()
+        tasks = [sink.submit(request, timeout=5) for _ in range(6)]
+        self.assertTrue(all(task.result().status == 200 for task in tasks))
+        self.assertEqual(self.server.peak, 3)
+        self.assertLess(time.monotonic() - start, 1.5)
+
+        slow = self.httpsink.HttpTarget(self.server.url + "/sleep/3").render({}, payload="{}")
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            sink.submit(slow, timeout=0.3).result()
+        self.assertLess(time.monotonic() - start, 1)
+
+        async def wait_async():
+            return await sink.submit(request, timeout=5).result_async()
+        self.assertEqual(asyncio.run(wait_async()).status, 200)
+
+    def test_plugin(self):
+        """测试插件发送事件：请求体与 MP_EVENT_DATA 格式相同，非 2xx 记为失败，批处理发送事件数组"""
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "post", "event": "transfer.complete", "http": {"url": self.server.url + "/hook", "gzip": True}},
+            {"name": "error", "event": "transfer.complete", "http": self.server.url + "/status/503"},
+            {"name": "get", "event": "transfer.complete",
+             "http": {"url": self.server.url + "/items/{title}", "method": "GET"}},
+        ])})
+        executions = []
+        with patch.object(self.plugin, "_handle_result",
+                          side_effect=lambda event, rule, execution, *args: executions.append(execution)):
+            self.plugin.on_event(MockEvent(MockEventType.TransferComplete, {"title": "a b"}))
+        self.assertEqual([(e.rule, e.status, e.exit_code) for e in executions],
+                         [("post", "ok", 200), ("error", "failed", 503), ("get", "ok", 200)])
+        self.assertEqual(executions[0].stdout, "reply /hook")
+        post, error, get = self.server.requests
+        self.assertEqual(json.loads(post["body"]), {"type": "transfer.complete", "data": {"title": "a b"}})
+        self.assertEqual(post["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(get["path"], "/items/a%20b")
+        metrics = self.plugin._get_metrics()
+        self.assertEqual(metrics.counter("exit_codes_total", rule="error", code=503), 1)
+        self.assertEqual(metrics.counter("http_requests_total", rule="get", connection="reused"), 1)
+        self.assertEqual(self.plugin.get_stats()["http"]["opened"], 1)
+
+        self.plugin.stop_service()
+        self.assertIsNone(self.plugin._http)
+        self.plugin.init_plugin({"enabled": True, "max_workers": 0, "rules": json.dumps([
+            {"name": "batch", "http": self.server.url + "/batch"},
+        ])})
+        jobs = [self.module.EventJob(MockEvent(MockEventType.TransferComplete, {"title": title}),
+                                     self.plugin._rule_index.rules) for title in ("a", "b")]
+        self.plugin._execute_batch(jobs)
+        self.assertEqual([item["data"]["title"] for item in json.loads(self.server.requests[-1]["body"])],
+                         ["a", "b"])
+
+
 def run_tests():
     """运行测试套件"""
     # 创建测试套件
@@ -709,6 +3546,31 @@ def run_tests():
     # 添加所有测试
     suite.addTests(loader.loadTestsFromTestCase(TestEventExecutorPlugin))
     suite.addTests(loader.loadTestsFromTestCase(TestEventExecutorIntegration))
+    suite.addTests(loader.loadTestsFromTestCase(TestWorkerPool))
+    suite.addTests(loader.loadTestsFromTestCase(TestCoprocess))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestPayloadTransport))
+    suite.addTests(loader.loadTestsFromTestCase(TestSerializer))
+    suite.addTests(loader.loadTestsFromTestCase(TestRules))
+    suite.addTests(loader.loadTestsFromTestCase(TestConditions))
+    suite.addTests(loader.loadTestsFromTestCase(TestSelectors))
+    suite.addTests(loader.loadTestsFromTestCase(TestEnvironment))
+    suite.addTests(loader.loadTestsFromTestCase(TestDedup))
+    suite.addTests(loader.loadTestsFromTestCase(TestRateLimit))
+    suite.addTests(loader.loadTestsFromTestCase(TestPriorityLanes))
+    suite.addTests(loader.loadTestsFromTestCase(TestShardedPool))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetrics))
+    suite.addTests(loader.loadTestsFromTestCase(TestJournal))
+    suite.addTests(loader.loadTestsFromTestCase(TestRetry))
+    suite.addTests(loader.loadTestsFromTestCase(TestCircuitBreaker))
+    suite.addTests(loader.loadTestsFromTestCase(TestOutput))
+    suite.addTests(loader.loadTestsFromTestCase(TestProcessControl))
+    suite.addTests(loader.loadTestsFromTestCase(TestArgvTemplate))
+    suite.addTests(loader.loadTestsFromTestCase(TestForkServer))
+    suite.addTests(loader.loadTestsFromTestCase(TestShellPool))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestPythonHandler))
+    suite.addTests(loader.loadTestsFromTestCase(TestHttpSink))
 
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)